@@ -0,0 +1,1483 @@
+import asyncio
+import copy
+import hashlib
+import itertools
+import json
+import logging
+from typing import Dict, List, Any, AsyncIterator, Callable, Optional, Tuple, Union
+
+from caches import LRUTTLCache, PlanTemplateCache
+from columnar import ColumnarResultSet
+from communications import BulkCommunicationPipeline, FileEmailSink, LLMCommunicationGenerator
+from entity_resolution import EntityResolutionIndex
+from llm_client import IncrementalJSONParser, LLMClient, get_default_llm_client, llm_deadline
+from local_parser import LocalQueryParser
+from permissions import (
+    DEFAULT_PERMISSIONS_PATH, PermissionDenied, PermissionIndex, PermissionsUnavailable, UserACL,
+)
+from prompts import DEFAULT_PROMPT_KNOWLEDGE_PATH, PromptCompiler, PromptTemplate
+from query_normalizer import QueryNormalizer
+from result_digests import ResultDigester
+from rule_engine import DEFAULT_RULES_PATH, EquityRuleEngine
+from sql_engine import EquityQueryBuilder, SQLExecutionEngine, VersionedResultCache, seed_demo_database
+from time_expressions import TimeExpressionEngine
+from tracing import NullTracer, Tracer, _llm_usage, trace_cache, trace_span, traced, track_llm_usage
+from vesting import VestingCalendar
+from workflow import WorkflowDAGExecutor, WorkflowGraphError
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# SHARED PROMPT FRAGMENTS
+# ============================================================================
+
+# Prompt fragments shared by the staged and fused LLM front-ends
+EQUITY_DOMAIN_KNOWLEDGE = """\
+        - Participants: employees, officers, directors, consultants
+        - Securities: options, RSUs, ESPP, warrants, restricted stock
+        - Events: vesting, exercise, sale, grant, expiration
+        - Time expressions: quarters, months, specific dates, relative time
+        - Relationships: participants have grants, grants have vesting schedules"""
+
+TOOL_CAPABILITIES = """\
+        - calculate_date_range: Parse time expressions → date ranges
+        - query_participants: Get employee/participant data with filters
+        - query_companies: Get company data (for portfolio/multi-company queries)
+        - query_grants: Get equity grant information
+        - query_vesting_events: Vesting events (date, shares, tranche) in a date window, with participant filters
+        - generate_email: Create email content
+        - create_report: Generate formatted reports
+        - send_notification: Send emails/messages"""
+
+# ============================================================================
+# LLM USAGE POINT #1: QUERY PARSING AND UNDERSTANDING
+# ============================================================================
+
+class LLMQueryParser:
+    """Uses LLM to parse natural language queries into structured data"""
+    
+    PROMPT = PromptTemplate(
+        "parse_query",
+        static="""
+        You are an expert equity plan management system. Parse this natural language query into structured parameters.
+        
+        Equity Domain Knowledge:
+        {domain_knowledge}
+        
+        Extract and return JSON with:
+        {{
+            "entities": {{
+                "target": "what user wants (participants, grants, companies, etc)",
+                "filters": {{
+                    "department": "if mentioned",
+                    "security_type": "if specified",
+                    "participant_type": "employee/officer/director",
+                    "time_context": "any time expressions"
+                }}
+            }},
+            "intent": {{
+                "primary_action": "query/analyze/generate/send",
+                "output_format": "list/report/email/summary",
+                "data_scope": "single_company/multi_company/benchmark"
+            }},
+            "business_validation": [
+                "Check for business rule violations or impossible combinations"
+            ],
+            "confidence": 0.85
+        }}
+        
+        Be precise and identify ALL relevant equity concepts.
+        """,
+        dynamic="""
+        User Query: "{user_query}"
+        
+        Relevant Schema, Definitions and Examples:
+        {context}
+        """,
+        domain_knowledge=EQUITY_DOMAIN_KNOWLEDGE,
+    )
+    
+    def __init__(self, llm_client: Optional[LLMClient] = None,
+                 cache: Optional[LRUTTLCache] = None,
+                 normalizer: Optional[QueryNormalizer] = None,
+                 local_parser: Optional[LocalQueryParser] = None,
+                 local_confidence_threshold: float = 0.85,
+                 prompt_compiler: Optional[PromptCompiler] = None):
+        self.llm_client = llm_client or get_default_llm_client()
+        self.prompt_compiler = prompt_compiler or PromptCompiler()
+        self.cache = cache  # None disables parse caching
+        self.normalizer = normalizer or QueryNormalizer()
+        self.time_engine = self.normalizer.time_engine
+        self.local_parser = local_parser  # None always asks the LLM
+        self.local_confidence_threshold = local_confidence_threshold
+    
+    @traced("parse")
+    async def parse_query(self, user_query: str) -> Dict[str, Any]:
+        """
+        🤖 LLM USAGE: Parse natural language into structured query parameters
+        
+        This is where LLM reasoning is ESSENTIAL - traditional NLP would struggle
+        with the variety and complexity of equity domain queries.
+        """
+        
+        # 🔧 NON-LLM: Time phrases are resolved locally and kept out of the prompt,
+        # so "... this quarter" and "... next quarter" share one cached parse
+        llm_query, time_ranges = self.time_engine.strip(user_query)
+        
+        # 🔧 NON-LLM: Repeated questions are answered from the parse cache
+        cache_key = self.normalizer.normalize(llm_query)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            trace_cache("parse", cached is not None)
+            if cached is not None:
+                logger.info("⚡ Parse cache hit: '%s'", cache_key)
+                return self.attach_time_ranges(copy.deepcopy(cached), time_ranges)
+        
+        # 🔧 NON-LLM: Queries the equity vocabulary fully explains skip the LLM
+        local_parsed = None
+        if self.local_parser is not None:
+            await self.local_parser.refresh_database_values()
+            local_parsed = self.local_parser.parse(llm_query)
+            trace_cache("local_parse", local_parsed["confidence"] >= self.local_confidence_threshold)
+            if local_parsed["confidence"] >= self.local_confidence_threshold:
+                logger.info("⚡ Local parse (confidence %s): '%s'", local_parsed["confidence"], llm_query)
+                return self.attach_time_ranges(local_parsed, time_ranges)
+        
+        # 🔧 NON-LLM: Static instructions are a cached prefix; only relevant schema rides along
+        messages = self.prompt_compiler.render(self.PROMPT, context_query=llm_query, user_query=llm_query)
+        
+        logger.info("🤖 LLM CALL #1: Query Parsing")
+        logger.info("   Input: '%s'", user_query)
+        
+        response = await self.llm_client.chat(
+            model="gpt-4",
+            messages=messages,
+            temperature=0.1,  # Low temperature for consistent parsing
+            max_tokens=1000
+        )
+        
+        try:
+            parsed_data = json.loads(response.choices[0].message.content)
+            logger.info("   ✅ LLM parsed query successfully")
+            logger.info("   📊 Confidence: %s", parsed_data.get("confidence", "N/A"))
+            if self.cache is not None:
+                self.cache.put(cache_key, copy.deepcopy(parsed_data))
+            if local_parsed is not None:
+                self.local_parser.record_outcome(local_parsed, parsed_data)
+            return self.attach_time_ranges(parsed_data, time_ranges)
+        except json.JSONDecodeError as e:
+            logger.warning("   ❌ LLM parsing failed: %s", e)
+            return self.attach_time_ranges(self._fallback_parsing(llm_query), time_ranges)
+    
+    @staticmethod
+    def attach_time_ranges(parsed_query: Dict[str, Any], time_ranges: List[Dict[str, str]]) -> Dict[str, Any]:
+        """🔧 NON-LLM: Record locally resolved time phrases on a parse"""
+        if time_ranges:
+            entities = parsed_query.setdefault("entities", {})
+            filters = entities.setdefault("filters", {})
+            filters["time_context"] = time_ranges[0]["expression"]
+            parsed_query["time_ranges"] = time_ranges
+        return parsed_query
+    
+    def _fallback_parsing(self, query: str) -> Dict:
+        """🔧 NON-LLM: Fallback parsing using traditional string matching"""
+        # Vocabulary matching as backup, whatever its confidence
+        if self.local_parser is not None:
+            return self.local_parser.parse(query)
+        return {"entities": {}, "intent": {}, "confidence": 0.3}
+
+# ============================================================================
+# LLM USAGE POINT #2: DYNAMIC WORKFLOW PLANNING  
+# ============================================================================
+
+class LLMWorkflowPlanner:
+    """Uses LLM to dynamically plan execution workflows"""
+    
+    def __init__(self, llm_client: Optional[LLMClient] = None,
+                 plan_cache: Optional[PlanTemplateCache] = None):
+        self.llm_client = llm_client or get_default_llm_client()
+        self.plan_cache = plan_cache  # None disables plan template reuse
+        self.available_tools = [
+            "calculate_date_range", "query_participants", "query_companies",
+            "query_grants", "query_vesting_events", "generate_email", "create_report", "send_notification"
+        ]
+        self.prompt = PromptTemplate(
+            "plan_workflow",
+            static="""
+            You are a workflow planning expert for equity management systems.
+            
+            Available Tools:
+            {available_tools}
+            
+            Tool Capabilities:
+            {tool_capabilities}
+            
+            Create an optimal execution workflow. Return JSON array:
+            [
+                {{
+                    "step_id": 1,
+                    "tool": "calculate_date_range",
+                    "description": "Parse 'this quarter' into specific dates",
+                    "params": {{"expression": "this quarter"}},
+                    "dependencies": [],
+                    "rationale": "Need specific dates before querying data"
+                }},
+                {{
+                    "step_id": 2,
+                    "tool": "query_participants", 
+                    "description": "Get participants with date filter",
+                    "params": {{"department": "Engineering"}},
+                    "dependencies": [1],
+                    "rationale": "Use dates from step 1 to filter by hire date"
+                }}
+            ]
+            
+            Consider:
+            1. Data dependencies (what needs what)
+            2. Optimal execution order
+            3. Error handling requirements
+            4. Performance optimizations
+            
+            Plan for efficiency and reliability.
+            """,
+            dynamic="""
+            Parsed Query Context:
+            {parsed_query}
+            """,
+            available_tools=json.dumps(self.available_tools),
+            tool_capabilities=TOOL_CAPABILITIES,
+        )
+    
+    @traced("plan")
+    async def plan_workflow(self, parsed_query: Dict[str, Any]) -> List[Dict]:
+        """
+        🤖 LLM USAGE: Plan optimal workflow based on query requirements
+        
+        This is where LLM reasoning shines - determining tool dependencies 
+        and execution order for novel query combinations.
+        """
+        
+        # 🔧 NON-LLM: Known query shapes reuse a proven plan template
+        if self.plan_cache is not None:
+            cached_plan = self.plan_cache.lookup(parsed_query)
+            trace_cache("plan_template", cached_plan is not None)
+            if cached_plan is not None:
+                logger.info("⚡ Plan template hit: %s workflow steps", len(cached_plan))
+                return cached_plan
+        
+        logger.info("🤖 LLM CALL #2: Workflow Planning")
+        logger.info("   Input: Parsed query with %s entities", len(parsed_query.get("entities", {})))
+        
+        response = await self.llm_client.chat(
+            model="gpt-4",
+            messages=self._build_messages(parsed_query),
+            temperature=0.2,  # Slightly higher for creative workflow planning
+            max_tokens=2000
+        )
+        
+        try:
+            workflow_steps = json.loads(response.choices[0].message.content)
+            logger.info("   ✅ LLM planned %s workflow steps", len(workflow_steps))
+            return workflow_steps
+        except json.JSONDecodeError as e:
+            logger.warning("   ❌ LLM planning failed: %s", e)
+            return self._fallback_planning(parsed_query)
+    
+    async def plan_workflow_stream(self, parsed_query: Dict[str, Any]) -> AsyncIterator[Dict]:
+        """
+        🤖 LLM USAGE: Streaming plan_workflow - yields each step as soon as it has streamed
+        
+        Lets the executor start step 1 while later steps are still being generated.
+        """
+        
+        # Never made current: this generator's code runs inside its consumer's span
+        span = trace_span("plan", streamed=True)
+        try:
+            if self.plan_cache is not None:
+                cached_plan = self.plan_cache.lookup(parsed_query)
+                trace_cache("plan_template", cached_plan is not None, span)
+                if cached_plan is not None:
+                    logger.info("⚡ Plan template hit: %s workflow steps", len(cached_plan))
+                    for step in cached_plan:
+                        yield step
+                    return
+            
+            logger.info("🤖 LLM CALL #2: Workflow Planning (streaming)")
+            
+            parser = IncrementalJSONParser()
+            streamed = 0
+            async for delta in self.llm_client.stream_chat(
+                model="gpt-4",
+                messages=self._build_messages(parsed_query),
+                temperature=0.2,
+                max_tokens=2000,
+                stage="plan",
+            ):
+                for _, step in parser.feed(delta):
+                    if isinstance(step, dict) and "tool" in step:
+                        streamed += 1
+                        yield step
+            
+            if streamed:
+                logger.info("   ✅ LLM streamed %s workflow steps", streamed)
+                return
+            logger.warning("   ❌ LLM planning stream produced no steps")
+            for step in self._fallback_planning(parsed_query):
+                yield step
+        except Exception as e:
+            span.end(e)
+            raise
+        finally:
+            span.end()
+    
+    def _build_messages(self, parsed_query: Dict[str, Any]) -> List[Dict[str, str]]:
+        return self.prompt.render(parsed_query=json.dumps(parsed_query, indent=2))
+    
+    def record_outcome(self, parsed_query: Dict[str, Any], plan: List[Dict], succeeded: bool):
+        """🔧 NON-LLM: Promote plans that validated and ran cleanly; drop ones that didn't"""
+        if self.plan_cache is None:
+            return
+        if succeeded:
+            self.plan_cache.promote(parsed_query, plan)
+        else:
+            self.plan_cache.demote(parsed_query)
+    
+    def _fallback_planning(self, parsed_query: Dict) -> List[Dict]:
+        """🔧 NON-LLM: Simple rule-based workflow planning"""
+        # Basic if/then logic for common patterns
+        return [{"step_id": 1, "tool": "query_participants", "params": {}}]
+
+# ============================================================================
+# LLM USAGE POINT #3: BUSINESS RULES VALIDATION
+# ============================================================================
+
+class LLMBusinessValidator:
+    """Uses LLM to validate business rules and catch domain-specific errors"""
+    
+    def __init__(self, llm_client: Optional[LLMClient] = None,
+                 rule_engine: Optional[EquityRuleEngine] = None):
+        self.llm_client = llm_client or get_default_llm_client()
+        self.rule_engine = rule_engine or EquityRuleEngine.from_file()
+        rules_to_check = "\n".join(
+            f"{number}. {description}"
+            for number, description in enumerate(self.rule_engine.rule_descriptions, 1)
+        )
+        self.prompt = PromptTemplate(
+            "validate_query_logic",
+            static="""
+            You are an equity compensation expert. Review this query and planned workflow for business logic errors.
+            
+            Equity Business Rules to Check:
+            {rules_to_check}
+            
+            Check for:
+            - Impossible combinations (like "exercise RSUs")
+            - Misused terminology (like "83b election for options")
+            - Missing data dependencies
+            - Compliance violations
+            - Logical inconsistencies
+            
+            Return JSON:
+            {{
+                "is_valid": true/false,
+                "warnings": ["Business rule warnings"],
+                "errors": ["Critical errors that would fail"],
+                "suggestions": ["Recommended corrections"],
+                "confidence": 0.85
+            }}
+            """,
+            dynamic="""
+            Parsed Query:
+            {parsed_query}
+            
+            Planned Workflow:
+            {planned_workflow}
+            
+            Rule engine findings (already confirmed):
+            {confirmed_findings}
+            """,
+            rules_to_check=rules_to_check,
+        )
+    
+    @traced("validate")
+    async def validate_query_logic(self, parsed_query: Dict, planned_workflow: List[Dict],
+                                   user_query: str = "") -> Dict[str, Any]:
+        """
+        🤖 LLM USAGE: Validate business logic and catch domain-specific errors
+        
+        LLM can catch subtle business rule violations that would be hard to code manually.
+        The compiled rule engine answers first; the LLM is only consulted when
+        the rules cover too little of the query or flag something for review.
+        """
+        
+        # 🔧 NON-LLM: Mechanical rules are checked locally in microseconds
+        local_result = self.rule_engine.evaluate(parsed_query, planned_workflow, user_query)
+        if local_result["errors"] or not local_result["needs_llm_review"]:
+            logger.info("⚡ Rule engine validation: %s errors, %s warnings (coverage %.2f)",
+                        len(local_result["errors"]), len(local_result["warnings"]), local_result["coverage"])
+            return local_result
+        
+        confirmed_findings = {key: local_result[key] for key in ("warnings", "ambiguities")}
+        messages = self.prompt.render(
+            parsed_query=json.dumps(parsed_query, indent=2),
+            planned_workflow=json.dumps(planned_workflow, indent=2),
+            confirmed_findings=json.dumps(confirmed_findings, indent=2),
+        )
+        
+        logger.info("🤖 LLM CALL #3: Business Validation")
+        
+        response = await self.llm_client.chat(
+            model="gpt-4",
+            messages=messages,
+            temperature=0.1,
+            max_tokens=800
+        )
+        
+        try:
+            validation_result = json.loads(response.choices[0].message.content)
+            logger.info("   ✅ Business validation complete")
+            for key in ("warnings", "errors", "suggestions"):
+                merged = local_result[key] + list(validation_result.get(key) or [])
+                validation_result[key] = list(dict.fromkeys(merged))
+            validation_result["is_valid"] = bool(validation_result.get("is_valid", True)) and local_result["is_valid"]
+            validation_result["coverage"] = local_result["coverage"]
+            validation_result["source"] = "rule_engine+llm"
+            if validation_result.get("warnings"):
+                logger.info("   ⚠️  Warnings: %s", len(validation_result["warnings"]))
+            return validation_result
+        except Exception:
+            return local_result
+
+# ============================================================================
+# LLM USAGE POINTS #1-3 (FUSED): PARSE, PLAN AND VALIDATE IN ONE CALL
+# ============================================================================
+
+class LLMFusedFrontEnd:
+    """Uses one LLM call to parse, plan and validate a query together
+    
+    The staged classes re-send overlapping context (domain knowledge, tools,
+    rules) across three calls. Here one prompt carries it once and returns all
+    three sections; each section is schema-checked and, if it fails, rebuilt by
+    the corresponding staged class alone. A fused plan outlives a rebuilt parse
+    when it still agrees with it (right query tool, no conflicting filters).
+    
+    The fused call bypasses the local parser and the parse and plan caches, so
+    it only wins where those rarely hit; ``front_end_mode`` defaults to "staged".
+    """
+    
+    # Parsed target -> the query tool a plan for it must contain
+    TARGET_TOOLS = {
+        "participants": "query_participants", "grants": "query_grants", "companies": "query_companies",
+    }
+    
+    def __init__(self, query_parser: LLMQueryParser, workflow_planner: LLMWorkflowPlanner,
+                 business_validator: LLMBusinessValidator, llm_client: Optional[LLMClient] = None):
+        self.query_parser = query_parser
+        self.workflow_planner = workflow_planner
+        self.business_validator = business_validator
+        self.llm_client = llm_client or query_parser.llm_client
+        rules_to_check = "\n".join(
+            f"{number}. {description}"
+            for number, description in enumerate(business_validator.rule_engine.rule_descriptions, 1)
+        )
+        self.prompt = PromptTemplate(
+            "fused_front_end",
+            static="""
+            You are an expert equity plan management system. In ONE response, parse this
+            natural language query, plan the workflow that answers it, and validate both
+            against the equity business rules.
+            
+            Equity Domain Knowledge:
+            {domain_knowledge}
+            
+            Available Tools:
+            {available_tools}
+            
+            Tool Capabilities:
+            {tool_capabilities}
+            
+            Equity Business Rules to Check:
+            {rules_to_check}
+            
+            Return ONE JSON object with exactly these sections:
+            {{
+                "parsed_query": {{
+                    "entities": {{
+                        "target": "what user wants (participants, grants, companies, etc)",
+                        "filters": {{
+                            "department": "if mentioned",
+                            "security_type": "if specified",
+                            "participant_type": "employee/officer/director",
+                            "time_context": "any time expressions"
+                        }}
+                    }},
+                    "intent": {{
+                        "primary_action": "query/analyze/generate/send",
+                        "output_format": "list/report/email/summary",
+                        "data_scope": "single_company/multi_company/benchmark"
+                    }},
+                    "confidence": 0.85
+                }},
+                "workflow": [
+                    {{
+                        "step_id": 1,
+                        "tool": "calculate_date_range",
+                        "description": "Parse 'this quarter' into specific dates",
+                        "params": {{"expression": "this quarter"}},
+                        "dependencies": []
+                    }}
+                ],
+                "validation": {{
+                    "is_valid": true,
+                    "warnings": ["Business rule warnings"],
+                    "errors": ["Critical errors that would fail"],
+                    "suggestions": ["Recommended corrections"],
+                    "confidence": 0.85
+                }}
+            }}
+            """,
+            dynamic="""
+            User Query: "{user_query}"
+            
+            Relevant Schema, Definitions and Examples:
+            {context}
+            """,
+            domain_knowledge=EQUITY_DOMAIN_KNOWLEDGE,
+            available_tools=json.dumps(workflow_planner.available_tools),
+            tool_capabilities=TOOL_CAPABILITIES,
+            rules_to_check=rules_to_check,
+        )
+    
+    @traced("front_end")
+    async def process(self, user_query: str) -> Tuple[Dict[str, Any], List[Dict], Dict[str, Any]]:
+        """
+        🤖 LLM USAGE: Return (parsed_query, planned_workflow, validation) from one call
+        """
+        
+        rule_engine = self.business_validator.rule_engine
+        messages = self.query_parser.prompt_compiler.render(
+            self.prompt, context_query=user_query, user_query=user_query
+        )
+        
+        logger.info("🤖 LLM CALL #1-3 (fused): Parse + Plan + Validate")
+        logger.info("   Input: '%s'", user_query)
+        
+        response = await self.llm_client.chat(
+            model="gpt-4",
+            messages=messages,
+            temperature=0.1,
+            max_tokens=2500
+        )
+        
+        try:
+            fused = json.loads(response.choices[0].message.content)
+        except json.JSONDecodeError as e:
+            logger.warning("   ❌ Fused response was not JSON: %s", e)
+            fused = {}
+        if not isinstance(fused, dict):
+            fused = {}
+        
+        # 🔧 NON-LLM: Schema-check each section; rebuild only the ones that fail
+        parsed_query = fused.get("parsed_query")
+        parse_ok = self._check_parsed_query(parsed_query)
+        if parse_ok:
+            # The plan needs the time phrase, so it stays in the prompt; the dates are still ours
+            _, time_ranges = self.query_parser.time_engine.strip(user_query)
+            parsed_query = self.query_parser.attach_time_ranges(parsed_query, time_ranges)
+        else:
+            logger.info("   ↩️  Parsed section failed schema check: falling back to staged parser")
+            parsed_query = await self.query_parser.parse_query(user_query)
+        
+        workflow = fused.get("workflow")
+        workflow_ok = self._check_workflow(workflow) and (parse_ok or self._plan_agrees(workflow, parsed_query))
+        if not workflow_ok:
+            logger.info("   ↩️  Workflow section unusable: falling back to staged planner")
+            workflow = await self.workflow_planner.plan_workflow(parsed_query)
+        
+        validation = fused.get("validation")
+        if not (workflow_ok and self._check_validation(validation)):
+            # The fused verdict is only meaningful for the fused plan
+            logger.info("   ↩️  Validation section unusable: falling back to staged validator")
+            validation = await self.business_validator.validate_query_logic(
+                parsed_query, workflow, user_query
+            )
+            return parsed_query, workflow, validation
+        
+        # The deterministic rules still have the final say
+        local_result = rule_engine.evaluate(parsed_query, workflow, user_query)
+        for key in ("warnings", "errors", "suggestions"):
+            validation[key] = list(dict.fromkeys(local_result[key] + list(validation.get(key) or [])))
+        validation["is_valid"] = validation["is_valid"] and local_result["is_valid"]
+        validation["source"] = "fused+rule_engine"
+        logger.info("   ✅ Fused front-end: %s steps, valid=%s", len(workflow), validation["is_valid"])
+        return parsed_query, workflow, validation
+    
+    @staticmethod
+    def _check_parsed_query(section) -> bool:
+        return (isinstance(section, dict)
+                and isinstance(section.get("entities"), dict)
+                and isinstance(section.get("intent"), dict)
+                and isinstance(section.get("confidence", 0.0), (int, float)))
+    
+    def _check_workflow(self, section) -> bool:
+        if not isinstance(section, list) or not section:
+            return False
+        for step in section:
+            if not (isinstance(step, dict)
+                    and step.get("tool") in self.workflow_planner.available_tools
+                    and isinstance(step.get("params", {}), dict)
+                    and isinstance(step.get("dependencies", []), list)):
+                return False
+        try:
+            WorkflowDAGExecutor({}).build_graph(section)
+        except WorkflowGraphError:
+            return False
+        return True
+    
+    @classmethod
+    def _plan_agrees(cls, workflow: List[Dict], parsed_query: Dict[str, Any]) -> bool:
+        """Whether a fused plan fits the staged parse that replaced its own"""
+        entities = parsed_query.get("entities") or {}
+        query_tool = cls.TARGET_TOOLS.get(str(entities.get("target", "")).strip().lower())
+        if query_tool is not None and all(step.get("tool") != query_tool for step in workflow):
+            return False
+        
+        def canonical(value) -> List[str]:
+            values = value if isinstance(value, list) else [value]
+            return sorted(str(item).strip().casefold() for item in values
+                          if item is not None and str(item).strip().lower() not in PlanTemplateCache.ABSENT_VALUES)
+        
+        filters = {name: canonical(value) for name, value in (entities.get("filters") or {}).items()}
+        for step in workflow:
+            for name, value in (step.get("params") or {}).items():
+                if filters.get(name) and canonical(value) != filters[name]:
+                    return False
+        return True
+    
+    @staticmethod
+    def _check_validation(section) -> bool:
+        return (isinstance(section, dict)
+                and isinstance(section.get("is_valid"), bool)
+                and all(isinstance(section.get(key, []), list)
+                        for key in ("warnings", "errors", "suggestions")))
+
+# ============================================================================
+# LLM USAGE POINT #4: RESULT SYNTHESIS AND EXPLANATION
+# ============================================================================
+
+class LLMResultSynthesizer:
+    """Uses LLM to create human-readable explanations from raw data"""
+    
+    PROMPT = PromptTemplate(
+        "synthesize_results",
+        static="""
+        You are an equity compensation analyst. Create a clear, actionable summary of query results.
+        
+        Execution Results are a digest per step: row counts, group counts, numeric
+        sum/min/max, date ranges and top example rows.
+        
+        Create a business-friendly summary with:
+        1. Executive summary (1-2 sentences answering the user's question)
+        2. Key findings (3-5 bullet points with numbers/metrics)
+        3. Business insights (what this means for the business)
+        4. Recommended next actions (specific, actionable steps)
+        5. Important caveats or limitations
+        
+        Return JSON:
+        {{
+            "executive_summary": "Clear answer to user's question",
+            "key_findings": [
+                "Finding 1 with specific numbers",
+                "Finding 2 with context"
+            ],
+            "business_insights": [
+                "What this means for retention",
+                "Compliance implications"
+            ],
+            "recommended_actions": [
+                "Specific step 1",
+                "Specific step 2"
+            ],
+            "caveats": ["Important limitations"],
+            "confidence_level": "high/medium/low"
+        }}
+        
+        Use business language, not technical jargon. Focus on actionable insights.
+        """,
+        dynamic="""
+        Original User Query: "{original_query}"
+        
+        Execution Results:
+        {results_digest}
+        
+        Execution Context:
+        - Total steps executed: {total_steps}
+        - Data sources used: {data_sources}
+        - Processing time: {duration_seconds} seconds
+        """,
+    )
+    
+    def __init__(self, llm_client: Optional[LLMClient] = None,
+                 digester: Optional[ResultDigester] = None,
+                 cache: Optional[LRUTTLCache] = None):
+        self.llm_client = llm_client or get_default_llm_client()
+        self.digester = digester or ResultDigester()
+        self.cache = cache  # digest hash -> synthesis; None disables
+    
+    @staticmethod
+    def cache_key(original_query: str, results_digest: Dict, execution_context: Dict) -> str:
+        """Content hash of everything the prompt says about the results (timings excluded)"""
+        payload = json.dumps([original_query.strip(), results_digest, execution_context.get("total_steps", 0),
+                              execution_context.get("data_sources", [])], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        synthesis = self.cache.get(key)
+        trace_cache("synthesis", synthesis is not None)
+        return copy.deepcopy(synthesis)  # Callers add fields (e.g. generated_email) to the result
+    
+    @traced("synthesize")
+    async def synthesize_results(self, original_query: str, workflow_results: Dict, 
+                                execution_context: Dict) -> Dict[str, Any]:
+        """
+        🤖 LLM USAGE: Transform raw data into business-friendly explanations
+        
+        This is where LLM excels - creating contextual, actionable summaries
+        that business users can understand and act upon.
+        """
+        
+        # 🔧 NON-LLM: Summarize rows locally so prompt size is flat in the result size
+        results_digest = self.digester.digest(workflow_results)
+        key = self.cache_key(original_query, results_digest, execution_context)
+        cached = self._cached(key)
+        if cached is not None:
+            logger.info("⚡ Synthesis cache hit: identical results digest")
+            return cached
+        messages = self._build_messages(original_query, results_digest, execution_context)
+        
+        logger.info("🤖 LLM CALL #4: Result Synthesis")
+        logger.info("   Input: %s workflow results (~%s digest tokens)",
+                    len(workflow_results), self.digester.estimate_tokens(results_digest))
+        
+        response = await self.llm_client.chat(
+            model="gpt-4",
+            messages=messages,
+            temperature=0.3,  # Allow some creativity for insights
+            max_tokens=1500
+        )
+        
+        try:
+            synthesis = json.loads(response.choices[0].message.content)
+            logger.info("   ✅ Results synthesized successfully")
+            logger.info("   📊 Confidence: %s", synthesis.get("confidence_level", "N/A"))
+            if self.cache is not None and isinstance(synthesis, dict):
+                self.cache.put(key, copy.deepcopy(synthesis))
+            return synthesis
+        except Exception:
+            return self._fallback_synthesis(original_query, workflow_results)
+    
+    async def synthesize_results_stream(self, original_query: str, workflow_results: Dict,
+                                        execution_context: Dict) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        🤖 LLM USAGE: Streaming synthesize_results - yields (field, value) as each field completes
+        
+        The executive summary comes first in the requested JSON, so users see the
+        answer while the findings and recommendations are still being generated.
+        """
+        
+        results_digest = self.digester.digest(workflow_results)
+        key = self.cache_key(original_query, results_digest, execution_context)
+        cached = self._cached(key)
+        if cached is not None:
+            for field, value in cached.items():
+                yield field, value
+            return
+        messages = self._build_messages(original_query, results_digest, execution_context)
+        
+        logger.info("🤖 LLM CALL #4: Result Synthesis (streaming)")
+        
+        parser = IncrementalJSONParser()
+        streamed = {}
+        async for delta in self.llm_client.stream_chat(
+            model="gpt-4",
+            messages=messages,
+            temperature=0.3,
+            max_tokens=1500,
+            stage="synthesize",
+        ):
+            for field, value in parser.feed(delta):
+                streamed[field] = value
+                yield field, value
+        
+        if parser.done and self.cache is not None:  # Only a complete object is reusable
+            self.cache.put(key, copy.deepcopy(streamed))
+        if not streamed:
+            for field, value in self._fallback_synthesis(original_query, workflow_results).items():
+                yield field, value
+    
+    def _build_messages(self, original_query: str, results_digest: Dict,
+                        execution_context: Dict) -> List[Dict[str, str]]:
+        return self.PROMPT.render(
+            original_query=original_query,
+            results_digest=json.dumps(results_digest, default=str),
+            total_steps=execution_context.get('total_steps', 0),
+            data_sources=execution_context.get('data_sources', []),
+            duration_seconds=execution_context.get('duration_seconds', 0),
+        )
+    
+    def _fallback_synthesis(self, query: str, results: Dict) -> Dict:
+        """🔧 NON-LLM: Simple template-based result formatting"""
+        return {
+            "executive_summary": "Query executed successfully",
+            "key_findings": ["Results available"],
+            "recommended_actions": ["Review the data"]
+        }
+
+# ============================================================================
+# NON-LLM COMPONENTS (FOR COMPARISON)
+# ============================================================================
+
+class NonLLMComponents:
+    """These components do NOT use LLMs - they're traditional code"""
+    
+    def __init__(self, sql_engine: Optional[SQLExecutionEngine] = None,
+                 time_engine: Optional[TimeExpressionEngine] = None,
+                 result_cache: Optional[VersionedResultCache] = None,
+                 permission_index: Optional[PermissionIndex] = None):
+        self.sql_engine = sql_engine
+        self.time_engine = time_engine or TimeExpressionEngine()
+        self.result_cache = result_cache  # None: every query goes to the database
+        self.permission_index = permission_index  # None: every permission check fails
+    
+    async def execute_sql_query(self, sql: str, params: List,
+                                columnar: bool = False) -> Union[List[Dict], ColumnarResultSet]:
+        """🔧 NON-LLM: Database operations are pure SQL/code"""
+        # This is traditional database interaction
+        # No LLM needed - just execute SQL and return results
+        if self.result_cache is not None:
+            return await self.result_cache.execute(sql, params, columnar=columnar)
+        return await self.sql_engine.execute(sql, params, columnar=columnar)
+    
+    def calculate_date_ranges(self, expression: str) -> Optional[Dict]:
+        """🔧 NON-LLM: Date calculations can be pure code logic"""
+        # While we COULD use LLM here, date math can be traditional code
+        # LLM only helps if we want to handle very complex date expressions
+        return self.time_engine.date_range(expression)
+    
+    def format_database_results(self, raw_data: Union[List[Dict], ColumnarResultSet]) -> ColumnarResultSet:
+        """🔧 NON-LLM: Data formatting is straightforward transformation"""
+        # Field mapping, data cleaning, type conversion
+        # No reasoning required - just data transformation
+        if isinstance(raw_data, ColumnarResultSet):
+            return raw_data
+        return ColumnarResultSet.from_rows(
+            {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+            for row in raw_data
+        )
+    
+    def validate_permissions(self, user_id: str, action: str) -> bool:
+        """🔧 NON-LLM: Security logic is rule-based"""
+        # Permission checking is if/then logic
+        # No need for LLM reasoning here - a cached ACL lookup and a set membership test
+        # (an unloadable permissions file raises PermissionsUnavailable)
+        if self.permission_index is None:
+            return False
+        acl = self.permission_index.acl(user_id)
+        return acl is not None and acl.allows(action)
+
+# ============================================================================
+# MAIN AGENT: ORCHESTRATES ALL LLM AND NON-LLM COMPONENTS
+# ============================================================================
+
+class LLMPoweredEquityAgent:
+    """Main agent showing exactly where LLMs are used vs traditional code"""
+    
+    # Steps whose rows are the people a requested email goes to
+    RECIPIENT_TOOLS = ("query_participants", "query_grants")
+    # Steps that already draft or send the email themselves
+    EMAIL_TOOLS = ("generate_email", "send_notification")
+    
+    def __init__(self, config: Dict):
+        # One shared client: pooled connections, per-model limits, retries
+        self.llm_client = config.get("llm_client") or LLMClient(
+            backend=config.get("llm_backend"),
+            max_concurrency_per_model=config.get("llm_concurrency_per_model", 4),
+            max_retries=config.get("llm_max_retries", 3),
+        )
+        self.query_timeout = config.get("query_timeout_seconds", 120.0)
+        # Tracing is off unless asked for; the NullTracer makes every hook a no-op
+        self.tracer = config.get("tracer") or (
+            Tracer(window=config.get("trace_window", 1024)) if config.get("tracing", False) else NullTracer()
+        )
+        self.speculative_execution = config.get("speculative_execution", False)
+        self.front_end_mode = config.get("front_end_mode", "staged")
+        if self.front_end_mode not in ("staged", "fused"):
+            raise ValueError(f"front_end_mode must be 'staged' or 'fused', not {self.front_end_mode!r}")
+        
+        self.time_engine = TimeExpressionEngine(
+            fiscal_year_start_month=config.get("fiscal_year_start_month", 1),
+            upcoming_days=config.get("upcoming_window_days", 90),
+        )
+        # Without a db_path the agent runs on a private in-memory demo database
+        db_path = config.get("db_path") or f"file:equity_demo_{id(self)}?mode=memory&cache=shared"
+        self.sql_engine = SQLExecutionEngine(
+            db_path,
+            pool_size=config.get("db_pool_size", 4),
+            query_timeout=config.get("sql_timeout_seconds", 10.0),
+            max_rows=config.get("sql_max_rows", 10000),
+        )
+        # Query steps return ColumnarResultSets; raw_data is converted to dicts on the way out
+        self.columnar_results = config.get("columnar_results", True)
+        self.vesting_calendar = VestingCalendar(
+            self.sql_engine, refresh_seconds=config.get("vesting_refresh_seconds", 300.0)
+        )
+        if not config.get("db_path"):
+            seed_demo_database(db_path)
+        
+        # Parse cache: in-memory LRU + TTL, optionally persisted to sqlite
+        parse_cache = None
+        if config.get("parse_cache_size", 1024) > 0:
+            parse_cache = LRUTTLCache(
+                max_entries=config.get("parse_cache_size", 1024),
+                ttl_seconds=config.get("parse_cache_ttl_seconds", 86400.0),
+                disk_path=config.get("parse_cache_path"),
+                namespace="parse_cache",
+            )
+        
+        # Local fast path: queries made only of known vocabulary never reach the LLM
+        local_parser = None
+        if config.get("local_parse_threshold", 0.85) is not None:
+            local_parser = LocalQueryParser.from_file(
+                config.get("validation_rules_path", DEFAULT_RULES_PATH),
+                sql_engine=self.sql_engine,
+                refresh_seconds=config.get("vocabulary_refresh_seconds", 300.0),
+            )
+        
+        self.entity_index = EntityResolutionIndex(
+            self.sql_engine, refresh_seconds=config.get("vocabulary_refresh_seconds", 300.0)
+        )
+        
+        # Prompts: cached static prefixes; only the schema a query touches is sent
+        self.prompt_compiler = PromptCompiler(
+            config.get("prompt_knowledge_path", DEFAULT_PROMPT_KNOWLEDGE_PATH),
+            context_token_budget=config.get("prompt_context_token_budget", 300),
+        )
+        
+        # LLM-powered components
+        self.query_parser = LLMQueryParser(
+            self.llm_client, cache=parse_cache, normalizer=QueryNormalizer(self.time_engine),
+            local_parser=local_parser,
+            local_confidence_threshold=config.get("local_parse_threshold", 0.85),
+            prompt_compiler=self.prompt_compiler,
+        )
+        plan_cache = None
+        if config.get("plan_cache_size", 256) > 0:
+            plan_cache = PlanTemplateCache(
+                max_entries=config.get("plan_cache_size", 256),
+                ttl_seconds=config.get("plan_cache_ttl_seconds", 7 * 86400.0),
+                disk_path=config.get("plan_cache_path"),
+            )
+        self.workflow_planner = LLMWorkflowPlanner(self.llm_client, plan_cache=plan_cache)
+        rule_engine = EquityRuleEngine.from_file(
+            config.get("validation_rules_path", DEFAULT_RULES_PATH),
+            known_tools=self.workflow_planner.available_tools,
+        )
+        self.business_validator = LLMBusinessValidator(self.llm_client, rule_engine=rule_engine)
+        synthesis_cache = None
+        if config.get("synthesis_cache_size", 256) > 0:
+            synthesis_cache = LRUTTLCache(
+                max_entries=config.get("synthesis_cache_size", 256),
+                ttl_seconds=config.get("synthesis_cache_ttl_seconds", 86400.0),
+                namespace="synthesis",
+            )
+        self.result_synthesizer = LLMResultSynthesizer(
+            self.llm_client,
+            digester=ResultDigester(token_budget=config.get("synthesis_token_budget", 1500)),
+            cache=synthesis_cache,
+        )
+        self.communication_generator = LLMCommunicationGenerator(self.llm_client)
+        notification_sink = config.get("notification_sink")
+        if notification_sink is None and config.get("notification_outbox_path"):
+            notification_sink = FileEmailSink(config["notification_outbox_path"])
+        self.bulk_communicator = BulkCommunicationPipeline(
+            self.communication_generator,
+            sink=notification_sink,
+            chunk_size=config.get("notification_chunk_size", 500),
+            max_in_flight=config.get("notification_max_in_flight", 4),
+        )
+        self.fused_front_end = LLMFusedFrontEnd(
+            self.query_parser, self.workflow_planner, self.business_validator, self.llm_client
+        )
+        
+        # Non-LLM components  
+        # Step results are reused until a table they read is written (see table_versions)
+        result_cache = None
+        if config.get("result_cache_size", 512) > 0:
+            result_cache = VersionedResultCache(
+                self.sql_engine,
+                max_entries=config.get("result_cache_size", 512),
+                ttl_seconds=config.get("result_cache_ttl_seconds", 3600.0),
+            )
+        self.database_connector = NonLLMComponents(self.sql_engine, self.time_engine, result_cache)
+        self.permission_index = config.get("permission_index") or PermissionIndex(
+            config.get("permissions_path", DEFAULT_PERMISSIONS_PATH)
+        )
+        self.permission_manager = NonLLMComponents(permission_index=self.permission_index)
+        self.workflow_executor = WorkflowDAGExecutor(
+            tools={
+                "calculate_date_range": self._calculate_dates_traditional,
+                "query_participants": self._query_participants_traditional,
+                "query_companies": self._query_companies_traditional,
+                "query_grants": self._query_grants_traditional,
+                "query_vesting_events": self._query_vesting_events_traditional,
+                "generate_email": self._generate_email_step,
+                "create_report": self._create_report_traditional,
+                "send_notification": self._send_notification_traditional,
+            },
+            max_concurrency=config.get("max_step_concurrency", 8),
+            step_timeout=config.get("step_timeout_seconds", 30.0),
+        )
+        
+    async def process_query(self, user_query: str, user_id: str) -> Dict[str, Any]:
+        """Main processing pipeline showing LLM vs non-LLM usage"""
+        # Every LLM call made for this query shares one end-to-end deadline
+        with llm_deadline(self.query_timeout), track_llm_usage(), \
+                self.tracer.trace("process_query", mode=self.front_end_mode) as span:
+            try:
+                result = await self._process_query_pipeline(user_query, user_id)
+            except PermissionsUnavailable as e:
+                result = self._forbidden(user_query, [str(e)])
+            span.set(status=result["status"])
+            return result
+    
+    async def _process_query_pipeline(self, user_query: str, user_id: str) -> Dict[str, Any]:
+        logger.info("🚀 Processing: '%s'", user_query)
+        logger.info("=" * 60)
+        
+        # 🔧 NON-LLM: Unknown users are turned away before any LLM call is spent on them
+        if not self.permission_manager.validate_permissions(user_id, "query"):
+            return self._forbidden(user_query, [f"User {user_id!r} may not query equity data"])
+        
+        validation = None
+        if self.front_end_mode == "fused":
+            # 🤖 LLM STEPS 1-3 (fused): Parse, plan and validate in one call
+            parsed_query, planned_workflow, validation = await self.fused_front_end.process(user_query)
+            clarification = await self._resolve_entities(user_query, parsed_query, planned_workflow)
+            if clarification is not None:
+                return clarification
+        else:
+            # 🤖 LLM STEP 1: Parse natural language query
+            parsed_query = await self.query_parser.parse_query(user_query)
+            clarification = await self._resolve_entities(user_query, parsed_query)
+            if clarification is not None:
+                return clarification
+            
+            # 🤖 LLM STEP 2: Plan optimal workflow  
+            planned_workflow = await self.workflow_planner.plan_workflow(parsed_query)
+        
+        denied = self._denied_steps(user_id, planned_workflow)
+        if denied:
+            return self._forbidden(user_query, denied)
+        
+        # 🤖 LLM STEP 3: Validate business logic (already done in fused mode)
+        # 🔧 NON-LLM STEP 4: Execute workflow (database operations, calculations)
+        try:
+            validation, workflow_results = await self._validate_and_execute(
+                user_query, parsed_query, planned_workflow, user_id, validation
+            )
+        except WorkflowGraphError as e:
+            self.workflow_planner.record_outcome(parsed_query, planned_workflow, succeeded=False)
+            return {"status": "error", "errors": [str(e)]}
+        
+        if not validation["is_valid"]:
+            self.workflow_planner.record_outcome(parsed_query, planned_workflow, succeeded=False)
+            return {"status": "error", "errors": validation["errors"]}
+        self.workflow_planner.record_outcome(
+            parsed_query, planned_workflow, succeeded=self._workflow_succeeded(workflow_results)
+        )
+        
+        # 🤖 LLM STEP 5: Synthesize results into business language
+        final_synthesis = await self.result_synthesizer.synthesize_results(
+            user_query, workflow_results, {"total_steps": len(planned_workflow)}
+        )
+        
+        return await self._finish_response(user_query, final_synthesis, workflow_results, planned_workflow)
+    
+    async def process_query_stream(self, user_query: str, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of process_query: yields partial results as they are ready
+        
+        Events, in order of arrival: "parsed", "plan_step" (one per step),
+        "validation", "step_result" (one per finished step), "synthesis_field"
+        (one per synthesis field), then a final "complete" or "error" event
+        whose ``data`` matches what process_query returns.
+        
+        Steps start while the plan is still streaming; as in speculative mode,
+        only read-only tools run before validation passes. Their results are
+        held back until it does, so a rejected plan's rows are never sent.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        # The pipeline task copies the context, so the deadline covers every LLM call in it
+        with llm_deadline(self.query_timeout), track_llm_usage():
+            pipeline = asyncio.ensure_future(
+                self._process_query_stream_pipeline(user_query, user_id, events.put_nowait)
+            )
+        try:
+            while True:
+                event = await events.get()
+                yield event
+                if event["event"] in ("complete", "error"):
+                    break
+            await pipeline
+        finally:
+            if not pipeline.done():
+                pipeline.cancel()
+                await asyncio.gather(pipeline, return_exceptions=True)
+    
+    async def _process_query_stream_pipeline(self, user_query: str, user_id: str,
+                                             emit: Callable[[Dict], None]):
+        try:
+            with self.tracer.trace("process_query_stream", mode="staged") as span:
+                try:
+                    result = await self._stream_pipeline_stages(user_query, user_id, emit)
+                except PermissionsUnavailable as e:
+                    result = self._forbidden(user_query, [str(e)])
+                span.set(status=result["status"])
+        except Exception as e:
+            emit({"event": "error", "data": {"status": "error", "errors": [str(e)]}})
+            raise
+        emit({"event": "complete" if result["status"] == "success" else "error", "data": result})
+    
+    async def _stream_pipeline_stages(self, user_query: str, user_id: str,
+                                      emit: Callable[[Dict], None]) -> Dict[str, Any]:
+        logger.info("🚀 Processing (streaming): '%s'", user_query)
+        logger.info("=" * 60)
+        
+        if not self.permission_manager.validate_permissions(user_id, "query"):
+            return self._forbidden(user_query, [f"User {user_id!r} may not query equity data"])
+        
+        # 🤖 LLM STEP 1: Parse natural language query
+        parsed_query = await self.query_parser.parse_query(user_query)
+        clarification = await self._resolve_entities(user_query, parsed_query)
+        if clarification is not None:
+            return clarification
+        emit({"event": "parsed", "data": parsed_query})
+        
+        # 🤖 LLM STEP 2 + 🔧 NON-LLM STEP 4: Steps execute as the plan streams in
+        loop = asyncio.get_running_loop()
+        gate = loop.create_future()
+        plan_complete = loop.create_future()
+        planned_workflow: List[Dict] = []
+        held_results: Optional[List[Dict]] = []  # None once validation has passed
+        
+        def on_result(step_id, result):
+            event = {"event": "step_result", "step_id": step_id, "data": ColumnarResultSet.materialize(result)}
+            if held_results is None:
+                emit(event)
+            else:
+                held_results.append(event)
+        
+        async def streamed_steps():
+            async for step in self.workflow_planner.plan_workflow_stream(parsed_query):
+                planned_workflow.append(step)
+                emit({"event": "plan_step", "data": step})
+                yield step
+            plan_complete.set_result(True)
+        
+        execution = asyncio.ensure_future(self.workflow_executor.execute_streaming(
+            streamed_steps(), {"user_id": user_id}, gate=gate, on_result=on_result,
+        ))
+        try:
+            await asyncio.wait({plan_complete, execution}, return_when=asyncio.FIRST_COMPLETED)
+            if not plan_complete.done():
+                execution.result()  # Planning or scheduling failed: raise it
+            
+            # Steps that started early were checked one by one by the tools themselves
+            denied = self._denied_steps(user_id, planned_workflow)
+            if denied:
+                execution.cancel()
+                await asyncio.gather(execution, return_exceptions=True)
+                return self._forbidden(user_query, denied)
+            
+            # 🤖 LLM STEP 3: Validate business logic once the whole plan is known
+            validation = await self.business_validator.validate_query_logic(
+                parsed_query, planned_workflow, user_query
+            )
+        except BaseException:
+            execution.cancel()
+            await asyncio.gather(execution, return_exceptions=True)
+            raise
+        emit({"event": "validation", "data": validation})
+        
+        if not validation["is_valid"]:
+            execution.cancel()
+            await asyncio.gather(execution, return_exceptions=True)
+            self.workflow_planner.record_outcome(parsed_query, planned_workflow, succeeded=False)
+            return {"status": "error", "errors": validation["errors"]}
+        for event in held_results:
+            emit(event)
+        held_results = None
+        gate.set_result(True)
+        try:
+            workflow_results = await execution
+        except WorkflowGraphError as e:
+            self.workflow_planner.record_outcome(parsed_query, planned_workflow, succeeded=False)
+            return {"status": "error", "errors": [str(e)]}
+        self.workflow_planner.record_outcome(
+            parsed_query, planned_workflow, succeeded=self._workflow_succeeded(workflow_results)
+        )
+        
+        # 🤖 LLM STEP 5: Stream the synthesis field by field
+        final_synthesis = {}
+        async for field, value in self.result_synthesizer.synthesize_results_stream(
+            user_query, workflow_results, {"total_steps": len(planned_workflow)}
+        ):
+            final_synthesis[field] = value
+            emit({"event": "synthesis_field", "field": field, "data": value})
+        
+        return await self._finish_response(user_query, final_synthesis, workflow_results, planned_workflow)
+    
+    def _denied_steps(self, user_id: str, planned_workflow: List[Dict]) -> List[str]:
+        """🔧 NON-LLM: One error per planned tool whose action the user lacks"""
+        denied = []
+        for step in planned_workflow:
+            action = PermissionIndex.TOOL_ACTIONS.get(step.get("tool"))
+            if action is not None and not self.permission_manager.validate_permissions(user_id, action):
+                denied.append(f"Step {step.get('step_id')} ({step.get('tool')}) needs '{action}' permission")
+        return denied
+    
+    @staticmethod
+    def _forbidden(user_query: str, errors: List[str]) -> Dict[str, Any]:
+        logger.warning("   🔒 Forbidden: %s", "; ".join(errors))
+        return {"status": "forbidden", "query": user_query, "errors": errors}
+    
+    def _caller_acl(self, context: Optional[Dict], action: str) -> UserACL:
+        """🔧 NON-LLM: The calling user's ACL; a tool refuses to run without ``action``"""
+        user_id = (context or {}).get("user_id")
+        if not self.permission_manager.validate_permissions(user_id, action):
+            raise PermissionDenied(f"User {user_id!r} may not {action}")
+        return self.permission_index.acl(user_id)
+    
+    @traced("resolve_entities")
+    async def _resolve_entities(self, user_query: str, parsed_query: Dict,
+                                planned_workflow: Optional[List[Dict]] = None) -> Optional[Dict[str, Any]]:
+        """🔧 NON-LLM: Canonicalize entity filters; ask the user about unknown ones"""
+        await self.entity_index.refresh()
+        filters = (parsed_query.get("entities") or {}).get("filters") or {}
+        unresolved = self.entity_index.resolve_filters(filters)
+        for step in planned_workflow or []:
+            unresolved += self.entity_index.resolve_filters(step.get("params") or {})
+        if not unresolved:
+            return None
+        
+        decisions = list({(item["column"], item["text"].lower()): item for item in unresolved}.values())
+        needs_clarification = any(
+            item["decision"] == EntityResolutionIndex.CLARIFICATION_NEEDED for item in decisions
+        )
+        logger.info("   ❓ %s entity value(s) need the user: %s",
+                    len(decisions), [item["text"] for item in decisions])
+        return {
+            "status": "clarification_needed" if needs_clarification else "confirmation_needed",
+            "query": user_query,
+            "message": " ".join(item["message"] for item in decisions),
+            "entities": decisions,
+        }
+    
+    async def _finish_response(self, user_query: str, final_synthesis: Dict,
+                               workflow_results: Dict, planned_workflow: List[Dict]) -> Dict[str, Any]:
+        # 🤖 LLM STEP 6: Generate communications if needed (unless the plan already did)
+        planned_tools = {step.get("tool") for step in planned_workflow}
+        if "email" in user_query.lower() and planned_tools.isdisjoint(self.EMAIL_TOOLS):
+            recipients = self._upstream_rows({"upstream": {
+                step["step_id"]: workflow_results.get(step["step_id"])
+                for step in planned_workflow if step.get("tool") in self.RECIPIENT_TOOLS
+            }})
+            email_content = await self.communication_generator.generate_email(
+                list(itertools.islice(recipients, 3)),
+                final_synthesis.get("executive_summary", ""),
+                total_recipients=len(recipients),
+            )
+            final_synthesis["generated_email"] = email_content
+        
+        usage = _llm_usage.get() or {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        return {
+            "status": "success",
+            "query": user_query,
+            "llm_calls_made": usage["calls"],  # Calls this request actually made
+            "token_usage": {"prompt": usage["prompt_tokens"], "completion": usage["completion_tokens"]},
+            "synthesis": final_synthesis,
+            "raw_data": ColumnarResultSet.materialize(workflow_results)  # Plain dicts at the API edge
+        }
+    
+    async def _validate_and_execute(self, user_query: str, parsed_query: Dict,
+                                    planned_workflow: List[Dict], user_id: str,
+                                    validation: Optional[Dict] = None):
+        """Return (validation, workflow_results); results are None if validation failed
+        
+        In speculative mode the read-only steps start while validation is still
+        in flight; side-effecting steps wait behind a gate until it passes, and
+        everything is cancelled if it fails. A ``validation`` computed earlier
+        (fused mode) is used as-is.
+        """
+        if validation is not None:
+            if not validation["is_valid"]:
+                return validation, None
+            return validation, await self._execute_workflow_non_llm(planned_workflow, user_id)
+        
+        if not self.speculative_execution:
+            validation = await self.business_validator.validate_query_logic(
+                parsed_query, planned_workflow, user_query
+            )
+            if not validation["is_valid"]:
+                return validation, None
+            return validation, await self._execute_workflow_non_llm(planned_workflow, user_id)
+        
+        gate = asyncio.get_running_loop().create_future()
+        execution = asyncio.ensure_future(
+            self.workflow_executor.execute(planned_workflow, {"user_id": user_id}, gate=gate)
+        )
+        try:
+            validation = await self.business_validator.validate_query_logic(
+                parsed_query, planned_workflow, user_query
+            )
+        except BaseException:
+            execution.cancel()
+            await asyncio.gather(execution, return_exceptions=True)
+            raise
+        
+        if not validation["is_valid"]:
+            execution.cancel()
+            await asyncio.gather(execution, return_exceptions=True)
+            logger.warning("   🛑 Validation failed: speculative steps cancelled")
+            return validation, None
+        gate.set_result(True)
+        return validation, await execution
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """🔧 NON-LLM: Hit/miss/eviction counters for every enabled cache"""
+        stats = {}
+        if self.query_parser.cache is not None:
+            stats["parse"] = dict(self.query_parser.cache.stats)
+        if self.workflow_planner.plan_cache is not None:
+            stats["plan"] = dict(self.workflow_planner.plan_cache.templates.stats)
+        if self.database_connector.result_cache is not None:
+            result_cache = self.database_connector.result_cache
+            stats["step_results"] = {**result_cache.entries.stats, **result_cache.stats}
+        if self.result_synthesizer.cache is not None:
+            stats["synthesis"] = dict(self.result_synthesizer.cache.stats)
+        stats["permissions"] = dict(self.permission_index.stats)
+        return stats
+    
+    @staticmethod
+    def _workflow_succeeded(workflow_results: Dict) -> bool:
+        return not any(
+            isinstance(output, dict) and output.get("status") in ("failed", "skipped")
+            for output in workflow_results.values()
+        )
+    
+    async def _execute_workflow_non_llm(self, workflow: List[Dict], user_id: str) -> Dict:
+        """🔧 NON-LLM: Execute workflow steps using traditional code"""
+        # This is where the actual data retrieval happens
+        # SQL queries, API calls, data processing - no LLM needed
+        # Just following the plan that the LLM created, in dependency order
+        return await self.workflow_executor.execute(workflow, {"user_id": user_id})
+    
+    async def _query_participants_traditional(self, params: Dict, context: Optional[Dict] = None) -> List[Dict]:
+        """🔧 NON-LLM: Traditional database query execution"""
+        # Generate SQL, execute query, format results
+        # No LLM involved - just database operations
+        sql, sql_params = EquityQueryBuilder.participants(params, self._caller_acl(context, "query"))
+        return await self.database_connector.execute_sql_query(sql, sql_params, columnar=self.columnar_results)
+    
+    async def _query_companies_traditional(self, params: Dict, context: Optional[Dict] = None) -> List[Dict]:
+        """🔧 NON-LLM: Traditional company lookup for portfolio queries"""
+        sql, sql_params = EquityQueryBuilder.companies(params, self._caller_acl(context, "query"))
+        return await self.database_connector.execute_sql_query(sql, sql_params, columnar=self.columnar_results)
+    
+    async def _query_grants_traditional(self, params: Dict, context: Optional[Dict] = None) -> List[Dict]:
+        """🔧 NON-LLM: Traditional equity grant lookup"""
+        sql, sql_params = EquityQueryBuilder.grants(params, self._caller_acl(context, "query"))
+        return await self.database_connector.execute_sql_query(sql, sql_params, columnar=self.columnar_results)
+    
+    async def _query_vesting_events_traditional(self, params: Dict, context: Optional[Dict] = None) -> List[Dict]:
+        """🔧 NON-LLM: Vesting events in a window, by range scan of the vesting calendar"""
+        acl = self._caller_acl(context, "query")
+        await self.vesting_calendar.refresh()
+        window = self._vesting_window(params, context or {})
+        # The calendar holds every grant; the caller's row scope is applied to the window's events
+        events = acl.restrict(self.vesting_calendar.events(window["start_date"], window["end_date"]))
+        award_types = EquityQueryBuilder.award_types(params)
+        if award_types:
+            events = events.filter(award_type=award_types)
+        for key, column in self.vesting_calendar.FILTERS.items():
+            values = EquityQueryBuilder._as_list(params.get(key))
+            if values:
+                events = events.filter(**{column: values})
+        return events if self.columnar_results else events.to_dicts()
+    
+    def _vesting_window(self, params: Dict, context: Dict) -> Dict[str, str]:
+        """Explicit dates, else an upstream calculate_date_range result, else the time phrase"""
+        if params.get("start_date") and params.get("end_date"):
+            return {"start_date": params["start_date"], "end_date": params["end_date"]}
+        for output in context.get("upstream", {}).values():
+            if isinstance(output, dict) and output.get("start_date") and output.get("end_date"):
+                return {"start_date": output["start_date"], "end_date": output["end_date"]}
+        expression = params.get("expression") or params.get("time_context") or "upcoming"
+        window = self.time_engine.date_range(expression)
+        if window is None:
+            raise ValueError(f"Unrecognized time expression: {expression!r}")
+        return window
+    
+    def _calculate_dates_traditional(self, params: Dict, context: Optional[Dict] = None) -> Dict:
+        """🔧 NON-LLM: Traditional date calculation"""
+        # Date math using the local time-expression grammar
+        # No LLM needed for this
+        expression = params.get("expression") or params.get("time_context") or ""
+        date_range = self.database_connector.calculate_date_ranges(expression)
+        if date_range is None:
+            raise ValueError(f"Unrecognized time expression: {expression!r}")
+        return date_range
+    
+    async def _generate_email_step(self, params: Dict, context: Dict) -> Dict:
+        """🤖 LLM USAGE: Workflow step wrapping the communication generator"""
+        self._caller_acl(context, "send")
+        recipients = self._upstream_rows(context)
+        return await self.communication_generator.generate_email(
+            recipients, params.get("context", ""), params.get("email_type", "notification")
+        )
+    
+    def _create_report_traditional(self, params: Dict, context: Dict) -> Dict:
+        """🔧 NON-LLM: Assemble upstream step outputs into a report structure"""
+        self._caller_acl(context, "report")
+        return {
+            "title": params.get("title", "Equity Report"),
+            "sections": {str(step_id): output for step_id, output in context["upstream"].items()},
+        }
+    
+    async def _send_notification_traditional(self, params: Dict, context: Dict) -> Dict:
+        """🔧 NON-LLM: Personalize and send to every recipient (one LLM call at most)"""
+        self._caller_acl(context, "send")
+        recipients = self._upstream_rows(context)
+        # Reuse the template from an upstream generate_email step when there is one
+        email_content = next(
+            (output for output in context.get("upstream", {}).values()
+             if isinstance(output, dict) and "body" in output and "subject" in output),
+            None,
+        )
+        return await self.bulk_communicator.send(
+            recipients, params.get("context", ""), params.get("email_type", "notification"),
+            email_content=email_content,
+        )
+    
+    @staticmethod
+    def _upstream_rows(context: Dict) -> Union[List[Dict], ColumnarResultSet]:
+        """Collect row lists produced by upstream steps (e.g. participants)"""
+        outputs = [output for output in context.get("upstream", {}).values()
+                   if isinstance(output, (list, ColumnarResultSet))]
+        if len(outputs) == 1 and isinstance(outputs[0], ColumnarResultSet):
+            return outputs[0]  # Consumers iterate lazily; no need to copy into dicts
+        rows = []
+        for output in outputs:
+            rows.extend(output)
+        return rows
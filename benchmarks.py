@@ -0,0 +1,412 @@
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from agent import LLMPoweredEquityAgent, NonLLMComponents
+from llm_client import FakeLLMBackend
+from permissions import DEFAULT_PERMISSIONS_PATH, PermissionIndex
+from sql_engine import EquityQueryBuilder, SQLExecutionEngine, seed_demo_database
+from tracing import Tracer, _percentile
+
+# ============================================================================
+# OFFLINE BENCHMARKS: SYNTHETIC LLM BACKEND AND FRONT-END COMPARISON
+# ============================================================================
+
+BENCHMARK_QUERIES = [
+    "Show me Engineering participants hired this quarter and send them an email about vesting",
+    "List all RSUs PSUs NQOs issued in 2023 fiscal year",
+    "Which officers have underwater options?",
+    "How many Sales employees received grants last month?",
+    "Create a report of ISO grants for directors this year",
+    "Email Finance participants with RSUs vesting next quarter",
+]
+
+# Realistic mixed workload for end-to-end runs; every query resolves against the demo database
+BENCHMARK_CORPUS = BENCHMARK_QUERIES + [
+    "Show me Finance officers with PSUs",
+    "List RSU grants issued last quarter",
+    "Which directors hold ISOs?",
+    "How many NQO grants were issued in 2023?",
+    "Show Marketing employees with options",
+    "Create a report of PSU grants for Sales this year",
+    "Email Engineering officers about their upcoming vesting",
+    "List HR participants with RSUs granted since January 2024",
+    "Show me Legal directors and their option grants",
+    "Notify Sales employees with RSUs vesting this month",
+]
+
+# Not in config/permissions.json: benchmarks give it a role on their own PermissionIndex
+BENCHMARK_USER = "benchmark"
+
+
+def benchmark_permission_index(role: str = "admin", path: str = DEFAULT_PERMISSIONS_PATH) -> PermissionIndex:
+    """A PermissionIndex over ``path`` that also gives BENCHMARK_USER ``role``, in memory only"""
+    index = PermissionIndex(path)
+    index.assign_role(BENCHMARK_USER, role)
+    return index
+
+
+_SYNTHETIC_DEPARTMENTS = ("Engineering", "Sales", "Finance", "Marketing", "Legal", "HR")
+_SYNTHETIC_TIME = re.compile(
+    r"\b(?:(?:this|last|next) (?:quarter|month|year|week)|\d{4} fiscal year|fiscal year \d{4}|today)\b"
+)
+
+
+def _synthetic_parse(user_query: str) -> Dict[str, Any]:
+    text = user_query.lower()
+    filters = {}
+    for department in _SYNTHETIC_DEPARTMENTS:
+        if department.lower() in text:
+            filters["department"] = department
+    securities = [name for name in ("RSU", "PSU", "NQO", "ISO", "SAR", "ESPP")
+                  if re.search(rf"\b{name.lower()}s?\b", text)]
+    if "option" in text and not securities:
+        securities = ["options"]
+    if securities:
+        filters["security_type"] = securities if len(securities) > 1 else securities[0]
+    for participant_type in ("officer", "director", "employee"):
+        if participant_type in text:
+            filters["participant_type"] = participant_type
+    time_match = _SYNTHETIC_TIME.search(text)
+    if time_match:
+        filters["time_context"] = time_match.group(0)
+    
+    sends = any(word in text for word in ("email", "send", "notify"))
+    return {
+        "entities": {
+            "target": "grants" if securities and "participant" not in text else "participants",
+            "filters": filters,
+        },
+        "intent": {
+            "primary_action": "send" if sends else ("analyze" if "report" in text else "query"),
+            "output_format": "email" if sends else ("report" if "report" in text else "list"),
+            "data_scope": "single_company",
+        },
+        "business_validation": [],
+        "confidence": 0.9,
+    }
+
+
+def _synthetic_plan(parsed_query: Dict[str, Any]) -> List[Dict]:
+    filters = (parsed_query.get("entities") or {}).get("filters") or {}
+    intent = parsed_query.get("intent") or {}
+    steps = []
+    
+    def add(tool: str, params: Dict, dependencies: List[int]) -> int:
+        steps.append({"step_id": len(steps) + 1, "tool": tool, "description": f"Run {tool}",
+                      "params": params, "dependencies": dependencies})
+        return len(steps)
+    
+    date_step = None
+    if filters.get("time_context"):
+        date_step = add("calculate_date_range", {"expression": filters["time_context"]}, [])
+    query_tool = ("query_grants" if (parsed_query.get("entities") or {}).get("target") == "grants"
+                  else "query_participants")
+    query_params = {key: value for key, value in filters.items() if key != "time_context"}
+    data_step = add(query_tool, query_params, [date_step] if date_step else [])
+    if intent.get("output_format") == "report":
+        add("create_report", {"title": "Equity Report"}, [data_step])
+    if intent.get("primary_action") == "send":
+        email_step = add("generate_email", {"email_type": "notification"}, [data_step])
+        add("send_notification", {}, [data_step, email_step])
+    return steps
+
+
+def synthetic_equity_responder(model: str, messages: List[Dict]) -> str:
+    """Plausible completions for every agent prompt, for offline runs of the full pipeline"""
+    prompt = "".join(message["content"] for message in messages)
+    query_match = re.search(r'User Query: "(.*?)"', prompt)
+    user_query = query_match.group(1) if query_match else ""
+    
+    if "In ONE response, parse this" in prompt:
+        parsed_query = _synthetic_parse(user_query)
+        return json.dumps({
+            "parsed_query": parsed_query,
+            "workflow": _synthetic_plan(parsed_query),
+            "validation": {"is_valid": True, "warnings": [], "errors": [], "suggestions": [],
+                           "confidence": 0.9},
+        })
+    if "Parse this natural language query" in prompt:
+        return json.dumps(_synthetic_parse(user_query))
+    if "workflow planning expert" in prompt:
+        context = prompt.split("Parsed Query Context:", 1)[-1].split("Available Tools:", 1)[0]
+        try:
+            parsed_query = json.loads(context)
+        except json.JSONDecodeError:
+            parsed_query = {}
+        return json.dumps(_synthetic_plan(parsed_query))
+    if "equity compensation expert" in prompt:
+        return json.dumps({"is_valid": True, "warnings": [], "errors": [], "suggestions": [],
+                           "confidence": 0.85})
+    if "equity compensation analyst" in prompt:
+        return json.dumps({
+            "executive_summary": f"Results for: {user_query}",
+            "key_findings": ["Matching records were found"],
+            "business_insights": ["No unusual patterns detected"],
+            "recommended_actions": ["Review the attached data"],
+            "caveats": ["Synthetic benchmark data"],
+            "confidence_level": "medium",
+        })
+    if "Generate a professional email" in prompt:
+        return json.dumps({
+            "subject": "Your equity update",
+            "body": "Dear {{participant_name}},\n\nPlease review your upcoming equity events.",
+            "call_to_action": "Log in to the equity portal",
+            "urgency": "medium",
+            "compliance_notes": ["No investment advice"],
+        })
+    return "{}"
+
+
+def synthetic_backend(latency: float = 0.3, jitter: float = 0.05, seed: Optional[int] = 7,
+                      seconds_per_token: float = 0.002, failure_rate: float = 0.0) -> FakeLLMBackend:
+    """Offline stand-in for GPT-4: plausible answers to every agent prompt with realistic timing"""
+    return FakeLLMBackend(synthetic_equity_responder, latency=latency, jitter=jitter, seed=seed,
+                          seconds_per_token=seconds_per_token, failure_rate=failure_rate)
+
+
+async def benchmark_front_end_modes(queries: Optional[List[str]] = None, iterations: int = 3,
+                                    latency: float = 0.3, jitter: float = 0.05,
+                                    seconds_per_token: float = 0.002) -> Dict[str, Dict[str, float]]:
+    """Compare staged vs fused front-ends on latency and tokens with a synthetic backend
+    
+    Both modes run with every cache and the local parser off, so each query pays
+    for its LLM calls; the rule engine stays on in both. That isolates the one
+    thing fused mode changes. It is not the default configuration: with the
+    local parser and caches on, staged mode skips most front-end calls, while
+    fused mode always makes its one large call and comes out slower.
+    """
+    queries = queries or BENCHMARK_QUERIES
+    report = {}
+    for mode in ("staged", "fused"):
+        backend = synthetic_backend(latency=latency, jitter=jitter, seconds_per_token=seconds_per_token)
+        agent = LLMPoweredEquityAgent({
+            "llm_backend": backend,
+            "front_end_mode": mode,
+            "local_parse_threshold": None,
+            "parse_cache_size": 0,
+            "plan_cache_size": 0,
+            "result_cache_size": 0,
+            "synthesis_cache_size": 0,
+            "permission_index": benchmark_permission_index(),
+        })
+        latencies = []
+        for _ in range(iterations):
+            for query in queries:
+                started = time.monotonic()
+                await agent.process_query(query, user_id=BENCHMARK_USER)
+                latencies.append(time.monotonic() - started)
+        
+        runs = len(latencies)
+        stats = agent.llm_client.stats
+        report[mode] = {
+            "queries": runs,
+            "mean_latency_s": sum(latencies) / runs,
+            "p95_latency_s": _percentile(latencies, 95),
+            "llm_calls_per_query": stats["upstream_calls"] / runs,
+            "prompt_tokens_per_query": stats["prompt_tokens"] / runs,
+            "completion_tokens_per_query": stats["completion_tokens"] / runs,
+        }
+    
+    print("FRONT-END BENCHMARK (synthetic backend)")
+    print("=" * 40)
+    for mode, row in report.items():
+        print(f"   {mode:>6}: mean {row['mean_latency_s']:.3f}s, p95 {row['p95_latency_s']:.3f}s, "
+              f"{row['llm_calls_per_query']:.1f} calls, "
+              f"{row['prompt_tokens_per_query']:.0f}+{row['completion_tokens_per_query']:.0f} tokens/query")
+    return report
+
+
+async def benchmark_authorization(user_id: str = "hrbp01", participants: int = 20000,
+                                  lookups: int = 100000, queries: int = 20,
+                                  permission_index: Optional[PermissionIndex] = None) -> Dict[str, float]:
+    """Per-request cost of authorization: cached ACL lookups, SQL building, row filtering
+    
+    Row filtering compares the ACL's predicates pushed into the participants query
+    against fetching every participant and filtering the result in Python.
+    ``permission_index`` defaults to one over config/permissions.json.
+    """
+    index = permission_index or PermissionIndex()
+    permissions = NonLLMComponents(permission_index=index)
+    report: Dict[str, float] = {}
+    
+    def per_call_us(call, count: int) -> float:
+        started = time.perf_counter()
+        for _ in range(count):
+            call()
+        return (time.perf_counter() - started) / count * 1e6
+    
+    def cold_acl():
+        index.invalidate(user_id)
+        return index.acl(user_id)
+    
+    acl = index.acl(user_id)
+    report["acl_compile_us"] = per_call_us(cold_acl, max(1, lookups // 10))
+    report["acl_lookup_us"] = per_call_us(lambda: index.acl(user_id), lookups)
+    report["validate_permissions_us"] = per_call_us(
+        lambda: permissions.validate_permissions(user_id, "query"), lookups)
+    params = {"department": "Engineering", "security_type": "RSU"}
+    report["build_sql_us"] = per_call_us(lambda: EquityQueryBuilder.participants(params), lookups // 10)
+    report["build_sql_with_acl_us"] = per_call_us(
+        lambda: EquityQueryBuilder.participants(params, acl), lookups // 10)
+    
+    db_path = f"file:equity_authorization_{id(index)}?mode=memory&cache=shared"
+    engine = SQLExecutionEngine(db_path, pool_size=1, max_rows=participants * 2)
+    try:
+        seed_demo_database(db_path, synthetic_participants=participants)
+        pushed_sql, pushed_params = EquityQueryBuilder.participants({}, acl)
+        full_sql, full_params = EquityQueryBuilder.participants({})
+        
+        async def timed_ms(fetch) -> Tuple[float, int]:
+            rows = await fetch()
+            started = time.perf_counter()
+            for _ in range(queries):
+                await fetch()
+            return (time.perf_counter() - started) / queries * 1e3, len(rows)
+        
+        async def post_filtered():
+            return acl.restrict(await engine.execute(full_sql, full_params, columnar=True))
+        
+        report["pushed_down_ms"], report["pushed_down_rows"] = await timed_ms(
+            lambda: engine.execute(pushed_sql, pushed_params, columnar=True))
+        report["post_filter_ms"], report["post_filter_rows"] = await timed_ms(post_filtered)
+    finally:
+        engine.close()
+    
+    print(f"AUTHORIZATION BENCHMARK ({user_id}: {acl.role})")
+    print("=" * 40)
+    print(f"   ACL lookup {report['acl_lookup_us']:.2f} µs (compile {report['acl_compile_us']:.1f} µs), "
+          f"validate_permissions {report['validate_permissions_us']:.2f} µs")
+    print(f"   participants SQL build {report['build_sql_us']:.1f} µs, "
+          f"with ACL {report['build_sql_with_acl_us']:.1f} µs")
+    print(f"   {participants} participants: predicates in SQL {report['pushed_down_ms']:.1f} ms "
+          f"({report['pushed_down_rows']} rows), fetch all + filter {report['post_filter_ms']:.1f} ms "
+          f"({report['post_filter_rows']} rows)")
+    return report
+
+
+async def benchmark_end_to_end(backend=None, queries: Optional[List[str]] = None,
+                               concurrency: int = 8, iterations: int = 3,
+                               agent_config: Optional[Dict] = None) -> Dict[str, Any]:
+    """Drive process_query with a query corpus at fixed concurrency
+    
+    Reports throughput, end-to-end latency percentiles, per-stage and per-LLM
+    latency from the tracer, and LLM calls and tokens per query. Caches are
+    off by default so every iteration measures the full path; pass
+    ``agent_config`` to benchmark another configuration. Queries run as
+    BENCHMARK_USER with the admin role unless it brings a ``permission_index``.
+    """
+    queries = queries or BENCHMARK_CORPUS
+    config = {"parse_cache_size": 0, "plan_cache_size": 0, "result_cache_size": 0, "synthesis_cache_size": 0}
+    config.update(agent_config or {})
+    config.update({"llm_backend": backend or synthetic_backend(), "tracer": Tracer()})
+    if "permission_index" not in config:
+        config["permission_index"] = benchmark_permission_index(
+            path=config.get("permissions_path", DEFAULT_PERMISSIONS_PATH))
+    agent = LLMPoweredEquityAgent(config)
+    
+    pending = deque(query for _ in range(iterations) for query in queries)
+    runs = len(pending)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    
+    async def worker():
+        while pending:
+            query = pending.popleft()
+            started = time.perf_counter()
+            try:
+                status = (await agent.process_query(query, user_id=BENCHMARK_USER))["status"]
+            except Exception as e:
+                status = f"exception:{type(e).__name__}"
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, runs)))))
+    wall_seconds = time.perf_counter() - started
+    
+    stats = agent.llm_client.stats
+    latency = agent.tracer.latency_summary()
+    failures = sum(count for status, count in statuses.items() if status == "error" or status.startswith("exception"))
+    report = {
+        "queries": runs,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_qps": round(runs / wall_seconds, 3),
+        "latency_ms": {
+            "mean": round(sum(latencies) / runs * 1000.0, 3),
+            **{f"p{pct}": round(_percentile(latencies, pct) * 1000.0, 3) for pct in Tracer.QUANTILES},
+        },
+        "statuses": statuses,
+        "error_rate": round(failures / runs, 4),
+        "llm_calls_per_query": round(stats["requests"] / runs, 3),
+        "upstream_calls_per_query": round(stats["upstream_calls"] / runs, 3),
+        "prompt_tokens_per_query": round(stats["prompt_tokens"] / runs, 1),
+        "completion_tokens_per_query": round(stats["completion_tokens"] / runs, 1),
+        "stages": latency.get("stage", {}),
+        "llm_stages": latency.get("llm", {}),
+    }
+    await agent.llm_client.close()
+    agent.sql_engine.close()
+    return report
+
+
+def find_benchmark_regressions(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None,
+                               tolerance: float = 0.15, max_error_rate: float = 0.0,
+                               min_latency_delta_ms: float = 1.0) -> List[str]:
+    """Compare an end-to-end report against limits and a saved baseline report
+    
+    A metric regresses when it is worse than the baseline by more than
+    ``tolerance`` (relative). Latencies must also be ``min_latency_delta_ms``
+    worse, so sub-millisecond local stages do not flap on scheduler noise,
+    and stages are compared on p50, which is stable at benchmark sample sizes.
+    """
+    regressions = []
+    if report["error_rate"] > max_error_rate:
+        regressions.append(f"error rate {report['error_rate']:.2%} exceeds {max_error_rate:.2%} "
+                           f"(statuses {report['statuses']})")
+    if not baseline:
+        return regressions
+    
+    def worse(label: str, current: float, previous: float, latency: bool = False, higher_is_better: bool = False):
+        if not previous:
+            return
+        change = (previous - current if higher_is_better else current - previous) / previous
+        if change > tolerance and (not latency or abs(current - previous) >= min_latency_delta_ms):
+            regressions.append(f"{label}: {previous:g} -> {current:g} ({change:+.1%})")
+    
+    worse("throughput_qps", report["throughput_qps"], baseline["throughput_qps"], higher_is_better=True)
+    for pct in ("p50", "p95"):  # p99 of a short run is just its slowest query
+        worse(f"latency {pct} ms", report["latency_ms"][pct], baseline["latency_ms"][pct], latency=True)
+    for metric in ("llm_calls_per_query", "prompt_tokens_per_query", "completion_tokens_per_query"):
+        worse(metric, report[metric], baseline[metric])
+    for group in ("stages", "llm_stages"):
+        for name, previous in baseline.get(group, {}).items():
+            current = report[group].get(name)
+            if current is not None:
+                worse(f"{group[:-1]} {name} p50 ms", current["p50_ms"], previous["p50_ms"], latency=True)
+    return regressions
+
+
+def print_end_to_end_report(report: Dict[str, Any], regressions: List[str]):
+    print("END-TO-END BENCHMARK")
+    print("=" * 40)
+    print(f"   {report['queries']} queries at concurrency {report['concurrency']} in "
+          f"{report['wall_seconds']:.2f}s: {report['throughput_qps']:.2f} queries/s")
+    latency = report["latency_ms"]
+    print(f"   latency: mean {latency['mean']:.1f} ms, p50 {latency['p50']:.1f}, "
+          f"p95 {latency['p95']:.1f}, p99 {latency['p99']:.1f}")
+    print(f"   per query: {report['llm_calls_per_query']:.2f} LLM calls, "
+          f"{report['prompt_tokens_per_query']:.0f}+{report['completion_tokens_per_query']:.0f} tokens")
+    print(f"   statuses: {report['statuses']}")
+    for group in ("stages", "llm_stages"):
+        for name, row in report[group].items():
+            print(f"   {group[:-1]:>9} {name:>16}: p50 {row['p50_ms']:8.1f} ms, p95 {row['p95_ms']:8.1f}, "
+                  f"p99 {row['p99_ms']:8.1f} (n={row['count']})")
+    for regression in regressions:
+        print(f"   ❌ REGRESSION {regression}")
+    if not regressions:
+        print("   ✅ No regressions")
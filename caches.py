@@ -0,0 +1,254 @@
+import copy
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# ============================================================================
+# NON-LLM CACHING: LRU/TTL CACHE AND PLAN TEMPLATES
+# ============================================================================
+
+class LRUTTLCache:
+    """🔧 NON-LLM: Size-bounded LRU cache whose entries also expire after a TTL
+    
+    With ``disk_path`` set, entries are written through to a sqlite table so
+    hits survive restarts; values must then be JSON-serializable.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400.0,
+                 disk_path: Optional[str] = None, namespace: str = "cache"):
+        if not namespace.isidentifier():
+            raise ValueError(f"Cache namespace must be an identifier: {namespace!r}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "disk_hits": 0}
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {namespace} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+    
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if now - stored_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            del self._entries[key]
+            self.stats["expirations"] += 1
+        
+        if self._db is not None:
+            row = self._db.execute(
+                f"SELECT value, stored_at FROM {self.namespace} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                if now - row[1] <= self.ttl_seconds:
+                    value = json.loads(row[0])
+                    self._store_in_memory(key, value, row[1])
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return value
+                self._db.execute(f"DELETE FROM {self.namespace} WHERE key = ?", (key,))
+                self._db.commit()
+                self.stats["expirations"] += 1
+        
+        self.stats["misses"] += 1
+        return None
+    
+    def put(self, key: str, value: Any):
+        stored_at = time.time()
+        self._store_in_memory(key, value, stored_at)
+        if self._db is not None:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.namespace} (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), stored_at),
+            )
+            self._db.commit()
+    
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.namespace} WHERE key = ?", (key,))
+            self._db.commit()
+    
+    def clear(self):
+        self._entries.clear()
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.namespace}")
+            self._db.commit()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _store_in_memory(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+class PlanTemplateCache:
+    """🔧 NON-LLM: Reusable workflow plans keyed by the structural shape of a parse
+    
+    The signature keeps the target, the intent and *which* filters are present,
+    but not their values. Plans are stored with filter values replaced by
+    {{filter:<name>}} placeholders and re-bound to the new values on a hit.
+    Only templates whose plans validated and executed successfully are served.
+    """
+    
+    ABSENT_VALUES = {"", "none", "null", "n/a", "if mentioned", "if specified", "not specified"}
+    # Step params that narrow a query; their values must come from the parse's filters
+    FILTER_PARAMS = {"department", "security_type", "award_type", "participant_type", "participant_status",
+                     "status", "company", "company_name", "country", "fiscal_year", "start_date", "end_date"}
+    INTENT_FIELDS = ("primary_action", "output_format", "data_scope")
+    PLACEHOLDER = re.compile(r"\{\{filter:(\w+)\}\}")
+    DATE_LITERAL = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 7 * 86400.0,
+                 disk_path: Optional[str] = None, promote_after: int = 1):
+        self.templates = LRUTTLCache(max_entries, ttl_seconds, disk_path, namespace="plan_templates")
+        self.promote_after = promote_after
+        self._successes: Dict[str, int] = {}
+    
+    def signature(self, parsed_query: Dict[str, Any]) -> str:
+        entities = parsed_query.get("entities") or {}
+        intent = parsed_query.get("intent") or {}
+        shape = {
+            "target": str(entities.get("target", "")).strip().lower(),
+            "filters": sorted(self._concrete_filters(parsed_query)),
+            "intent": {field: str(intent.get(field, "")).strip().lower() for field in self.INTENT_FIELDS},
+        }
+        return json.dumps(shape, sort_keys=True)
+    
+    def lookup(self, parsed_query: Dict[str, Any]) -> Optional[List[Dict]]:
+        template = self.templates.get(self.signature(parsed_query))
+        if template is None:
+            return None
+        try:
+            return self._bind(copy.deepcopy(template), self._concrete_filters(parsed_query))
+        except KeyError:
+            return None
+    
+    def promote(self, parsed_query: Dict[str, Any], plan: List[Dict]):
+        """Record a plan that validated and executed cleanly; cache its template"""
+        signature = self.signature(parsed_query)
+        self._successes[signature] = self._successes.get(signature, 0) + 1
+        if self._successes[signature] < self.promote_after:
+            return
+        template = self._templatize(plan, self._concrete_filters(parsed_query))
+        if template is not None:
+            self.templates.put(signature, template)
+    
+    def demote(self, parsed_query: Dict[str, Any]):
+        """Forget the template for this shape after a failed validation or run"""
+        signature = self.signature(parsed_query)
+        self._successes.pop(signature, None)
+        self.templates.invalidate(signature)
+    
+    def _concrete_filters(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
+        filters = (parsed_query.get("entities") or {}).get("filters") or {}
+        return {
+            name: value for name, value in filters.items()
+            if value not in (None, [], {}) and str(value).strip().lower() not in self.ABSENT_VALUES
+        }
+    
+    def _templatize(self, plan: List[Dict], filters: Dict[str, Any]) -> Optional[List[Dict]]:
+        values = [json.dumps(value, sort_keys=True) for value in filters.values()]
+        if len(values) != len(set(values)):
+            return None  # Two filters share a value; re-binding would be ambiguous
+        
+        # Inside longer strings only whole tokens match: "Sales" never rewrites "Salesforce"
+        # Longest values first, so "Sales Ops" is not rewritten through "Sales".
+        in_text = [
+            (re.compile(rf"(?<![\w-]){re.escape(value)}(?![\w-])"), f"{{{{filter:{name}}}}}")
+            for name, value in sorted(filters.items(), key=lambda item: -len(str(item[1])))
+            if isinstance(value, str) and len(value) >= 3
+        ]
+        
+        def substitute(node):
+            if isinstance(node, dict):
+                return {key: substitute(value) for key, value in node.items()}
+            for name, value in filters.items():
+                if node == value:
+                    return f"{{{{filter:{name}}}}}"
+            if isinstance(node, list):
+                return [substitute(item) for item in node]
+            if isinstance(node, str):
+                for pattern, placeholder in in_text:
+                    node = pattern.sub(placeholder, node)
+            return node
+        
+        template = substitute(copy.deepcopy(plan))
+        # A filter the LLM added itself (say a defaulted participant_type) is not in the
+        # signature, so a template would impose it on every query of this shape
+        for step in template:
+            for name, value in (step.get("params") or {}).items():
+                if name in self.FILTER_PARAMS and not self._is_placeholder_or_absent(value):
+                    return None
+        # Concrete dates left in the plan would go stale when re-bound
+        if self.DATE_LITERAL.search(json.dumps([step.get("params", {}) for step in template])):
+            return None
+        return template
+    
+    def _is_placeholder_or_absent(self, value) -> bool:
+        if value in (None, [], {}):
+            return True
+        if isinstance(value, str) and self.PLACEHOLDER.fullmatch(value):
+            return True
+        return str(value).strip().lower() in self.ABSENT_VALUES
+    
+    def _bind(self, node, filters: Dict[str, Any]):
+        if isinstance(node, dict):
+            return {key: self._bind(value, filters) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self._bind(item, filters) for item in node]
+        if isinstance(node, str):
+            whole = self.PLACEHOLDER.fullmatch(node)
+            if whole:
+                return copy.deepcopy(filters[whole.group(1)])
+            return self.PLACEHOLDER.sub(lambda match: str(filters[match.group(1)]), node)
+        return node
+
+# ============================================================================
+# NON-LLM CONFIG CACHING: PARSED FILES RELOADED ONLY ON CHANGE
+# ============================================================================
+
+class ConfigStore:
+    """🔧 NON-LLM: JSON configs parsed and validated once, reloaded only when the file changes
+    
+    Each load is an ``os.stat``; the file is re-read only when its mtime or
+    size differs from the cached copy. Returned objects are shared - callers
+    must not mutate them.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self.stats = {"hits": 0, "loads": 0}
+    
+    def load(self, path: str, validator: Optional[Callable[[Any], None]] = None) -> Any:
+        """Return the parsed config at ``path``; ``validator`` raises ValueError on a bad file"""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == signature:
+            self.stats["hits"] += 1
+            return entry[1]
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if validator is not None:
+            validator(data)
+        self._entries[path] = (signature, data)
+        self.stats["loads"] += 1
+        return data
@@ -0,0 +1,321 @@
+import heapq
+import itertools
+import operator
+from array import array
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple, Union
+
+# ============================================================================
+# NON-LLM COLUMNAR RESULT SETS: COMPACT ROWS, VECTORIZED AGGREGATION
+# ============================================================================
+
+class _NumericColumn:
+    """Integers in array('q') or floats in array('d'); a bytearray marks NULLs"""
+    __slots__ = ("data", "nulls")
+    
+    def __init__(self, data: array, nulls: Optional[bytearray] = None):
+        self.data = data
+        self.nulls = nulls  # None when the column has no NULLs
+    
+    def take(self, indices: Iterable[int]) -> List[Any]:
+        if self.nulls is None:
+            return list(map(self.data.__getitem__, indices))
+        data, nulls = self.data, self.nulls
+        return [None if nulls[i] else data[i] for i in indices]
+    
+    def present(self, indices: Optional[Iterable[int]]) -> Iterable[Any]:
+        """Non-NULL values of the selected rows"""
+        values = self.data if indices is None else map(self.data.__getitem__, indices)
+        if self.nulls is None:
+            return values
+        flags = self.nulls if indices is None else map(self.nulls.__getitem__, indices)
+        return itertools.compress(values, map(operator.not_, flags))
+    
+    def mask(self, indices: Optional[Iterable[int]], op: str, value: Any) -> Iterable[bool]:
+        compare = ColumnarResultSet.OPERATORS[op]
+        values = self.data if indices is None else map(self.data.__getitem__, indices)
+        if op in ("in", "not in"):
+            matches = map(compare, values, itertools.repeat(frozenset(value)))
+        else:
+            matches = map(compare, values, itertools.repeat(value))
+        if self.nulls is None:
+            return matches
+        flags = self.nulls if indices is None else map(self.nulls.__getitem__, indices)
+        return map(operator.and_, matches, map(operator.not_, flags))
+
+
+class _DictionaryColumn:
+    """Strings stored once in ``dictionary``; rows hold codes (index + 1, 0 is NULL)
+    
+    Up to 254 distinct values the codes are a bytearray, so an equality or IN
+    test is one ``bytes.translate`` through a 256-byte table and group counts
+    are ``bytearray.count`` per distinct value - both run entirely in C.
+    """
+    __slots__ = ("codes", "dictionary", "lookup")
+    
+    def __init__(self, codes: Union[bytearray, array], dictionary: List[str]):
+        self.codes = codes
+        self.dictionary = dictionary
+        self.lookup = [None] + dictionary
+    
+    def take(self, indices: Iterable[int]) -> List[Any]:
+        return list(map(self.lookup.__getitem__, map(self.codes.__getitem__, indices)))
+    
+    def present(self, indices: Optional[Iterable[int]]) -> Iterable[Any]:
+        codes = self.codes if indices is None else map(self.codes.__getitem__, indices)
+        return map(self.lookup.__getitem__, filter(None, codes))
+    
+    def counts(self, indices: Optional[Iterable[int]]) -> Dict[Optional[str], int]:
+        if indices is None and isinstance(self.codes, bytearray):
+            counts = {value: self.codes.count(code) for code, value in enumerate(self.lookup)}
+        else:
+            counts = {}
+            for code in (self.codes if indices is None else map(self.codes.__getitem__, indices)):
+                counts[code] = counts.get(code, 0) + 1
+            counts = {self.lookup[code]: count for code, count in counts.items()}
+        return {value: count for value, count in counts.items() if count}
+    
+    def mask(self, indices: Optional[Iterable[int]], op: str, value: Any) -> Iterable[bool]:
+        if op not in ("==", "!=", "in", "not in"):
+            raise ValueError(f"Operator {op!r} is not supported on text column")
+        # The schema compares text COLLATE NOCASE; so do we, once per distinct string
+        targets = {str(item).casefold() for item in (value if op in ("in", "not in") else [value])}
+        negate = op in ("!=", "not in")
+        table = [False] + [(text.casefold() in targets) != negate for text in self.dictionary]
+        if isinstance(self.codes, bytearray):
+            flags = self.codes.translate(bytes(table) + bytes(256 - len(table)))
+        else:
+            flags = list(map(table.__getitem__, self.codes))
+        return flags if indices is None else map(flags.__getitem__, indices)
+
+
+class _ObjectColumn:
+    """Plain list for high-cardinality text (names, emails) and mixed types"""
+    __slots__ = ("values",)
+    
+    def __init__(self, values: List[Any]):
+        self.values = values
+    
+    def take(self, indices: Iterable[int]) -> List[Any]:
+        return list(map(self.values.__getitem__, indices))
+    
+    def present(self, indices: Optional[Iterable[int]]) -> Iterable[Any]:
+        values = self.values if indices is None else map(self.values.__getitem__, indices)
+        return (value for value in values if value is not None)
+    
+    def mask(self, indices: Optional[Iterable[int]], op: str, value: Any) -> Iterable[bool]:
+        values = self.values if indices is None else map(self.values.__getitem__, indices)
+        compare = ColumnarResultSet.OPERATORS[op]
+        if op in ("in", "not in"):
+            value = frozenset(value)
+        return (item is not None and compare(item, value) for item in values)
+
+
+class ColumnarResultSet:
+    """🔧 NON-LLM: Query rows stored column by column
+    
+    Integer and float columns are stdlib arrays (8 bytes a value, no per-row
+    objects); low-cardinality text such as award_type, department and status
+    is dictionary-encoded into int codes. ``where``/``filter`` return a view
+    holding only a selection vector, and ``group_by``/``sum``/``count`` run
+    over the arrays with C-level iteration. Dicts are built only when the
+    set is iterated, indexed or passed through ``materialize`` at the API edge,
+    so it can stand in wherever a step used to return ``List[Dict]``.
+    """
+    
+    __slots__ = ("_columns", "_length", "_selection")
+    
+    OPERATORS = {
+        "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+        ">": operator.gt, ">=": operator.ge,
+        "in": lambda value, values: value in values,
+        "not in": lambda value, values: value not in values,
+    }
+    MAX_DICTIONARY_RATIO = 0.5  # Text with more distinct values than this stays a plain list
+    CHUNK_ROWS = 1024
+    
+    def __init__(self, columns: Dict[str, Any], length: int, selection: Optional[List[int]] = None):
+        self._columns = columns
+        self._length = length
+        self._selection = selection  # None means every row, in order
+    
+    @classmethod
+    def from_tuples(cls, names: List[str], rows: List[tuple]) -> "ColumnarResultSet":
+        """Build straight from DB-API row tuples, without creating a dict per row"""
+        return cls.from_columns(names, list(zip(*rows)) if rows else [()] * len(names))
+    
+    @classmethod
+    def from_columns(cls, names: List[str], columns: List[Iterable[Any]]) -> "ColumnarResultSet":
+        """Build from one value sequence per column (all the same length)"""
+        columns = [values if isinstance(values, tuple) else tuple(values) for values in columns]
+        return cls({name: cls._encode(values) for name, values in zip(names, columns)},
+                   len(columns[0]) if columns else 0)
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "ColumnarResultSet":
+        rows = list(rows)
+        names = list(dict.fromkeys(name for row in rows for name in row))
+        return cls.from_tuples(names, [tuple(row.get(name) for name in names) for row in rows])
+    
+    @classmethod
+    def _encode(cls, values: tuple):
+        kinds = set(map(type, values))
+        nulls = None
+        if type(None) in kinds:
+            kinds.discard(type(None))
+            nulls = bytearray(map(operator.is_, values, itertools.repeat(None)))
+        try:
+            if kinds == {int}:
+                return _NumericColumn(array("q", values if nulls is None else
+                                            [0 if value is None else value for value in values]), nulls)
+            if kinds and kinds <= {int, float}:
+                return _NumericColumn(array("d", values if nulls is None else
+                                            [0.0 if value is None else value for value in values]), nulls)
+        except OverflowError:
+            return _ObjectColumn(list(values))
+        if kinds <= {str}:
+            distinct = dict.fromkeys(values)
+            distinct.pop(None, None)
+            if len(distinct) <= max(16, cls.MAX_DICTIONARY_RATIO * len(values)):
+                index = {value: code for code, value in enumerate(distinct, 1)}
+                index[None] = 0
+                codes = map(index.__getitem__, values)
+                return _DictionaryColumn(bytearray(codes) if len(distinct) < 255 else array("i", codes),
+                                         list(distinct))
+        return _ObjectColumn(list(values))
+    
+    # ---- shape -------------------------------------------------------------
+    
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+    
+    def __len__(self) -> int:
+        return self._length if self._selection is None else len(self._selection)
+    
+    def __bool__(self) -> bool:
+        return len(self) > 0
+    
+    def __repr__(self) -> str:
+        encoded = [name for name, column in self._columns.items() if isinstance(column, _DictionaryColumn)]
+        return f"<ColumnarResultSet rows={len(self)} columns={self.columns} dictionary_encoded={encoded}>"
+    
+    def _indices(self) -> Iterable[int]:
+        return range(self._length) if self._selection is None else self._selection
+    
+    # ---- lazy conversion at the API edge -----------------------------------
+    
+    def column(self, name: str) -> List[Any]:
+        return self._columns[name].take(self._indices())
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        indices = self._indices()
+        names = self.columns
+        for start in range(0, len(self), self.CHUNK_ROWS):
+            chunk = indices[start:start + self.CHUNK_ROWS]
+            for values in zip(*(self._columns[name].take(chunk) for name in names)):
+                yield dict(zip(names, values))
+    
+    def __getitem__(self, item: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        indices = self._indices()[item]
+        if isinstance(item, slice):
+            names = self.columns
+            return [dict(zip(names, values))
+                    for values in zip(*(self._columns[name].take(indices) for name in names))]
+        return {name: column.take((indices,))[0] for name, column in self._columns.items()}
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+    
+    @classmethod
+    def materialize(cls, value: Any) -> Any:
+        """Replace result sets nested in step outputs with plain row dicts"""
+        if isinstance(value, ColumnarResultSet):
+            return value.to_dicts()
+        if isinstance(value, dict):
+            return {key: cls.materialize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [cls.materialize(item) for item in value]
+        return value
+    
+    # ---- vectorized operations ---------------------------------------------
+    
+    def where(self, column: str, op: str, value: Any) -> "ColumnarResultSet":
+        """Rows where ``column op value``; NULLs never match, text compares case-insensitively"""
+        if op not in self.OPERATORS:
+            raise ValueError(f"Unknown operator {op!r}; use one of {sorted(self.OPERATORS)}")
+        mask = self._columns[column].mask(self._selection, op, value)
+        kept = list(itertools.compress(self._indices(), mask))
+        return ColumnarResultSet(self._columns, self._length, kept)
+    
+    def filter(self, **equals) -> "ColumnarResultSet":
+        """``filter(department="Sales", award_type=["RSU", "PSU"])``: equality or membership"""
+        result = self
+        for column, value in equals.items():
+            many = isinstance(value, (list, tuple, set, frozenset))
+            result = result.where(column, "in" if many else "==", value)
+        return result
+    
+    def count(self, column: Optional[str] = None) -> int:
+        """Row count, or the count of non-NULL values in ``column``"""
+        if column is None:
+            return len(self)
+        return sum(1 for _ in self._columns[column].present(self._selection))
+    
+    def sum(self, column: str) -> Union[int, float]:
+        return sum(self._columns[column].present(self._selection))
+    
+    def min(self, column: str) -> Any:
+        return min(self._columns[column].present(self._selection), default=None)
+    
+    def max(self, column: str) -> Any:
+        return max(self._columns[column].present(self._selection), default=None)
+    
+    def top(self, n: int, column: str) -> "ColumnarResultSet":
+        """The ``n`` rows with the largest ``column`` values (NULLs rank lowest)"""
+        values = self._columns[column].take(self._indices())
+        best = heapq.nlargest(n, range(len(values)), key=lambda position: values[position] or 0)
+        indices = self._indices()
+        return ColumnarResultSet(self._columns, self._length, [indices[position] for position in best])
+    
+    def group_by(self, *columns: str) -> "_GroupedResultSet":
+        return _GroupedResultSet(self, columns)
+
+
+class _GroupedResultSet:
+    """count/sum per group; keys are values (one column) or tuples (several)"""
+    
+    def __init__(self, result_set: ColumnarResultSet, columns: Tuple[str, ...]):
+        self.result_set = result_set
+        self.columns = columns
+    
+    def _keys(self) -> Iterable[Any]:
+        indices = self.result_set._indices()
+        if len(self.columns) == 1:
+            return self.result_set._columns[self.columns[0]].take(indices)
+        return zip(*(self.result_set._columns[name].take(indices) for name in self.columns))
+    
+    def count(self) -> Dict[Any, int]:
+        column = self.result_set._columns[self.columns[0]]
+        if len(self.columns) == 1 and isinstance(column, _DictionaryColumn):
+            return column.counts(self.result_set._selection)
+        counts: Dict[Any, int] = {}
+        for key in self._keys():
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+    
+    def sum(self, column: str) -> Dict[Any, Union[int, float]]:
+        values = self.result_set._columns[column].take(self.result_set._indices())
+        totals: Dict[Any, Union[int, float]] = {}
+        for key, value in zip(self._keys(), values):
+            if value is not None:
+                totals[key] = totals.get(key, 0) + value
+        return totals
+    
+    def groups(self) -> Dict[Any, ColumnarResultSet]:
+        """One view per group, sharing this set's columns"""
+        positions: Dict[Any, List[int]] = {}
+        for key, index in zip(self._keys(), self.result_set._indices()):
+            positions.setdefault(key, []).append(index)
+        result_set = self.result_set
+        return {key: ColumnarResultSet(result_set._columns, result_set._length, selection)
+                for key, selection in positions.items()}
@@ -0,0 +1,328 @@
+import asyncio
+import itertools
+import json
+import logging
+import re
+import time
+from collections import deque
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from llm_client import LLMClient, get_default_llm_client
+from prompts import PromptTemplate
+from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# LLM USAGE POINT #5: EMAIL/COMMUNICATION GENERATION
+# ============================================================================
+
+class LLMCommunicationGenerator:
+    """Uses LLM to generate emails, reports, and other communications"""
+    
+    PROMPT = PromptTemplate(
+        "generate_email",
+        static="""
+        Generate a professional email for equity plan participants.
+        
+        Requirements:
+        - Professional, clear tone
+        - Compliance-friendly language (no investment advice)
+        - Personalized where appropriate
+        - Clear call-to-action
+        - Include relevant deadlines/dates
+        
+        Return JSON:
+        {{
+            "subject": "Clear, specific subject line",
+            "body": "Professional email body with personalization placeholders like {{participant_name}}",
+            "call_to_action": "Specific action required",
+            "urgency": "high/medium/low",
+            "compliance_notes": ["Any compliance considerations"]
+        }}
+        """,
+        dynamic="""
+        Recipients Context (first 3):
+        {recipients}
+        Total Recipients: {total_recipients}
+        
+        Email Context: {email_context}
+        Email Type: {email_type}
+        """,
+    )
+    
+    def __init__(self, llm_client: Optional[LLMClient] = None):
+        self.llm_client = llm_client or get_default_llm_client()
+    
+    @traced("email")
+    async def generate_email(self, recipients_data: List[Dict], context: str, 
+                           email_type: str = "notification",
+                           total_recipients: Optional[int] = None) -> Dict[str, Any]:
+        """
+        🤖 LLM USAGE: Generate contextual, professional communications
+        
+        LLM creates personalized, compliant emails that would be tedious to template.
+        Only a sample of recipients is needed; pass ``total_recipients`` when
+        ``recipients_data`` is that sample rather than the full list.
+        """
+        if total_recipients is None:
+            total_recipients = len(recipients_data)
+        
+        messages = self.PROMPT.render(
+            recipients=json.dumps(recipients_data[:3], indent=2),
+            total_recipients=total_recipients,
+            email_context=context,
+            email_type=email_type,
+        )
+        
+        logger.info("🤖 LLM CALL #5: Email Generation")
+        logger.info("   Context: %s for %s recipients", email_type, total_recipients)
+        
+        response = await self.llm_client.chat(
+            model="gpt-4",
+            messages=messages,
+            temperature=0.4,  # Balance creativity with professionalism
+            max_tokens=1000
+        )
+        
+        try:
+            email_content = json.loads(response.choices[0].message.content)
+            logger.info("   ✅ Email generated successfully")
+            return email_content
+        except Exception:
+            return self._fallback_email_generation(recipients_data, context)
+    
+    def _fallback_email_generation(self, recipients: List[Dict], context: str) -> Dict:
+        """🔧 NON-LLM: Template-based email generation"""
+        return {
+            "subject": "Important Equity Plan Information",
+            "body": "Please review your equity plan details.",
+            "call_to_action": "Contact HR with questions"
+        }
+
+# ============================================================================
+# NON-LLM BULK COMMUNICATION: TEMPLATE ONCE, RENDER LOCALLY
+# ============================================================================
+
+class EmailTemplateError(ValueError):
+    """Raised when a generated email template uses placeholders we cannot fill"""
+
+
+class EmailTemplate:
+    """
+    🔧 NON-LLM: A generated email compiled once into literal/field segments
+    
+    Accepts both ``{{participant_name}}`` and ``{participant_name}`` placeholders.
+    Every placeholder must name a field (or an alias of one) present in the
+    recipient sample, or have a default, so a bad template fails at compile
+    time instead of skipping every recipient.
+    """
+    
+    PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}|\{(\w+)\}")
+    # Placeholder -> recipient fields tried in order
+    ALIASES = {
+        "participant_name": ("name", "participant_name", "full_name"),
+        "name": ("name", "participant_name", "full_name"),
+        "email": ("email", "email_address"),
+        "company": ("company_name", "company"),
+        "company_name": ("company_name", "company"),
+        "award_type": ("award_type", "security_type"),
+        "security_type": ("security_type", "award_type"),
+        "quantity": ("quantity", "shares", "amount"),
+        "vest_date": ("vest_date", "vesting_date"),
+    }
+    DEFAULTS = {"participant_name": "Participant", "name": "Participant"}
+    RENDERED_FIELDS = ("subject", "body", "call_to_action")
+    
+    def __init__(self, email_content: Dict[str, Any], recipient_fields: Iterable[str] = ()):
+        self.email_content = email_content
+        self.recipient_fields = set(recipient_fields)
+        self.placeholders = set()
+        self._segments = {
+            field: self._compile(str(email_content[field]))
+            for field in self.RENDERED_FIELDS if email_content.get(field)
+        }
+    
+    def render(self, recipient: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Personalize for one recipient, or None if a required field is missing"""
+        message = {"to": recipient.get("email") or recipient.get("participant_id")}
+        for field, segments in self._segments.items():
+            parts = []
+            for literal, lookup in segments:
+                parts.append(literal)
+                if lookup is not None:
+                    value = lookup(recipient)
+                    if value is None:
+                        return None
+                    parts.append(value)
+            message[field] = "".join(parts)
+        return message
+    
+    def render_chunks(self, recipients: Iterable[Dict], chunk_size: int
+                      ) -> Iterator[Tuple[List[Dict], int]]:
+        """Yield (rendered messages, skipped count) per chunk of recipients"""
+        recipients = iter(recipients)
+        while True:
+            chunk = list(itertools.islice(recipients, chunk_size))
+            if not chunk:
+                return
+            rendered = [message for message in map(self.render, chunk) if message is not None]
+            yield rendered, len(chunk) - len(rendered)
+    
+    def _compile(self, text: str) -> List[Tuple[str, Optional[Callable[[Dict], Optional[str]]]]]:
+        segments = []
+        position = 0
+        for match in self.PLACEHOLDER.finditer(text):
+            name = match.group(1) or match.group(2)
+            segments.append((text[position:match.start()], self._lookup_for(name)))
+            position = match.end()
+        segments.append((text[position:], None))
+        return segments
+    
+    def _lookup_for(self, name: str) -> Callable[[Dict], Optional[str]]:
+        candidates = self.ALIASES.get(name, (name,))
+        default = self.DEFAULTS.get(name)
+        if self.recipient_fields:
+            known = default is not None or any(field in self.recipient_fields for field in candidates)
+        else:
+            known = name in self.ALIASES
+        if not known:
+            raise EmailTemplateError(f"Template placeholder {{{{{name}}}}} matches no recipient field")
+        self.placeholders.add(name)
+        
+        def lookup(recipient: Dict) -> Optional[str]:
+            for field in candidates:
+                value = recipient.get(field)
+                if value not in (None, ""):
+                    return str(value)
+            return default
+        return lookup
+
+
+class FileEmailSink:
+    """🔧 NON-LLM: Append rendered messages to a JSONL outbox file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = asyncio.Lock()
+    
+    async def send_batch(self, messages: List[Dict]) -> int:
+        lines = "".join(json.dumps(message) + "\n" for message in messages)
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
+        return len(messages)
+    
+    def _append(self, lines: str):
+        with open(self.path, "a", encoding="utf-8") as outbox:
+            outbox.write(lines)
+
+
+class SMTPStubSink:
+    """🔧 NON-LLM: Stand-in for an SMTP relay; simulates per-batch latency and keeps recent messages"""
+    
+    def __init__(self, latency_per_batch: float = 0.0, keep_last: int = 100):
+        self.latency_per_batch = latency_per_batch
+        self.sent = deque(maxlen=keep_last)
+        self.sent_count = 0
+        self.batches = 0
+    
+    async def send_batch(self, messages: List[Dict]) -> int:
+        if self.latency_per_batch:
+            await asyncio.sleep(self.latency_per_batch)
+        self.sent.extend(messages)
+        self.sent_count += len(messages)
+        self.batches += 1
+        return len(messages)
+
+
+class BulkCommunicationPipeline:
+    """
+    🤖 LLM USAGE (once) + 🔧 NON-LLM: Template once, render and send locally
+    
+    One LLM call writes the template from a small recipient sample. Every
+    recipient is then rendered in chunks and handed to the sink by at most
+    ``max_in_flight`` workers; the bounded queue between them applies
+    backpressure so rendering never runs far ahead of a slow sink.
+    """
+    
+    def __init__(self, generator: LLMCommunicationGenerator, sink=None,
+                 chunk_size: int = 500, max_in_flight: int = 4, sample_size: int = 3):
+        self.generator = generator
+        self.sink = sink if sink is not None else SMTPStubSink()
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight
+        self.sample_size = sample_size
+    
+    async def send(self, recipients: Iterable[Dict], context: str,
+                   email_type: str = "notification",
+                   email_content: Optional[Dict] = None) -> Dict[str, Any]:
+        """Send one personalized message per recipient; ``recipients`` may be a generator"""
+        total = len(recipients) if hasattr(recipients, "__len__") else None
+        recipients = iter(recipients)
+        sample = list(itertools.islice(recipients, self.sample_size))
+        if email_content is None:
+            email_content = await self.generator.generate_email(
+                sample, context, email_type, total_recipients=total
+            )
+        template = self._compile_template(email_content, sample, context)
+        
+        started = time.perf_counter()
+        stats = {"sent": 0, "failed": 0, "skipped": 0, "batches": 0, "errors": []}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+        workers = [asyncio.ensure_future(self._drain(queue, stats))
+                   for _ in range(self.max_in_flight)]
+        try:
+            for messages, skipped in template.render_chunks(
+                itertools.chain(sample, recipients), self.chunk_size
+            ):
+                stats["skipped"] += skipped
+                if messages:
+                    await queue.put(messages)
+                await asyncio.sleep(0)  # Let workers run between CPU-bound chunks
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        
+        recipient_count = stats["sent"] + stats["failed"] + stats["skipped"]
+        if stats["failed"] == 0:
+            status = "sent"
+        else:
+            status = "partial" if stats["sent"] else "failed"
+        logger.info("   📨 %s/%s messages sent in %s batches (%.2fs)",
+                    stats["sent"], recipient_count, stats["batches"], time.perf_counter() - started)
+        return {
+            "status": status,
+            "recipient_count": recipient_count,
+            "sent": stats["sent"],
+            "failed": stats["failed"],
+            "skipped": stats["skipped"],
+            "batches": stats["batches"],
+            "errors": stats["errors"],
+            "subject": template.email_content.get("subject"),
+        }
+    
+    def _compile_template(self, email_content: Dict, sample: List[Dict], context: str) -> EmailTemplate:
+        fields = {field for recipient in sample for field in recipient}
+        try:
+            return EmailTemplate(email_content, fields)
+        except EmailTemplateError as e:
+            logger.warning("   ⚠️  %s; using the standard template", e)
+            return EmailTemplate(self.generator._fallback_email_generation(sample, context), fields)
+    
+    async def _drain(self, queue: asyncio.Queue, stats: Dict):
+        while True:
+            messages = await queue.get()
+            if messages is None:
+                return
+            try:
+                sent = await self.sink.send_batch(messages)
+                stats["sent"] += sent
+            except Exception as e:
+                # A failed batch is counted, not fatal: the remaining batches still go out
+                stats["failed"] += len(messages)
+                if len(stats["errors"]) < 5:
+                    stats["errors"].append(str(e))
+            stats["batches"] += 1
@@ -0,0 +1,280 @@
+import heapq
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from caches import PlanTemplateCache
+from sql_engine import SQLExecutionEngine
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# NON-LLM ENTITY RESOLUTION: TRIGRAM + BK-TREE FUZZY INDEX
+# ============================================================================
+
+def _levenshtein(a: str, b: str) -> int:
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        append = current.append
+        for j, char_b in enumerate(b, 1):
+            insert = current[j - 1] + 1
+            delete = previous[j] + 1
+            replace = previous[j - 1] + (char_a != char_b)
+            # Inlined min(): this loop dominates entity lookups
+            append(insert if insert < delete and insert < replace
+                   else delete if delete < replace else replace)
+        previous = current
+    return previous[-1]
+
+
+class _FuzzyColumn:
+    """Trigram postings plus a BK-tree over the words of one column's distinct values"""
+    
+    def __init__(self):
+        self.values: Dict[str, str] = {}  # lower-cased -> original
+        self.postings: Dict[str, set] = {}
+        self.words: Dict[str, set] = {}  # word -> lower-cased values containing it
+        self.tree: Optional[List] = None  # [word, {distance: child}]
+    
+    @staticmethod
+    def trigrams(text: str) -> set:
+        padded = f"  {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    def add(self, value: str):
+        key = value.lower()
+        if key in self.values:
+            return
+        self.values[key] = value
+        for trigram in self.trigrams(key):
+            self.postings.setdefault(trigram, set()).add(key)
+        for word in key.split():
+            if word not in self.words:
+                self.words[word] = set()
+                self._insert_word(word)
+            self.words[word].add(key)
+    
+    def remove(self, value: str):
+        # BK-tree words stay as routing points; only live values are ever returned
+        key = value.lower()
+        if self.values.pop(key, None) is None:
+            return
+        for trigram in self.trigrams(key):
+            keys = self.postings.get(trigram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[trigram]
+        for word in key.split():
+            self.words.get(word, set()).discard(key)
+    
+    def sharing_trigrams(self, key: str, limit: int) -> List[str]:
+        # Trigrams shared by a large share of the column say nothing about the match
+        ceiling = max(32, len(self.values) // 100)
+        counts: Dict[str, int] = {}
+        for trigram in self.trigrams(key):
+            keys = self.postings.get(trigram, ())
+            if len(keys) <= ceiling:
+                for value in keys:
+                    counts[value] = counts.get(value, 0) + 1
+        return heapq.nlargest(limit, counts, key=counts.get)
+    
+    def with_similar_words(self, key: str, limit: int) -> List[str]:
+        found = []
+        for word in key.split():
+            if len(word) < 3:
+                continue
+            for similar in self._words_within(word, 1 if len(word) <= 5 else 2):
+                found.extend(self.words[similar])
+                if len(found) >= limit:
+                    return found[:limit]
+        return found
+    
+    def _insert_word(self, word: str):
+        if self.tree is None:
+            self.tree = [word, {}]
+            return
+        node = self.tree
+        while True:
+            distance = _levenshtein(word, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [word, {}]
+                return
+            node = child
+    
+    def _words_within(self, word: str, tolerance: int) -> List[str]:
+        found, stack = [], [self.tree] if self.tree else []
+        while stack:
+            candidate, children = stack.pop()
+            distance = _levenshtein(word, candidate)
+            if distance <= tolerance and self.words[candidate]:
+                found.append(candidate)
+            stack.extend(child for edge, child in children.items()
+                         if distance - tolerance <= edge <= distance + tolerance)
+        return found
+
+
+class EntityResolutionIndex:
+    """
+    🔧 NON-LLM: Decide MATCH / CONFIRM / CLARIFICATION_NEEDED for entity filters
+    
+    Replaces sending every distinct database value to the LLM and letting it
+    answer CONFIRM: or CLARIFICATION_NEEDED:. Candidates come from shared
+    trigrams and from a BK-tree (edit distance) over the words of each
+    column's distinct values, and are scored by the better of trigram Dice similarity and
+    normalized edit similarity. Only the top-k shortlist leaves the index.
+    """
+    
+    MATCH = "MATCH"
+    CONFIRM = "CONFIRM"
+    CLARIFICATION_NEEDED = "CLARIFICATION_NEEDED"
+    
+    # Column -> SQL for its distinct values
+    COLUMNS = {
+        "department": "SELECT DISTINCT department AS value FROM participants WHERE department IS NOT NULL",
+        "company_name": "SELECT DISTINCT company_name AS value FROM companies",
+        "country": "SELECT DISTINCT country AS value FROM companies WHERE country IS NOT NULL",
+    }
+    # Parsed filter / plan parameter -> column it names a value of
+    FILTER_COLUMNS = {"department": "department", "company": "company_name",
+                      "company_name": "company_name", "country": "country"}
+    ALIASES = {
+        "country": {"us": "United States", "usa": "United States", "u.s.": "United States",
+                    "uk": "United Kingdom", "u.k.": "United Kingdom", "britain": "United Kingdom"},
+    }
+    
+    SHORTLIST = 12  # candidates scored per lookup
+    EDIT_VERIFY = 4  # of which the best are re-scored by edit distance
+    
+    def __init__(self, sql_engine: Optional["SQLExecutionEngine"] = None, top_k: int = 3,
+                 confirm_threshold: float = 0.6, min_candidate_score: float = 0.4,
+                 refresh_seconds: float = 300.0):
+        self.sql_engine = sql_engine
+        self.top_k = top_k
+        self.confirm_threshold = confirm_threshold
+        self.min_candidate_score = min_candidate_score
+        self.refresh_seconds = refresh_seconds
+        self.columns: Dict[str, _FuzzyColumn] = {column: _FuzzyColumn() for column in self.COLUMNS}
+        self.stats = {"matches": 0, "confirms": 0, "clarifications": 0, "refreshes": 0}
+        self._refreshed_at: Optional[float] = None
+    
+    def add(self, column: str, value: str):
+        self.columns.setdefault(column, _FuzzyColumn()).add(value)
+    
+    def remove(self, column: str, value: str):
+        if column in self.columns:
+            self.columns[column].remove(value)
+    
+    async def refresh(self, force: bool = False):
+        """Sync with the database, adding and removing only the values that changed"""
+        if self.sql_engine is None:
+            return
+        now = time.monotonic()
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        self._refreshed_at = now
+        for column, sql in self.COLUMNS.items():
+            try:
+                rows = await self.sql_engine.execute(sql)
+            except sqlite3.Error as e:
+                logger.warning("   ⚠️  Entity index refresh skipped %s: %s", column, e)
+                continue
+            current = {str(row["value"]) for row in rows}
+            index = self.columns[column]
+            for value in set(index.values.values()) - current:
+                index.remove(value)
+            for value in current:
+                index.add(value)
+        self.stats["refreshes"] += 1
+    
+    def candidates(self, column: str, text: str, k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Top-k (value, score) pairs for ``text``; scores are in [0, 1]"""
+        index = self.columns.get(column)
+        key = " ".join(text.lower().split())
+        if index is None or not key:
+            return []
+        shortlist = index.sharing_trigrams(key, limit=self.SHORTLIST)
+        scored = self._score(index, key, shortlist)
+        if not scored or scored[0][1] < self.confirm_threshold:
+            # Short or heavily misspelled words share few trigrams; look for near-miss words
+            extra = [value for value in index.with_similar_words(key, self.SHORTLIST) if value not in shortlist]
+            scored = sorted(scored + self._score(index, key, extra), key=lambda item: (-item[1], item[0]))
+        return [(index.values[value], score) for value, score in scored[:k or self.top_k]
+                if score >= self.min_candidate_score]
+    
+    def _score(self, index: _FuzzyColumn, key: str, values: List[str]) -> List[Tuple[str, float]]:
+        query_trigrams = index.trigrams(key)
+        scored = []
+        for value in values:
+            value_trigrams = index.trigrams(value)
+            dice = 2 * len(query_trigrams & value_trigrams) / (len(query_trigrams) + len(value_trigrams))
+            scored.append((value, dice))
+        scored.sort(key=lambda item: -item[1])
+        
+        # Edit distance only for the best few, against as many leading words as the
+        # query has: "microsft" ~ "microsoft corporation"
+        width = len(key.split())
+        for position, (value, dice) in enumerate(scored[:self.EDIT_VERIFY]):
+            head = " ".join(value.split()[:width])
+            edit = 1 - _levenshtein(key, head) / max(len(key), len(head))
+            scored[position] = (value, max(dice, 0.95 * edit))
+        scored = [(value, round(score, 3)) for value, score in scored]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+    
+    def resolve(self, column: str, text: str) -> Dict[str, Any]:
+        """MATCH with the canonical value, CONFIRM a likely one, or ask for clarification"""
+        index = self.columns.get(column) or _FuzzyColumn()
+        key = text.strip().lower()
+        label = column.replace("_name", "").replace("_", " ")
+        canonical = index.values.get(key) or self.ALIASES.get(column, {}).get(key)
+        if canonical is None:
+            # "Apple" -> "Apple Inc." when exactly one value starts with those words
+            first_word = key.split()[0] if key else ""
+            prefixed = [index.values[lowered] for lowered in index.words.get(first_word, ())
+                        if lowered.startswith(key + " ") or lowered.startswith(key + ",")]
+            canonical = prefixed[0] if len(prefixed) == 1 else None
+        if canonical is not None:
+            self.stats["matches"] += 1
+            return {"decision": self.MATCH, "column": column, "text": text, "value": canonical}
+        
+        shortlist = self.candidates(column, text)
+        if shortlist and shortlist[0][1] >= self.confirm_threshold:
+            self.stats["confirms"] += 1
+            return {"decision": self.CONFIRM, "column": column, "text": text, "value": shortlist[0][0],
+                    "candidates": shortlist,
+                    "message": f"Did you mean '{text}' as '{shortlist[0][0]}'?"}
+        
+        self.stats["clarifications"] += 1
+        available = [value for value, _ in shortlist] or sorted(index.values.values())[:10]
+        return {"decision": self.CLARIFICATION_NEEDED, "column": column, "text": text,
+                "candidates": shortlist,
+                "message": f"Could not find {label} '{text}'. Available: {', '.join(available)}"}
+    
+    def resolve_filters(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Rewrite matched filter values in place; return the decisions needing the user"""
+        unresolved = []
+        for name, column in self.FILTER_COLUMNS.items():
+            value = filters.get(name)
+            values = value if isinstance(value, list) else [value]
+            resolved = []
+            for item in values:
+                if not isinstance(item, str) or item.strip().lower() in PlanTemplateCache.ABSENT_VALUES:
+                    resolved.append(item)
+                    continue
+                decision = self.resolve(column, item)
+                if decision["decision"] == self.MATCH:
+                    resolved.append(decision["value"])
+                else:
+                    resolved.append(item)
+                    unresolved.append(decision)
+            if value is not None:
+                filters[name] = resolved if isinstance(value, list) else resolved[0]
+        return unresolved
@@ -0,0 +1,655 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import random
+import time
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Dict, List, Any, AsyncIterator, Callable, Optional, Tuple, Union
+
+try:
+    import openai
+except ImportError:  # Only OpenAIBackend needs it; synthetic and replay backends run offline
+    openai = None
+
+from tracing import _NOOP_SPAN, _current_span, _llm_usage, trace_annotate, trace_span
+
+# ============================================================================
+# SHARED LLM CLIENT: POOLING, CONCURRENCY LIMITS, RETRIES, SINGLE-FLIGHT
+# ============================================================================
+
+class TransientLLMError(Exception):
+    """Retryable upstream failure (rate limit, timeout, overloaded server)"""
+
+
+class LLMDeadlineExceeded(asyncio.TimeoutError):
+    """Raised when the request deadline passes before the LLM answers"""
+
+
+# Absolute time.monotonic() deadline for the current request, set by process_query
+_llm_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+@contextlib.contextmanager
+def llm_deadline(seconds: Optional[float]):
+    """Bound every LLM call made inside this block (nested blocks keep the tighter one)"""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _llm_deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _llm_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _llm_deadline.reset(token)
+
+
+def _transient_openai_errors() -> tuple:
+    error_module = getattr(openai, "error", None)
+    names = ("RateLimitError", "APIError", "Timeout", "ServiceUnavailableError",
+             "APIConnectionError", "TryAgain")
+    return tuple(getattr(error_module, name) for name in names if hasattr(error_module, name))
+
+
+_TRANSIENT_ERRORS = (TransientLLMError, asyncio.TimeoutError, ConnectionError) + _transient_openai_errors()
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for offline accounting"""
+    return max(1, len(text) // 4)
+
+
+def _make_completion(content: str, prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    """Build an object shaped like an openai ChatCompletion response"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens,
+                              completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens),
+    )
+
+
+class OpenAIBackend:
+    """Calls the OpenAI API over one pooled keep-alive HTTP session"""
+    
+    def __init__(self, pool_size: int = 32):
+        if openai is None:
+            raise ImportError("OpenAIBackend needs the openai package; use a synthetic or replay backend offline")
+        self.pool_size = pool_size
+        self._session = None
+        self._session_loop = None
+    
+    async def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            import aiohttp  # Installed alongside openai
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            )
+            self._session_loop = loop
+        return self._session
+    
+    async def complete(self, model: str, messages: List[Dict], temperature: float,
+                       max_tokens: int, timeout: float):
+        openai.aiosession.set(await self._get_session())
+        return await openai.ChatCompletion.acreate(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            request_timeout=timeout,
+        )
+    
+    async def stream(self, model: str, messages: List[Dict], temperature: float,
+                     max_tokens: int, timeout: float) -> AsyncIterator[str]:
+        openai.aiosession.set(await self._get_session())
+        response = await openai.ChatCompletion.acreate(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            request_timeout=timeout,
+            stream=True,
+        )
+        async for chunk in response:
+            delta = chunk["choices"][0]["delta"].get("content")
+            if delta:
+                yield delta
+    
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class FakeLLMBackend:
+    """Offline backend for tests and load tests: canned completions, simulated latency
+    
+    ``responder(model, messages)`` returns the completion text; ``failure_rate``
+    injects TransientLLMError to exercise the retry path. Latency is
+    ``latency`` ± ``jitter`` plus ``seconds_per_token`` for every completion
+    token, mimicking generation time.
+    """
+    
+    def __init__(self, responder: Optional[Callable[[str, List[Dict]], str]] = None,
+                 latency: float = 0.05, jitter: float = 0.0, failure_rate: float = 0.0,
+                 seed: Optional[int] = None, seconds_per_token: float = 0.0):
+        self.responder = responder or (lambda model, messages: "{}")
+        self.latency = latency
+        self.jitter = jitter
+        self.seconds_per_token = seconds_per_token
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+    
+    async def complete(self, model: str, messages: List[Dict], temperature: float,
+                       max_tokens: int, timeout: float):
+        self.calls += 1
+        content = self.responder(model, messages)
+        completion_tokens = _estimate_tokens(content)
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay + completion_tokens * self.seconds_per_token))
+        if self._random.random() < self.failure_rate:
+            raise TransientLLMError("Simulated rate limit (429)")
+        prompt_text = "".join(message["content"] for message in messages)
+        return _make_completion(content, _estimate_tokens(prompt_text), completion_tokens)
+    
+    async def stream(self, model: str, messages: List[Dict], temperature: float,
+                     max_tokens: int, timeout: float, chunk_chars: int = 16) -> AsyncIterator[str]:
+        self.calls += 1
+        content = self.responder(model, messages)
+        await asyncio.sleep(max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)))
+        if self._random.random() < self.failure_rate:
+            raise TransientLLMError("Simulated rate limit (429)")
+        for start in range(0, len(content), chunk_chars):
+            chunk = content[start:start + chunk_chars]
+            if self.seconds_per_token:
+                await asyncio.sleep(_estimate_tokens(chunk) * self.seconds_per_token)
+            yield chunk
+    
+    async def close(self):
+        pass
+
+
+class CassetteMissError(LookupError):
+    """A replayed prompt has no recorded completion"""
+
+
+class RecordReplayBackend:
+    """Offline backend that replays completions captured from another backend
+    
+    Prompt -> completion pairs live in a JSONL cassette keyed by the same
+    request hash LLMClient uses for coalescing, so any prompt change (a new
+    template, different context) is a miss rather than a stale answer.
+    
+    Modes: "record" always calls ``inner`` and appends the pair; "replay"
+    only reads the cassette and raises CassetteMissError on a miss; "auto"
+    replays hits and records misses. ``latency`` ± ``jitter`` is slept before
+    each replayed answer so replays can stand in for a live endpoint.
+    """
+    
+    MODES = ("record", "replay", "auto")
+    
+    def __init__(self, path: str, mode: str = "replay", inner=None,
+                 latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}, not {mode!r}")
+        if mode != "replay" and inner is None:
+            raise ValueError(f"mode {mode!r} needs an inner backend to record from")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.latency = latency
+        self.jitter = jitter
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self._random = random.Random(seed)
+        self._lock = asyncio.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as cassette:
+                for line in cassette:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._records[record["key"]] = record  # Later takes win
+    
+    async def complete(self, model: str, messages: List[Dict], temperature: float,
+                       max_tokens: int, timeout: float):
+        key = LLMClient._request_key(model, messages, temperature, max_tokens)
+        record = await self._replay(key, model)
+        if record is not None:
+            return _make_completion(record["content"], record["prompt_tokens"], record["completion_tokens"])
+        
+        response = await self.inner.complete(model, messages, temperature, max_tokens, timeout)
+        usage = getattr(response, "usage", None)
+        content = response.choices[0].message.content
+        await self._record(key, model, messages, temperature, max_tokens, content,
+                           getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+        return response
+    
+    async def stream(self, model: str, messages: List[Dict], temperature: float,
+                     max_tokens: int, timeout: float, chunk_chars: int = 16) -> AsyncIterator[str]:
+        key = LLMClient._request_key(model, messages, temperature, max_tokens)
+        record = await self._replay(key, model)
+        if record is not None:
+            content = record["content"]
+            for start in range(0, len(content), chunk_chars):
+                yield content[start:start + chunk_chars]
+            return
+        
+        deltas = []
+        async for delta in self.inner.stream(model, messages, temperature, max_tokens, timeout):
+            deltas.append(delta)
+            yield delta
+        await self._record(key, model, messages, temperature, max_tokens, "".join(deltas), None, None)
+    
+    async def _replay(self, key: str, model: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(key) if self.mode != "record" else None
+        if record is not None:
+            self.stats["hits"] += 1
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return record
+        self.stats["misses"] += 1
+        if self.mode == "replay":
+            raise CassetteMissError(f"No recorded {model} completion for request {key[:12]} in {self.path}")
+        return None
+    
+    async def _record(self, key: str, model: str, messages: List[Dict], temperature: float,
+                      max_tokens: int, content: str, prompt_tokens: Optional[int],
+                      completion_tokens: Optional[int]):
+        record = {
+            "key": key, "model": model, "messages": messages,
+            "temperature": temperature, "max_tokens": max_tokens, "content": content,
+            "prompt_tokens": prompt_tokens if prompt_tokens is not None
+            else _estimate_tokens("".join(message["content"] for message in messages)),
+            "completion_tokens": completion_tokens if completion_tokens is not None
+            else _estimate_tokens(content),
+        }
+        self._records[key] = record
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._append, json.dumps(record) + "\n")
+        self.stats["recorded"] += 1
+    
+    def _append(self, line: str):
+        with open(self.path, "a", encoding="utf-8") as cassette:
+            cassette.write(line)
+    
+    async def close(self):
+        if self.inner is not None:
+            await self.inner.close()
+
+
+class LLMClient:
+    """Single entry point for every LLM call made by the agent
+    
+    - per-model semaphores bound concurrent upstream requests
+    - transient errors are retried with full-jitter exponential backoff
+    - each attempt is capped by the deadline set with ``llm_deadline``
+    - identical in-flight requests are coalesced into one upstream call
+    
+    A coalesced call keeps retrying until the latest deadline among its
+    callers, so a follower never inherits a leader's shorter deadline. Client
+    ``stats`` count upstream calls and tokens once; each caller's request
+    usage and LLM span are charged the tokens of the response it received.
+    
+    One client belongs to one event loop at a time; its limits are rebuilt if it
+    is reused from a new loop.
+    """
+    
+    def __init__(self, backend=None, max_concurrency_per_model: Union[int, Dict[str, int]] = 4,
+                 max_retries: int = 3, base_backoff: float = 0.5, max_backoff: float = 8.0,
+                 request_timeout: float = 60.0):
+        self.backend = backend if backend is not None else OpenAIBackend()
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.request_timeout = request_timeout
+        self.stats = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, _Flight] = {}
+        self._loop = None
+    
+    async def chat(self, model: str, messages: List[Dict], temperature: float = 0.0,
+                   max_tokens: int = 1000, deadline: Optional[float] = None):
+        """Return a ChatCompletion-shaped response for these messages"""
+        self._bind_loop()
+        if deadline is None:
+            deadline = _llm_deadline.get()
+        self.stats["requests"] += 1
+        usage = _llm_usage.get()
+        if usage is not None:
+            usage["calls"] += 1
+        
+        with trace_span(kind="llm", model=model) as span:
+            key = self._request_key(model, messages, temperature, max_tokens)
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight(deadline)
+                flight.future = asyncio.ensure_future(
+                    self._call_with_retries(model, messages, temperature, max_tokens, flight)
+                )
+                flight.future.add_done_callback(lambda future: self._finish_flight(key, flight))
+            else:
+                self.stats["coalesced"] += 1
+                span.set(coalesced=True)
+                flight.extend(deadline)
+            
+            # shield() so one caller giving up never cancels the call others share
+            remaining = self._remaining(deadline)
+            try:
+                if remaining is None:
+                    response = await asyncio.shield(flight.future)
+                else:
+                    response = await asyncio.wait_for(asyncio.shield(flight.future), max(remaining, 0.0))
+            except LLMDeadlineExceeded:
+                raise
+            except asyncio.TimeoutError:
+                raise LLMDeadlineExceeded(f"{model} call exceeded the request deadline") from None
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self._charge(getattr(usage, "prompt_tokens", 0) or 0,
+                             getattr(usage, "completion_tokens", 0) or 0, span)
+            return response
+    
+    async def _call_with_retries(self, model: str, messages: List[Dict], temperature: float,
+                                 max_tokens: int, flight: "_Flight"):
+        semaphore = self._semaphore_for(model)
+        attempt = 0
+        while True:
+            remaining = self._remaining(flight.deadline)  # Re-read: later callers may extend it
+            if remaining is not None and remaining <= 0:
+                raise LLMDeadlineExceeded(f"{model} call exceeded the request deadline")
+            timeout = self.request_timeout if remaining is None else min(self.request_timeout, remaining)
+            try:
+                async with semaphore:
+                    self.stats["upstream_calls"] += 1
+                    response = await asyncio.wait_for(
+                        self.backend.complete(model, messages, temperature, max_tokens, timeout),
+                        timeout,
+                    )
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    self._count_tokens(getattr(usage, "prompt_tokens", 0) or 0,
+                                       getattr(usage, "completion_tokens", 0) or 0)
+                return response
+            except LLMDeadlineExceeded:
+                raise  # A TimeoutError subclass, but never worth retrying
+            except _TRANSIENT_ERRORS as e:
+                await self._backoff(model, attempt, flight.deadline, e)
+                attempt += 1
+                trace_annotate(retries=attempt)
+    
+    async def stream_chat(self, model: str, messages: List[Dict], temperature: float = 0.0,
+                          max_tokens: int = 1000, deadline: Optional[float] = None,
+                          stage: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield completion text deltas as they arrive
+        
+        Retries only happen before the first delta; streams are never coalesced.
+        Every read from upstream is bounded by the request timeout and deadline,
+        and deltas are buffered so the model's semaphore is released as soon as
+        upstream finishes, however slowly the consumer reads.
+        ``stage`` names the LLM span, since the consumer's span may be another stage's.
+        """
+        self._bind_loop()
+        if deadline is None:
+            deadline = _llm_deadline.get()
+        self.stats["requests"] += 1
+        usage = _llm_usage.get()
+        if usage is not None:
+            usage["calls"] += 1
+        # Never made current: this generator's code runs interleaved with its consumer's
+        span = trace_span(stage, kind="llm", model=model, streamed=True)
+        
+        buffered: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.ensure_future(
+            self._read_stream(model, messages, temperature, max_tokens, deadline, buffered.put_nowait)
+        )
+        try:
+            completion = []
+            while True:
+                delta = await buffered.get()
+                if delta is None:
+                    break
+                if isinstance(delta, Exception):
+                    raise delta
+                completion.append(delta)
+                yield delta
+            
+            # Streamed responses carry no usage block; estimate like the fake backend
+            prompt_tokens = _estimate_tokens("".join(m["content"] for m in messages))
+            completion_tokens = _estimate_tokens("".join(completion))
+            self._count_tokens(prompt_tokens, completion_tokens)
+            self._charge(prompt_tokens, completion_tokens, span)
+        except Exception as e:
+            span.end(e)
+            raise
+        finally:
+            if not reader.done():
+                reader.cancel()  # The consumer stopped early
+            await asyncio.gather(reader, return_exceptions=True)
+            span.end()
+    
+    async def _read_stream(self, model: str, messages: List[Dict], temperature: float,
+                           max_tokens: int, deadline: Optional[float], put: Callable[[Any], None]):
+        """Pull one stream's deltas into ``put`` under the model's semaphore
+        
+        Ends with None; a failure is put before it. A read that stalls past the
+        request timeout or deadline raises LLMDeadlineExceeded.
+        """
+        deltas = None
+        try:
+            async with self._semaphore_for(model):
+                attempt = 0
+                while True:
+                    remaining = self._remaining(deadline)
+                    if remaining is not None and remaining <= 0:
+                        raise LLMDeadlineExceeded(f"{model} call exceeded the request deadline")
+                    timeout = self.request_timeout if remaining is None else min(self.request_timeout, remaining)
+                    self.stats["upstream_calls"] += 1
+                    deltas = self.backend.stream(model, messages, temperature, max_tokens, timeout).__aiter__()
+                    try:
+                        put(await asyncio.wait_for(deltas.__anext__(), timeout))
+                        break
+                    except StopAsyncIteration:
+                        return
+                    except LLMDeadlineExceeded:
+                        raise  # A TimeoutError subclass, but never worth retrying
+                    except _TRANSIENT_ERRORS as e:
+                        # Close the failed attempt's stream before opening the next one
+                        failed, deltas = deltas, None
+                        await self._close_stream(failed)
+                        await self._backoff(model, attempt, deadline, e)
+                        attempt += 1
+                
+                while True:
+                    remaining = self._remaining(deadline)
+                    if remaining is not None and remaining <= 0:
+                        raise LLMDeadlineExceeded(f"{model} stream exceeded the request deadline")
+                    timeout = self.request_timeout if remaining is None else min(self.request_timeout, remaining)
+                    try:
+                        put(await asyncio.wait_for(deltas.__anext__(), timeout))
+                    except StopAsyncIteration:
+                        return
+                    except LLMDeadlineExceeded:
+                        raise
+                    except asyncio.TimeoutError:
+                        raise LLMDeadlineExceeded(f"{model} stream stalled for {timeout:.1f}s") from None
+        except Exception as e:
+            put(e)
+        finally:
+            put(None)
+            await self._close_stream(deltas)
+    
+    @staticmethod
+    async def _close_stream(deltas):
+        """Close a backend delta iterator so its connection is released"""
+        if deltas is not None and hasattr(deltas, "aclose"):
+            await deltas.aclose()
+    
+    def _count_tokens(self, prompt_tokens: int, completion_tokens: int):
+        """Add upstream token usage to the client totals"""
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+    
+    def _charge(self, prompt_tokens: int, completion_tokens: int, span=None):
+        """Add token usage to the current request and its LLM span"""
+        usage = _llm_usage.get()
+        if usage is not None:
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+        if span is None:
+            span = _current_span.get() or _NOOP_SPAN
+        span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    
+    async def _backoff(self, model: str, attempt: int, deadline: Optional[float], error: Exception):
+        """Sleep before retry ``attempt + 1``, or re-raise if retrying is pointless"""
+        if attempt >= self.max_retries:
+            raise error
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        remaining = self._remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            raise LLMDeadlineExceeded(f"{model} call exceeded the request deadline") from error
+        self.stats["retries"] += 1
+        await asyncio.sleep(delay)
+    
+    def _finish_flight(self, key: str, flight: "_Flight"):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.future.cancelled():
+            flight.future.exception()  # Mark retrieved even if every waiter gave up
+    
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphores = {}
+            self._inflight = {}
+    
+    def _semaphore_for(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            limit = self.max_concurrency_per_model
+            if isinstance(limit, dict):
+                limit = limit.get(model, limit.get("default", 4))
+            semaphore = self._semaphores[model] = asyncio.Semaphore(limit)
+        return semaphore
+    
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
+    
+    @staticmethod
+    def _request_key(model: str, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    async def close(self):
+        await self.backend.close()
+
+
+class _Flight:
+    """One upstream call shared by coalesced callers, and the latest of their deadlines"""
+    
+    __slots__ = ("future", "deadline")
+    
+    def __init__(self, deadline: Optional[float]):
+        self.future: Optional[asyncio.Future] = None
+        self.deadline = deadline
+    
+    def extend(self, deadline: Optional[float]):
+        if self.deadline is not None:
+            self.deadline = None if deadline is None else max(self.deadline, deadline)
+
+
+class IncrementalJSONParser:
+    """🔧 NON-LLM: Emit members of a streamed JSON document as soon as each completes
+    
+    For a top-level object ``feed`` returns (key, value) pairs; for a top-level
+    array it returns (index, value) pairs. Text before the first '{' or '['
+    (e.g. a markdown fence) is ignored.
+    """
+    
+    def __init__(self):
+        self.done = False
+        self._text: List[str] = []
+        self._root = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member: List[str] = []
+        self._index = 0
+    
+    def feed(self, chunk: str) -> List[Tuple[Any, Any]]:
+        completed = []
+        for char in chunk:
+            if self.done:
+                break
+            if self._root is None:
+                if char in "{[":
+                    self._root = char
+                    self._depth = 1
+                    self._text.append(char)
+                continue
+            self._text.append(char)
+            
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._flush_member())
+                    self.done = True
+                    continue
+            elif char == "," and self._depth == 1:
+                completed.extend(self._flush_member())
+                continue
+            self._member.append(char)
+        return completed
+    
+    def result(self) -> Any:
+        """The whole document; raises json.JSONDecodeError if it is incomplete"""
+        return json.loads("".join(self._text))
+    
+    def _flush_member(self) -> List[Tuple[Any, Any]]:
+        fragment = "".join(self._member).strip()
+        self._member = []
+        if not fragment:
+            return []
+        try:
+            if self._root == "{":
+                return list(json.loads("{" + fragment + "}").items())
+            value = json.loads(fragment)
+        except json.JSONDecodeError:
+            return []
+        self._index += 1
+        return [(self._index - 1, value)]
+
+
+_default_llm_client: Optional[LLMClient] = None
+
+
+def get_default_llm_client() -> LLMClient:
+    """Process-wide client used by LLM components constructed without one"""
+    global _default_llm_client
+    if _default_llm_client is None:
+        _default_llm_client = LLMClient()
+    return _default_llm_client
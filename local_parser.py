@@ -0,0 +1,328 @@
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from caches import PlanTemplateCache
+from rule_engine import DEFAULT_RULES_PATH
+from sql_engine import SQLExecutionEngine
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# NON-LLM FAST-PATH PARSING: COMPILED EQUITY VOCABULARY
+# ============================================================================
+
+class AhoCorasickMatcher:
+    """
+    🔧 NON-LLM: Multi-pattern matcher over a vocabulary of whole-word terms
+    
+    One pass over the text finds every vocabulary term, whatever the number of
+    terms. Adding or removing a term edits the trie in place; failure links are
+    recomputed lazily, once, before the next search after a change.
+    """
+    
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._terminal: List[Optional[Dict[str, str]]] = [None]  # category -> canonical
+        self._fail: List[int] = [0]
+        self._output_link: List[int] = [0]
+        self._depth: List[int] = [0]
+        self._dirty = False
+        self.terms = 0
+    
+    def add(self, term: str, category: str, canonical: str):
+        node = 0
+        for char in term.lower():
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._terminal.append(None)
+            node = next_node
+        if self._terminal[node] is None:
+            self._terminal[node] = {}
+            self.terms += 1
+        self._terminal[node][category] = canonical
+        self._dirty = True
+    
+    def remove(self, term: str, category: str):
+        node = 0
+        for char in term.lower():
+            node = self._goto[node].get(char)
+            if node is None:
+                return
+        meanings = self._terminal[node]
+        if meanings and meanings.pop(category, None) is not None and not meanings:
+            self._terminal[node] = None
+            self.terms -= 1
+            self._dirty = True
+    
+    def search(self, text: str) -> List[Tuple[int, int, Dict[str, str]]]:
+        """(start, end, {category: canonical}) for every whole-word match, overlaps included"""
+        if self._dirty:
+            self._link()
+        goto, fail, terminal, output_link = self._goto, self._fail, self._terminal, self._output_link
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            out = node if terminal[node] else output_link[node]
+            while out:
+                start = index - self._depth[out] + 1
+                end = index + 1
+                if ((start == 0 or not text[start - 1].isalnum())
+                        and (end == len(text) or not text[end].isalnum())):
+                    matches.append((start, end, terminal[out]))
+                out = output_link[out]
+        return matches
+    
+    def _link(self):
+        size = len(self._goto)
+        self._fail = [0] * size
+        self._output_link = [0] * size
+        self._depth = [0] * size
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._depth[node] = 1
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                self._depth[child] = self._depth[node] + 1
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                target = self._fail[child]
+                self._output_link[child] = target if self._terminal[target] else self._output_link[target]
+                queue.append(child)
+        self._dirty = False
+
+
+class LocalQueryParser:
+    """
+    🔧 NON-LLM: Parse queries made of known equity vocabulary without an LLM
+    
+    The vocabulary is the rule table's fact terms, the intent words below and
+    the distinct departments, companies, countries and award types in the
+    database. Confidence is how much of the query the vocabulary explains,
+    calibrated per score bin against how often the LLM parse agreed with the
+    local one whenever both ran.
+    """
+    
+    # Matched terms are attributed to the first category that claims them
+    CATEGORY_PRIORITY = ("security_types", "participant_types", "departments", "companies",
+                         "countries", "targets", "outputs", "actions", "concepts", "events")
+    INTENT_TERMS = {
+        "targets": {
+            "participants": ["participant", "participants", "people", "holders", "recipients"],
+            "grants": ["grant", "grants", "award", "awards", "holdings", "equity awards"],
+            "companies": ["company", "companies", "portfolio companies"],
+        },
+        "outputs": {
+            "report": ["report", "reports", "summary", "summarize", "breakdown", "dashboard"],
+            "benchmark": ["benchmark", "benchmarks", "compare", "comparison", "versus"],
+        },
+        "events": {
+            "grant": ["granted", "issued", "awarded"],
+            "expire": ["expire", "expires", "expiring", "expiration"],
+            "release": ["release", "releases", "released"],
+        },
+    }
+    FILLER = frozenset("""
+        a all an and any are as at be by can did do does for from get give has have how i in is
+        list me my of on or our please pull show that the their them there these this those to
+        us was we were what which who whose will with would display find fetch
+    """.split())
+    BLOCKERS = frozenset("not no except excluding exclude without unless never besides but".split())
+    
+    def __init__(self, facts: Dict[str, Dict[str, List[str]]], sql_engine: Optional["SQLExecutionEngine"] = None,
+                 refresh_seconds: float = 300.0, calibration_bins: int = 10, prior_weight: float = 5.0):
+        self.matcher = AhoCorasickMatcher()
+        self.sql_engine = sql_engine
+        self.refresh_seconds = refresh_seconds
+        self.calibration_bins = calibration_bins
+        self.prior_weight = prior_weight
+        self.stats = {"parses": 0, "agreements": 0, "disagreements": 0, "refreshes": 0}
+        self._bins = [[0, 0] for _ in range(calibration_bins)]  # [agreed, observed] per raw-score bin
+        self._database_terms: Dict[str, Dict[str, str]] = {}
+        self._refreshed_at: Optional[float] = None
+        for category, groups in list(facts.items()) + list(self.INTENT_TERMS.items()):
+            for canonical, terms in groups.items():
+                for term in terms:
+                    self.matcher.add(term, category, canonical)
+    
+    @classmethod
+    def from_file(cls, path: Optional[str] = None, **kwargs) -> "LocalQueryParser":
+        with open(path or DEFAULT_RULES_PATH, encoding="utf-8") as f:
+            return cls(json.load(f).get("facts", {}), **kwargs)
+    
+    async def refresh_database_values(self, force: bool = False):
+        """Sync database-derived terms into the matcher, touching only what changed"""
+        if self.sql_engine is None:
+            return
+        now = time.monotonic()
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        self._refreshed_at = now
+        queries = {
+            "departments": "SELECT DISTINCT department AS value FROM participants WHERE department IS NOT NULL",
+            "companies": "SELECT DISTINCT company_name AS value FROM companies",
+            "countries": "SELECT DISTINCT country AS value FROM companies WHERE country IS NOT NULL",
+            "security_types": "SELECT DISTINCT award_type AS value FROM equity_awards WHERE award_type IS NOT NULL",
+        }
+        for category, sql in queries.items():
+            try:
+                rows = await self.sql_engine.execute(sql)
+            except sqlite3.Error as e:
+                logger.warning("   ⚠️  Vocabulary refresh skipped %s: %s", category, e)
+                continue
+            current = {str(row["value"]).lower(): str(row["value"]) for row in rows}
+            previous = self._database_terms.get(category, {})
+            for term in previous.keys() - current.keys():
+                self.matcher.remove(term, category)
+            for term in current.keys() - previous.keys():
+                self.matcher.add(term, category, current[term])
+            self._database_terms[category] = current
+        self.stats["refreshes"] += 1
+    
+    def parse(self, query: str) -> Dict[str, Any]:
+        """A parse in the LLM's output shape; ``confidence`` says whether to trust it"""
+        self.stats["parses"] += 1
+        text = " ".join(query.lower().split())
+        found: Dict[str, List[str]] = {category: [] for category in self.CATEGORY_PRIORITY}
+        first_seen: Dict[str, int] = {}
+        covered = [False] * len(text)
+        ambiguous_chars = 0
+        for start, end, meanings in self._longest_matches(self.matcher.search(text)):
+            category = next((name for name in self.CATEGORY_PRIORITY if name in meanings), None)
+            if category is None:
+                continue
+            found[category].append(meanings[category])
+            first_seen.setdefault(category, start)
+            covered[start:end] = [True] * (end - start)
+            if len(meanings) > 1:
+                ambiguous_chars += end - start
+        
+        tokens = [(match.start(), match.end(), match.group())
+                  for match in re.finditer(r"[\w()'-]+", text)]
+        blocked = any(token in self.BLOCKERS for _, _, token in tokens)
+        explained = sum(
+            end - start for start, end, token in tokens
+            if token in self.FILLER or all(covered[start:end])
+        )
+        total = sum(end - start for start, end, _ in tokens) or 1
+        coverage = max(0.0, explained - ambiguous_chars / 2) / total
+        
+        parsed = self._assemble(found, first_seen)
+        has_target = bool(parsed["entities"]["target"])
+        raw_score = 0.0 if blocked else coverage * (1.0 if has_target else 0.5)
+        parsed["raw_confidence"] = round(raw_score, 3)
+        parsed["confidence"] = round(self._calibrate(raw_score), 3)
+        return parsed
+    
+    def record_outcome(self, local_parsed: Dict[str, Any], llm_parsed: Dict[str, Any]):
+        """Calibrate: did the LLM parse agree with the local one on the fields that matter?"""
+        agreed = self._signature(local_parsed) == self._signature(llm_parsed)
+        bin_stats = self._bins[self._bin(local_parsed.get("raw_confidence", 0.0))]
+        bin_stats[0] += agreed
+        bin_stats[1] += 1
+        self.stats["agreements" if agreed else "disagreements"] += 1
+    
+    def _calibrate(self, raw_score: float) -> float:
+        # Observed agreement per bin, shrunk toward the raw score until a bin has data
+        agreed, observed = self._bins[self._bin(raw_score)]
+        return (agreed + raw_score * self.prior_weight) / (observed + self.prior_weight)
+    
+    def _bin(self, raw_score: float) -> int:
+        return min(int(raw_score * self.calibration_bins), self.calibration_bins - 1)
+    
+    @staticmethod
+    def _longest_matches(matches: List[Tuple[int, int, Dict[str, str]]]):
+        chosen, position = [], 0
+        for start, end, meanings in sorted(matches, key=lambda match: (match[0], match[0] - match[1])):
+            if start >= position:
+                chosen.append((start, end, meanings))
+                position = end
+        return chosen
+    
+    def _assemble(self, found: Dict[str, List[str]], first_seen: Dict[str, int]) -> Dict[str, Any]:
+        def one_or_many(values: List[str]):
+            values = list(dict.fromkeys(values))
+            return values[0] if len(values) == 1 else values
+        
+        filters = {}
+        for category, filter_name in (("departments", "department"), ("security_types", "security_type"),
+                                      ("participant_types", "participant_type"),
+                                      ("companies", "company_name"), ("countries", "country")):
+            if found[category]:
+                filters[filter_name] = one_or_many(found[category])
+        
+        targets = list(dict.fromkeys(found["targets"]))
+        if len(targets) == 1:
+            target = targets[0]
+        elif targets:
+            target = "participants" if "participants" in targets else targets[0]
+        elif found["security_types"] and found["participant_types"]:
+            # "officers with options" asks for people; "options held by officers" for grants
+            people_first = first_seen["participant_types"] < first_seen["security_types"]
+            target = "participants" if people_first else "grants"
+        elif found["security_types"]:
+            target = "grants"
+        elif found["participant_types"] or found["departments"]:
+            target = "participants"
+        else:
+            target = ""
+        
+        sends = "send" in found["actions"]
+        outputs = set(found["outputs"])
+        if sends:
+            primary_action, output_format = "send", "email"
+        elif "report" in outputs or "benchmark" in outputs:
+            primary_action, output_format = "analyze", "report"
+        else:
+            primary_action, output_format = "query", "list"
+        if "benchmark" in outputs:
+            data_scope = "benchmark"
+        elif len(set(found["companies"])) > 1 or target == "companies":
+            data_scope = "multi_company"
+        else:
+            data_scope = "single_company"
+        
+        return {
+            "entities": {"target": target, "filters": filters},
+            "intent": {"primary_action": primary_action, "output_format": output_format,
+                       "data_scope": data_scope},
+            "business_validation": [],
+            "source": "local",
+        }
+    
+    @staticmethod
+    def _signature(parsed: Dict[str, Any]) -> Tuple:
+        def canonical(value) -> Tuple[str, ...]:
+            values = value if isinstance(value, list) else [value]
+            cleaned = set()
+            for item in values:
+                item = str(item).strip().lower()
+                if item.endswith("s") and len(item) > 3:
+                    item = item[:-1]
+                if item and item not in PlanTemplateCache.ABSENT_VALUES:
+                    cleaned.add(item)
+            return tuple(sorted(cleaned))
+        
+        entities = parsed.get("entities") or {}
+        filters = entities.get("filters") or {}
+        intent = parsed.get("intent") or {}
+        return (
+            canonical(entities.get("target", "")),
+            canonical(intent.get("primary_action", "")),
+            tuple(canonical(filters.get(name)) for name in ("department", "security_type", "participant_type")),
+        )
@@ -0,0 +1,188 @@
+import logging
+import os
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from caches import ConfigStore
+from columnar import ColumnarResultSet
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# NON-LLM PERMISSIONS: COMPILED ACLS AND ROW-LEVEL SQL PREDICATES
+# ============================================================================
+
+DEFAULT_PERMISSIONS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "config", "permissions.json"
+)
+
+
+class PermissionDenied(PermissionError):
+    """Raised when a user is unknown or may not perform an action"""
+
+
+class PermissionsUnavailable(PermissionDenied):
+    """Raised when the permissions file cannot be loaded; nobody is allowed anything"""
+
+
+class UserACL:
+    """
+    🔧 NON-LLM: One user's permissions, compiled once and shared by every request
+    
+    Scopes are frozensets (``None`` means unrestricted); ``predicates`` turns
+    them into SQL clauses with bound parameters, built once per table alias,
+    so unauthorized rows are filtered by sqlite and never fetched.
+    """
+    
+    __slots__ = ("user_id", "role", "actions", "company_ids", "departments", "insiders", "_predicates")
+    
+    INSIDER_TYPES = ("officer", "director")
+    
+    def __init__(self, user_id: str, role: str, actions: Iterable[str], company_ids: Optional[Iterable[str]] = None,
+                 departments: Optional[Iterable[str]] = None, insiders: bool = False):
+        self.user_id = user_id
+        self.role = role
+        self.actions = frozenset(actions)
+        self.company_ids = None if company_ids is None else frozenset(company_ids)
+        self.departments = None if departments is None else frozenset(departments)
+        self.insiders = insiders
+        self._predicates: Dict[Tuple[str, str], Tuple[Tuple[str, ...], Tuple]] = {}
+    
+    def __repr__(self) -> str:
+        return f"<UserACL {self.user_id!r} role={self.role!r} actions={sorted(self.actions)}>"
+    
+    def allows(self, action: str) -> bool:
+        return action in self.actions
+    
+    def predicates(self, alias: str = "p", table: str = "participants") -> Tuple[List[str], List]:
+        """(clauses, params) restricting ``table`` rows, for an AND-ed WHERE clause"""
+        compiled = self._predicates.get((alias, table))
+        if compiled is None:
+            column = f"{alias}." if alias else ""
+            clauses, params = [], []
+            if self.company_ids is not None:
+                clauses.append(f"{column}company_id IN ({', '.join('?' * len(self.company_ids)) or 'NULL'})")
+                params.extend(sorted(self.company_ids))
+            if table == "participants":
+                if self.departments is not None:
+                    clauses.append(f"{column}department IN ({', '.join('?' * len(self.departments)) or 'NULL'})")
+                    params.extend(sorted(self.departments))
+                if not self.insiders:  # Rows of unknown type are withheld too, as in ``restrict``
+                    clauses.append(f"{column}participant_type NOT IN ({', '.join('?' * len(self.INSIDER_TYPES))})")
+                    params.extend(self.INSIDER_TYPES)
+            compiled = self._predicates[(alias, table)] = (tuple(clauses), tuple(params))
+        return list(compiled[0]), list(compiled[1])
+    
+    def restrict(self, rows: ColumnarResultSet) -> ColumnarResultSet:
+        """The same row scope applied to an in-memory result set, column by column"""
+        if self.company_ids is not None:
+            rows = rows.where("company_id", "in", self.company_ids)
+        if self.departments is not None:
+            rows = rows.where("department", "in", self.departments)
+        if not self.insiders:
+            rows = rows.where("participant_type", "not in", self.INSIDER_TYPES)
+        return rows
+
+
+class PermissionIndex:
+    """
+    🔧 NON-LLM: User -> role -> compiled UserACL, cached until roles change
+    
+    Roles and user assignments come from a JSON file loaded through
+    ConfigStore, so an edited file is picked up on the next lookup and
+    every cached ACL is dropped; ``assign_role`` changes one user at runtime.
+    A lookup is one ``os.stat`` and one dict hit.
+    """
+    
+    # Workflow tool -> action it needs; None means no data access
+    TOOL_ACTIONS = {
+        "calculate_date_range": None,
+        "query_participants": "query", "query_companies": "query", "query_grants": "query",
+        "query_vesting_events": "query", "create_report": "report",
+        "generate_email": "send", "send_notification": "send",
+    }
+    
+    def __init__(self, path: str = DEFAULT_PERMISSIONS_PATH, config_store: Optional[ConfigStore] = None):
+        self.path = path
+        self.config_store = config_store or ConfigStore()
+        self.stats = {"hits": 0, "compiles": 0, "invalidations": 0, "unknown_users": 0, "load_failures": 0}
+        self._acls: Dict[str, Optional[UserACL]] = {}
+        self._assignments: Dict[str, str] = {}  # Runtime role changes, over the file
+        self._config = None
+    
+    def acl(self, user_id: Optional[str]) -> Optional[UserACL]:
+        """The user's ACL, or None for unknown users (who may do nothing)
+        
+        Raises PermissionsUnavailable when the file is missing, unreadable or
+        invalid, rather than falling back to an older copy of it.
+        """
+        config = self._load()
+        if config is not self._config:
+            if self._config is not None:
+                self.stats["invalidations"] += 1
+            self._config = config
+            self._acls.clear()
+        try:
+            acl = self._acls[user_id]
+        except KeyError:
+            acl = self._acls[user_id] = self._compile(config, user_id)
+        else:
+            self.stats["hits"] += 1
+        if acl is None:
+            self.stats["unknown_users"] += 1
+        return acl
+    
+    def assign_role(self, user_id: str, role: Optional[str]):
+        """Give ``user_id`` another role (None reverts to the file); their ACL is recompiled"""
+        if role is None:
+            self._assignments.pop(user_id, None)
+        else:
+            if self._config is None:
+                self._config = self._load()
+            if role not in self._config["roles"]:
+                raise ValueError(f"Unknown role {role!r}")
+            self._assignments[user_id] = role
+        self.invalidate(user_id)
+    
+    def invalidate(self, user_id: Optional[str] = None):
+        if user_id is None:
+            self._acls.clear()
+        else:
+            self._acls.pop(user_id, None)
+        self.stats["invalidations"] += 1
+    
+    def _load(self) -> Dict[str, Any]:
+        try:
+            return self.config_store.load(self.path, self.validate)
+        except (OSError, ValueError) as e:
+            self._config = None
+            self._acls.clear()  # Fail closed: no ACL outlives the file it came from
+            self.stats["load_failures"] += 1
+            logger.error("   🔒 Permissions unavailable, denying every request: %s", e)
+            raise PermissionsUnavailable(f"Permissions could not be loaded from {self.path}: {e}") from e
+    
+    def _compile(self, config: Dict[str, Any], user_id: Optional[str]) -> Optional[UserACL]:
+        role = self._assignments.get(user_id) or config["users"].get(user_id)
+        if role is None:
+            return None
+        self.stats["compiles"] += 1
+        spec = config["roles"][role]
+        scope = lambda value: None if value == "*" else value
+        return UserACL(user_id, role, spec.get("actions", ()), scope(spec.get("companies", ())),
+                       scope(spec.get("departments", ())), bool(spec.get("insiders", False)))
+    
+    @staticmethod
+    def validate(config: Dict[str, Any]):
+        actions = set(config.get("actions", ()))
+        roles = config.get("roles")
+        if not isinstance(roles, dict) or not isinstance(config.get("users"), dict):
+            raise ValueError("Permissions need 'roles' and 'users' objects")
+        for name, spec in roles.items():
+            unknown = set(spec.get("actions", ())) - actions
+            if unknown:
+                raise ValueError(f"Role {name!r} grants unknown actions {sorted(unknown)}")
+            for key in ("companies", "departments"):
+                if spec.get(key, ()) != "*" and not isinstance(spec.get(key, ()), list):
+                    raise ValueError(f"Role {name!r}: {key} must be '*' or a list")
+        for user, role in config["users"].items():
+            if role not in roles:
+                raise ValueError(f"User {user!r} has unknown role {role!r}")
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import string
+import textwrap
+from typing import Dict, List, Any, Optional
+
+from caches import ConfigStore
+from llm_client import _estimate_tokens
+from sql_engine import EQUITY_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# NON-LLM PROMPT COMPILATION: STATIC PREFIXES, DYNAMIC SLOTS, PRUNED CONTEXT
+# ============================================================================
+
+DEFAULT_PROMPT_KNOWLEDGE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "config", "prompt_knowledge.json"
+)
+
+
+class PromptTemplate:
+    """🔧 NON-LLM: A prompt split into a byte-stable system prefix and per-request slots
+    
+    The static part is formatted once, at construction, so every request sends
+    exactly the same prefix and providers can serve it from their prompt cache.
+    Only the dynamic part - the query, parse, digest - is formatted per call.
+    Both parts use ``str.format`` syntax (``{{``/``}}`` for literal braces).
+    """
+    
+    def __init__(self, name: str, static: str, dynamic: str, **static_values):
+        self.name = name
+        static_values = {key: textwrap.dedent(value) if isinstance(value, str) else value
+                         for key, value in static_values.items()}
+        self.prefix = textwrap.dedent(static).strip().format(**static_values)
+        self._dynamic = textwrap.dedent(dynamic).strip()
+        self.slots = frozenset(field for _, field, _, _ in string.Formatter().parse(self._dynamic) if field)
+        self.prefix_hash = hashlib.sha256(self.prefix.encode()).hexdigest()[:12]
+    
+    def render(self, **values) -> List[Dict[str, str]]:
+        missing = self.slots - values.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing slots: {sorted(missing)}")
+        return [
+            {"role": "system", "content": self.prefix},
+            {"role": "user", "content": self._dynamic.format(**values)},
+        ]
+
+
+class PromptRelevanceIndex:
+    """🔧 NON-LLM: Keyword index choosing the knowledge snippets a query touches
+    
+    Items are scored by the IDF-weighted query terms they share, then packed
+    best-first into a token budget. No embeddings, no LLM.
+    """
+    
+    KIND_ORDER = {"table": 0, "definition": 1, "example": 2}
+    STOPWORDS = frozenset({
+        "a", "an", "the", "and", "or", "of", "in", "on", "for", "to", "with", "by", "at", "from", "about",
+        "me", "my", "all", "any", "is", "are", "have", "has", "their", "them", "they", "who",
+        "show", "list", "get", "find", "what", "which", "how", "many", "id",
+    })
+    TERM = re.compile(r"[a-z0-9]+(?:\([a-z]\))?")
+    
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.items = items
+        self._postings: Dict[str, List[int]] = {}
+        for position, item in enumerate(items):
+            item["tokens"] = _estimate_tokens(item["text"])
+            for term in item["terms"]:
+                self._postings.setdefault(term, []).append(position)
+        self._idf = {term: math.log(1 + len(items) / len(postings))
+                     for term, postings in self._postings.items()}
+    
+    @classmethod
+    def terms(cls, text: str) -> set:
+        terms = set()
+        for word in cls.TERM.findall(text.lower().replace("_", " ")):
+            if word in cls.STOPWORDS:
+                continue
+            if len(word) > 4 and word.endswith("ies"):
+                word = word[:-3] + "y"
+            elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            terms.add(word)
+        return terms
+    
+    def select(self, query: str, token_budget: int) -> List[Dict[str, Any]]:
+        scores: Dict[int, float] = {}
+        for term in self.terms(query):
+            for position in self._postings.get(term, ()):
+                scores[position] = scores.get(position, 0.0) + self._idf[term]
+        ranked = sorted(scores, key=lambda position: (-scores[position],
+                                                      self.KIND_ORDER[self.items[position]["kind"]],
+                                                      position))
+        chosen, used = [], 0
+        for position in ranked:
+            tokens = self.items[position]["tokens"]
+            if used + tokens <= token_budget:
+                chosen.append(position)
+                used += tokens
+        # Stable layout: tables, then definitions, then examples, in file order
+        chosen.sort(key=lambda position: (self.KIND_ORDER[self.items[position]["kind"]], position))
+        return [self.items[position] for position in chosen]
+
+
+class PromptCompiler:
+    """🔧 NON-LLM: Renders compiled templates, filling ``{context}`` with pruned knowledge
+    
+    Instead of pasting the whole schema, every definition and every example
+    into each prompt, only the tables, definitions and examples the query
+    mentions are included, within ``context_token_budget``. The knowledge file
+    is loaded through a ConfigStore, so editing it takes effect on the next
+    request without a restart.
+    """
+    
+    NO_CONTEXT = "(no specific tables or definitions needed)"
+    
+    def __init__(self, knowledge_path: str = DEFAULT_PROMPT_KNOWLEDGE_PATH,
+                 context_token_budget: int = 300, config_store: Optional[ConfigStore] = None):
+        self.knowledge_path = knowledge_path
+        self.context_token_budget = context_token_budget
+        self.config_store = config_store or ConfigStore()
+        self._index: Optional[PromptRelevanceIndex] = None
+        self._indexed_knowledge = None
+    
+    def render(self, template: PromptTemplate, context_query: str = "", **values) -> List[Dict[str, str]]:
+        if "context" in template.slots:
+            values["context"] = self.relevant_context(context_query)
+        return template.render(**values)
+    
+    def relevant_context(self, query: str) -> str:
+        index = self._current_index()
+        if index is None or not query:
+            return self.NO_CONTEXT
+        chosen = index.select(query, self.context_token_budget)
+        return "\n".join(f"- {item['text']}" for item in chosen) or self.NO_CONTEXT
+    
+    def _current_index(self) -> Optional[PromptRelevanceIndex]:
+        try:
+            knowledge = self.config_store.load(self.knowledge_path, self.validate_knowledge)
+        except (OSError, ValueError) as e:
+            if self._indexed_knowledge is not False:
+                logger.warning("⚠️  Prompt knowledge unavailable (%s); prompts carry no schema context", e)
+                self._index, self._indexed_knowledge = None, False
+            return None
+        if knowledge is not self._indexed_knowledge:
+            self._index = PromptRelevanceIndex(self._knowledge_items(knowledge))
+            self._indexed_knowledge = knowledge
+        return self._index
+    
+    @staticmethod
+    def validate_knowledge(knowledge: Any):
+        if not isinstance(knowledge, dict):
+            raise ValueError("prompt knowledge must be a JSON object")
+        tables = knowledge.get("tables", {})
+        if not isinstance(tables, dict):
+            raise ValueError("'tables' must map table names to descriptions")
+        unknown = set(tables) - set(_schema_columns())
+        if unknown:
+            raise ValueError(f"'tables' names tables missing from EQUITY_SCHEMA: {sorted(unknown)}")
+        for key, required in (("definitions", ("term", "definition")), ("examples", ("query", "parsed"))):
+            entries = knowledge.get(key, [])
+            if not isinstance(entries, list) or not all(
+                isinstance(entry, dict) and all(field in entry for field in required) for entry in entries
+            ):
+                raise ValueError(f"every '{key}' entry needs {', '.join(required)}")
+    
+    @staticmethod
+    def _knowledge_items(knowledge: Dict[str, Any]) -> List[Dict[str, Any]]:
+        schema = _schema_columns()
+        terms = PromptRelevanceIndex.terms
+        items = []
+        for table, info in knowledge.get("tables", {}).items():
+            columns = schema[table]
+            items.append({
+                "kind": "table",
+                "text": f"table {table}({', '.join(columns)}): {info.get('description', '')}".rstrip(": "),
+                "terms": terms(" ".join([table, *columns, *info.get("keywords", [])])),
+            })
+        for entry in knowledge.get("definitions", []):
+            items.append({
+                "kind": "definition",
+                "text": f"{entry['term']}: {entry['definition']}",
+                "terms": terms(" ".join([entry["term"], *entry.get("keywords", [])])),
+            })
+        for entry in knowledge.get("examples", []):
+            items.append({
+                "kind": "example",
+                "text": f"example \"{entry['query']}\" -> {json.dumps(entry['parsed'], separators=(',', ':'))}",
+                "terms": terms(" ".join([entry["query"], *entry.get("keywords", [])])),
+            })
+        return items
+
+
+def _schema_columns() -> Dict[str, List[str]]:
+    """Table -> column names, read from EQUITY_SCHEMA"""
+    tables = {}
+    for table, body in re.findall(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\);", EQUITY_SCHEMA, re.S):
+        tables[table] = [line.split()[0] for line in body.strip().splitlines() if line.strip()]
+    return tables
@@ -0,0 +1,33 @@
+import re
+from typing import Optional
+from datetime import date
+
+from time_expressions import TimeExpressionEngine
+
+# ============================================================================
+# NON-LLM CACHING: QUERY NORMALIZATION
+# ============================================================================
+
+class QueryNormalizer:
+    """🔧 NON-LLM: Canonical form of a query, used as the parse cache key
+    
+    Lower-cases, drops punctuation, collapses whitespace, singularizes equity
+    plurals (RSUs → rsu) and resolves time phrases to the concrete window they
+    mean today, so "this quarter" keys roll over with the calendar.
+    """
+    
+    PLURALS = {
+        "rsus": "rsu", "psus": "psu", "nqos": "nqo", "isos": "iso", "sars": "sar",
+        "rsas": "rsa", "options": "option", "warrants": "warrant", "grants": "grant",
+        "awards": "award", "participants": "participant", "employees": "employee",
+        "officers": "officer", "directors": "director", "consultants": "consultant",
+        "companies": "company",
+    }
+    
+    def __init__(self, time_engine: Optional["TimeExpressionEngine"] = None):
+        self.time_engine = time_engine or TimeExpressionEngine()
+    
+    def normalize(self, query: str, today: Optional[date] = None) -> str:
+        text = re.sub(r"[^\w\s-]", " ", query.lower())
+        text = self.time_engine.substitute(text, today)
+        return " ".join(self.PLURALS.get(token, token) for token in text.split())
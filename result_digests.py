@@ -0,0 +1,164 @@
+import heapq
+import json
+import re
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import date, datetime
+
+from columnar import ColumnarResultSet
+from llm_client import _estimate_tokens
+
+# ============================================================================
+# NON-LLM RESULT DIGESTS: BOUNDED SUMMARIES FOR SYNTHESIS PROMPTS
+# ============================================================================
+
+class ResultDigester:
+    """🔧 NON-LLM: Reduce workflow results to compact statistics under a token budget
+    
+    Row lists become row counts, group-by counts for categorical columns,
+    sum/min/max for numeric columns, min/max for date columns and a few top
+    example rows, so the synthesis prompt stays the same size however many
+    rows a step returned. Detail is shed step by step until the digest fits.
+    """
+    
+    GROUP_BY_FIELDS = ("department", "award_type", "security_type", "status", "participant_type",
+                       "company_name", "country", "fiscal_year", "vesting_schedule")
+    RANK_FIELDS = ("quantity", "shares", "value", "amount")
+    DATE_STRING = re.compile(r"^\d{4}-\d{2}-\d{2}")
+    # (example rows, groups per column) tried in order until the digest fits
+    DETAIL_LEVELS = ((5, 10), (3, 5), (1, 3), (0, 3), (0, 0))
+    
+    def __init__(self, token_budget: int = 1500, top_n: int = 5, max_groups: int = 10,
+                 group_by_fields: Optional[Tuple[str, ...]] = None):
+        self.token_budget = token_budget
+        self.detail_levels = ((top_n, max_groups),) + tuple(
+            level for level in self.DETAIL_LEVELS if level[0] < top_n or level[1] < max_groups
+        )
+        self.group_by_fields = set(group_by_fields or self.GROUP_BY_FIELDS)
+    
+    def digest(self, workflow_results: Dict) -> Dict[str, Any]:
+        digest = {}
+        for examples, groups in self.detail_levels:
+            digest = {str(step_id): self._digest_value(output, examples, groups)
+                      for step_id, output in workflow_results.items()}
+            if self.estimate_tokens(digest) <= self.token_budget:
+                return digest
+        # Still too large: keep only the headline numbers of each step
+        return {step_id: self._headline(step_digest) for step_id, step_digest in digest.items()}
+    
+    @staticmethod
+    def estimate_tokens(digest: Dict) -> int:
+        return _estimate_tokens(json.dumps(digest, default=str))
+    
+    def _digest_value(self, value: Any, examples: int, groups: int) -> Any:
+        if isinstance(value, ColumnarResultSet):
+            return self._digest_columnar(value, examples, groups) if value else {"item_count": 0, "examples": []}
+        if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+            return self._digest_rows(value, examples, groups)
+        if isinstance(value, list):
+            return {"item_count": len(value), "examples": value[:examples]}
+        if isinstance(value, dict):
+            return {key: self._digest_value(item, examples, groups) for key, item in value.items()}
+        if isinstance(value, str) and len(value) > 200:
+            return value[:200] + "…"
+        return value
+    
+    def _digest_rows(self, rows: List[Dict], examples: int, groups: int) -> Dict[str, Any]:
+        numeric: Dict[str, List[float]] = {}   # column -> [sum, min, max]
+        dates: Dict[str, List[str]] = {}       # column -> [min, max]
+        categories: Dict[str, Dict[Any, int]] = {}
+        for row in rows:
+            for column, value in row.items():
+                if isinstance(value, bool) or value is None:
+                    continue
+                if column == "id" or column.endswith("_id"):
+                    continue  # Identifiers have no meaningful sum or range
+                if isinstance(value, (int, float)) and column not in self.group_by_fields:
+                    stats = numeric.get(column)
+                    if stats is None:
+                        numeric[column] = [value, value, value]
+                    else:
+                        stats[0] += value
+                        stats[1] = min(stats[1], value)
+                        stats[2] = max(stats[2], value)
+                elif isinstance(value, (date, datetime)) or (
+                        isinstance(value, str) and self.DATE_STRING.match(value)):
+                    value = value.isoformat() if not isinstance(value, str) else value
+                    bounds = dates.get(column)
+                    if bounds is None:
+                        dates[column] = [value, value]
+                    else:
+                        bounds[0] = min(bounds[0], value)
+                        bounds[1] = max(bounds[1], value)
+                elif column in self.group_by_fields:
+                    counts = categories.setdefault(column, {})
+                    counts[value] = counts.get(value, 0) + 1
+        
+        digest = {"row_count": len(rows)}
+        if groups and categories:
+            digest["group_counts"] = {
+                column: dict(sorted(counts.items(), key=lambda item: -item[1])[:groups])
+                for column, counts in categories.items()
+            }
+            digest["distinct_counts"] = {column: len(counts) for column, counts in categories.items()}
+        if numeric:
+            digest["numeric"] = {column: {"sum": stats[0], "min": stats[1], "max": stats[2]}
+                                 for column, stats in numeric.items()}
+        if dates:
+            digest["date_ranges"] = {column: {"min": bounds[0], "max": bounds[1]}
+                                     for column, bounds in dates.items()}
+        if examples:
+            rank_field = next((field for field in self.RANK_FIELDS if field in numeric), None)
+            if rank_field:
+                top = heapq.nlargest(examples, rows, key=lambda row: row.get(rank_field) or 0)
+            else:
+                top = rows[:examples]
+            digest["examples"] = [self._digest_value(row, 0, 0) for row in top]
+        return digest
+    
+    def _digest_columnar(self, result_set: ColumnarResultSet, examples: int, groups: int) -> Dict[str, Any]:
+        """Same digest as ``_digest_rows``, computed per column without building row dicts"""
+        numeric: Dict[str, Dict[str, Any]] = {}
+        dates: Dict[str, Dict[str, str]] = {}
+        categories: Dict[str, Dict[Any, int]] = {}
+        for column in result_set.columns:
+            if column == "id" or column.endswith("_id"):
+                continue  # Identifiers have no meaningful sum or range
+            try:
+                low = result_set.min(column)
+            except TypeError:
+                continue  # Mixed types: nothing to summarize
+            if low is None or isinstance(low, bool):
+                continue
+            if column in self.group_by_fields:
+                counts = result_set.group_by(column).count()
+                counts.pop(None, None)
+                categories[column] = counts
+            elif isinstance(low, (int, float)):
+                numeric[column] = {"sum": result_set.sum(column), "min": low, "max": result_set.max(column)}
+            elif isinstance(low, str) and self.DATE_STRING.match(low):
+                dates[column] = {"min": low, "max": result_set.max(column)}
+        
+        digest = {"row_count": len(result_set)}
+        if groups and categories:
+            digest["group_counts"] = {
+                column: dict(sorted(counts.items(), key=lambda item: -item[1])[:groups])
+                for column, counts in categories.items()
+            }
+            digest["distinct_counts"] = {column: len(counts) for column, counts in categories.items()}
+        if numeric:
+            digest["numeric"] = numeric
+        if dates:
+            digest["date_ranges"] = dates
+        if examples:
+            rank_field = next((field for field in self.RANK_FIELDS if field in numeric), None)
+            top = result_set.top(examples, rank_field) if rank_field else result_set[:examples]
+            digest["examples"] = [self._digest_value(row, 0, 0) for row in top]
+        return digest
+    
+    @staticmethod
+    def _headline(step_digest: Any) -> Any:
+        if isinstance(step_digest, dict) and "row_count" in step_digest:
+            return {key: step_digest[key] for key in ("row_count", "numeric") if key in step_digest}
+        if isinstance(step_digest, dict):
+            return {"keys": sorted(step_digest)[:20]}
+        return step_digest
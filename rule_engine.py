@@ -0,0 +1,181 @@
+import json
+import os
+import re
+from typing import Dict, List, Any, Callable, Optional
+
+from caches import PlanTemplateCache
+from workflow import WorkflowDAGExecutor, WorkflowGraphError
+
+# ============================================================================
+# NON-LLM RULE ENGINE: COMPILED EQUITY BUSINESS RULES
+# ============================================================================
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "equity_rules.json")
+
+
+class EquityRuleEngine:
+    """🔧 NON-LLM: Table-driven validator for mechanical equity business rules
+    
+    The rule table (config/equity_rules.json) holds the fact vocabulary and the
+    rules; compliance can add terms or rules there without code changes. Each
+    rule's ``when`` clause is compiled once into a predicate over facts
+    extracted from the query text, the parsed query and the planned workflow.
+    
+    Condition syntax: {"all": [...]}, {"any": [...]}, {"not": {...}} or a leaf
+    {"fact": name, <op>: operand} with op in has_any, has_none, has_all,
+    any_gt, any_lt.
+    """
+    
+    OPERATORS = {
+        "has_any": lambda values, operand: bool(values & set(operand)),
+        "has_none": lambda values, operand: not values & set(operand),
+        "has_all": lambda values, operand: set(operand) <= values,
+        "any_gt": lambda values, operand: any(value > operand for value in values),
+        "any_lt": lambda values, operand: any(value < operand for value in values),
+    }
+    VESTING_YEARS = re.compile(r"\b(\d+(?:\.\d+)?)[- ]year\b")
+    
+    def __init__(self, rule_table: Dict[str, Any], known_tools: Optional[List[str]] = None):
+        self.coverage_threshold = rule_table.get("coverage_threshold", 0.8)
+        self.min_parse_confidence = rule_table.get("min_parse_confidence", 0.6)
+        self.known_tools = set(known_tools) if known_tools else None
+        self.rules = [dict(rule) for rule in rule_table.get("rules", [])]
+        self.rule_descriptions = [rule["description"] for rule in self.rules if rule.get("description")]
+        
+        # One longest-match-first regex per fact group ("restricted stock units" beats "restricted stock")
+        self._fact_matchers = {}
+        for fact, canonical_terms in rule_table.get("facts", {}).items():
+            lookup = {term.lower(): canonical
+                      for canonical, terms in canonical_terms.items() for term in terms}
+            alternation = "|".join(re.escape(term) for term in sorted(lookup, key=len, reverse=True))
+            self._fact_matchers[fact] = (re.compile(rf"(?<!\w)(?:{alternation})(?!\w)"), lookup)
+        review_terms = rule_table.get("review_terms", [])
+        self._review_matcher = re.compile(
+            r"(?<!\w)(?:" + "|".join(re.escape(term.lower()) for term in review_terms) + r")(?!\w)"
+        ) if review_terms else None
+        
+        for rule in self.rules:
+            rule["_predicate"] = self._compile(rule["when"])
+    
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES_PATH, known_tools: Optional[List[str]] = None):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), known_tools)
+    
+    def evaluate(self, parsed_query: Dict, planned_workflow: List[Dict],
+                 user_query: str = "") -> Dict[str, Any]:
+        """🔧 NON-LLM: Validate locally, reporting how much of the query the rules covered"""
+        facts, unrecognized = self.extract_facts(parsed_query, planned_workflow, user_query)
+        errors, warnings, suggestions, fired = [], [], [], []
+        ambiguities = []
+        coverage = 1.0
+        
+        errors.extend(self._check_plan_structure(planned_workflow))
+        for rule in self.rules:
+            if not rule["_predicate"](facts):
+                continue
+            fired.append(rule["id"])
+            (errors if rule.get("severity") == "error" else warnings).append(rule["message"])
+            if rule.get("suggestion"):
+                suggestions.append(rule["suggestion"])
+            if rule.get("needs_review"):
+                ambiguities.append(f"Rule '{rule['id']}' needs expert review")
+                coverage = min(coverage, 0.5)
+        
+        parse_confidence = parsed_query.get("confidence")
+        if isinstance(parse_confidence, (int, float)) and parse_confidence < self.min_parse_confidence:
+            ambiguities.append(f"Low parse confidence ({parse_confidence})")
+            coverage = min(coverage, float(parse_confidence))
+        if unrecognized:
+            ambiguities.append(f"Unrecognized security types: {sorted(unrecognized)}")
+            coverage = min(coverage, 0.6)
+        if self._review_matcher is not None:
+            review_hits = set(self._review_matcher.findall(facts["text"]))
+            if review_hits:
+                ambiguities.append(f"Terms outside the rule table: {sorted(review_hits)}")
+                coverage = min(coverage, 0.5)
+        
+        return {
+            "is_valid": not errors,
+            "warnings": warnings,
+            "errors": errors,
+            "suggestions": suggestions,
+            "confidence": coverage,
+            "coverage": coverage,
+            "needs_llm_review": coverage < self.coverage_threshold,
+            "ambiguities": ambiguities,
+            "rules_fired": fired,
+            "source": "rule_engine",
+        }
+    
+    def extract_facts(self, parsed_query: Dict, planned_workflow: List[Dict],
+                      user_query: str = ""):
+        """Return (facts, unrecognized security type values)"""
+        filters = (parsed_query.get("entities") or {}).get("filters") or {}
+        intent = parsed_query.get("intent") or {}
+        text = " ".join([user_query, str(filters.get("time_context") or "")]).lower()
+        
+        facts = {fact: self._match(fact, text) for fact in self._fact_matchers}
+        facts.setdefault("security_types", set())
+        facts.setdefault("participant_types", set())
+        facts.setdefault("actions", set())
+        facts.setdefault("concepts", set())
+        
+        unrecognized = set()
+        for value in self._as_list(filters.get("security_type")):
+            matched = self._match("security_types", value.lower())
+            if not matched and value.lower() not in PlanTemplateCache.ABSENT_VALUES:
+                unrecognized.add(value)
+            facts["security_types"] |= matched
+        for value in self._as_list(filters.get("participant_type")):
+            facts["participant_types"] |= self._match("participant_types", value.lower())
+        facts["actions"] |= self._match("actions", str(intent.get("primary_action", "")).lower())
+        
+        facts["tools"] = {step.get("tool") for step in planned_workflow}
+        facts["vesting_years"] = {float(years) for years in self.VESTING_YEARS.findall(text)}
+        facts["text"] = text
+        return facts, unrecognized
+    
+    def _check_plan_structure(self, planned_workflow: List[Dict]) -> List[str]:
+        errors = []
+        if self.known_tools is not None:
+            unknown = sorted({str(step.get("tool")) for step in planned_workflow} - self.known_tools)
+            if unknown:
+                errors.append(f"Workflow uses unknown tools: {unknown}")
+        try:
+            WorkflowDAGExecutor({}).build_graph(planned_workflow)
+        except WorkflowGraphError as e:
+            errors.append(f"Missing or inconsistent data dependencies: {e}")
+        return errors
+    
+    def _match(self, fact: str, text: str) -> set:
+        if fact not in self._fact_matchers or not text:
+            return set()
+        pattern, lookup = self._fact_matchers[fact]
+        return {lookup[match.lower()] for match in pattern.findall(text)}
+    
+    def _compile(self, condition: Dict) -> Callable[[Dict], bool]:
+        if "all" in condition:
+            parts = [self._compile(part) for part in condition["all"]]
+            return lambda facts: all(part(facts) for part in parts)
+        if "any" in condition:
+            parts = [self._compile(part) for part in condition["any"]]
+            return lambda facts: any(part(facts) for part in parts)
+        if "not" in condition:
+            inner = self._compile(condition["not"])
+            return lambda facts: not inner(facts)
+        
+        fact = condition.get("fact")
+        op_names = set(condition) - {"fact"}
+        if fact is None or not op_names or op_names - set(self.OPERATORS):
+            raise ValueError(f"Invalid rule condition: {condition}")
+        ops = [(self.OPERATORS[op], condition[op]) for op in op_names]
+        return lambda facts: all(op(facts.get(fact, set()), operand) for op, operand in ops)
+    
+    @staticmethod
+    def _as_list(value) -> List[str]:
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return [str(item) for item in value]
+        return [str(value)]
@@ -0,0 +1,545 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import random
+import re
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, AsyncIterator, Callable, Iterable, Optional, Tuple, Union
+from datetime import date, timedelta
+
+from caches import LRUTTLCache, PlanTemplateCache
+from columnar import ColumnarResultSet
+from permissions import UserACL
+from tracing import trace_cache
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# NON-LLM SQL EXECUTION ENGINE
+# ============================================================================
+
+EQUITY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    company_id TEXT PRIMARY KEY,
+    company_name TEXT NOT NULL COLLATE NOCASE,
+    country TEXT COLLATE NOCASE,
+    revenue REAL,
+    share_price REAL
+);
+CREATE TABLE IF NOT EXISTS participants (
+    participant_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    department TEXT COLLATE NOCASE,
+    participant_type TEXT COLLATE NOCASE,
+    company_id TEXT REFERENCES companies(company_id),
+    status TEXT COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS equity_awards (
+    award_id INTEGER PRIMARY KEY,
+    award_type TEXT COLLATE NOCASE,
+    grant_date DATE,
+    fiscal_year INTEGER,
+    employee_id TEXT REFERENCES participants(participant_id),
+    quantity INTEGER,
+    vesting_schedule TEXT,
+    status TEXT COLLATE NOCASE,
+    exercise_price REAL
+);
+CREATE INDEX IF NOT EXISTS idx_participants_department ON participants(department);
+CREATE INDEX IF NOT EXISTS idx_awards_employee ON equity_awards(employee_id, award_type);
+CREATE INDEX IF NOT EXISTS idx_awards_type_date ON equity_awards(award_type, grant_date);
+"""
+
+# Write counters per table, bumped by triggers on every insert, update and delete, so
+# caches can tell whether a table changed since a result was computed - whichever
+# connection or process wrote it
+VERSIONED_TABLES = ("companies", "participants", "equity_awards")
+TABLE_VERSION_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS table_versions (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL);\n"
+    + "".join(
+        f"INSERT OR IGNORE INTO table_versions VALUES ('{table}', 0);\n"
+        + "".join(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table} BEGIN"
+            f" UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}'; END;\n"
+            for event in ("INSERT", "UPDATE", "DELETE")
+        )
+        for table in VERSIONED_TABLES
+    )
+)
+
+_DEMO_COMPANIES = [
+    ("C001", "Acme Corp", "United States", 1.2e9, 42.0),
+    ("C002", "Apple Inc.", "United States", 383.3e9, 190.0),
+    ("C003", "Microsoft Corporation", "United States", 211.9e9, 370.0),
+    ("C004", "Shopify Inc.", "Canada", 7.1e9, 65.0),
+    ("C005", "Arm Holdings", "United Kingdom", 2.7e9, 75.0),
+]
+_DEMO_PARTICIPANTS = [
+    ("EMP001", "John Smith", "john.smith@acme.example", "Engineering", "employee", "C001", "Active"),
+    ("EMP002", "Maria Garcia", "maria.garcia@acme.example", "Finance", "employee", "C001", "Active"),
+    ("EMP003", "Wei Chen", "wei.chen@acme.example", "Sales", "employee", "C001", "Active"),
+    ("EMP004", "Aisha Khan", "aisha.khan@acme.example", "Finance", "officer", "C001", "Active"),
+    ("EMP005", "Tom Becker", "tom.becker@acme.example", "Engineering", "officer", "C001", "Active"),
+    ("EMP006", "Priya Patel", "priya.patel@acme.example", "Marketing", "employee", "C001", "Active"),
+    ("EMP007", "Luis Romero", "luis.romero@acme.example", "Legal", "director", "C001", "Active"),
+    ("EMP008", "Emma Wilson", "emma.wilson@acme.example", "HR", "employee", "C001", "Active"),
+    ("EMP009", "Kenji Sato", "kenji.sato@acme.example", "Sales", "employee", "C001", "Terminated"),
+]
+# The sample awards from the text-to-SQL design doc, with exercise prices for options
+_DEMO_AWARDS = [
+    (1, "RSU", "2023-02-15", 2023, "EMP001", 1000, "4-year vest", "Active", None),
+    (2, "RSU", "2023-03-20", 2023, "EMP002", 500, "4-year vest", "Active", None),
+    (3, "PSU", "2023-04-10", 2023, "EMP003", 750, "3-year performance", "Active", None),
+    (4, "PSU", "2023-06-15", 2023, "EMP004", 1200, "3-year performance", "Active", None),
+    (5, "NQO", "2023-07-01", 2023, "EMP005", 2000, "4-year vest", "Active", 38.5),
+    (6, "NQO", "2023-09-12", 2023, "EMP006", 1500, "4-year vest", "Active", 47.25),
+    (7, "ISO", "2023-11-20", 2023, "EMP007", 800, "4-year vest", "Active", 44.0),
+    (8, "RSU", "2024-01-15", 2024, "EMP008", 600, "4-year vest", "Active", None),
+    (9, "PSU", "2022-12-10", 2022, "EMP009", 900, "3-year performance", "Vested", None),
+]
+
+
+def seed_demo_database(db_path: str, synthetic_participants: int = 0, seed: int = 7):
+    """🔧 NON-LLM: Create the equity schema and load the demo rows (idempotent)
+    
+    ``synthetic_participants`` adds that many generated participants, each with
+    one or two awards, for benchmarks that need realistic table sizes.
+    """
+    connection = sqlite3.connect(db_path, uri=db_path.startswith("file:"))
+    try:
+        connection.executescript(EQUITY_SCHEMA)
+        participants = list(_DEMO_PARTICIPANTS)
+        awards = list(_DEMO_AWARDS)
+        rng = random.Random(seed)
+        departments = ("Engineering", "Sales", "Finance", "Marketing", "Legal", "HR")
+        schedules = ("4-year vest", "4-year vest", "3-year performance", "1-year cliff, 4-year vest")
+        for index in range(synthetic_participants):
+            participant_id = f"EMP{index + 1000:06d}"
+            participant_type = rng.choices(("employee", "officer", "director"), (96, 3, 1))[0]
+            participants.append((
+                participant_id, f"Participant {index + 1000}", f"{participant_id.lower()}@acme.example",
+                rng.choice(departments), participant_type, "C001",
+                "Active" if rng.random() < 0.95 else "Terminated",
+            ))
+            for _ in range(rng.randint(1, 2)):
+                award_type = rng.choices(("RSU", "PSU", "NQO", "ISO"), (60, 15, 15, 10))[0]
+                grant_date = date(2021, 1, 1) + timedelta(days=rng.randrange(4 * 365))
+                exercise_price = round(rng.uniform(20, 60), 2) if award_type in ("NQO", "ISO") else None
+                awards.append((
+                    len(awards) + 1, award_type, grant_date.isoformat(), grant_date.year,
+                    participant_id, rng.randrange(100, 5000, 50), rng.choice(schedules), "Active",
+                    exercise_price,
+                ))
+        with connection:
+            connection.executemany("INSERT OR IGNORE INTO companies VALUES (?, ?, ?, ?, ?)", _DEMO_COMPANIES)
+            connection.executemany("INSERT OR IGNORE INTO participants VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   participants)
+            connection.executemany("INSERT OR IGNORE INTO equity_awards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   awards)
+        connection.executescript(TABLE_VERSION_SCHEMA)  # After the bulk load, so it fires no triggers
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+
+
+class SQLQueryTimeout(asyncio.TimeoutError):
+    """Raised when a statement runs past its per-query timeout"""
+
+
+class SQLExecutionEngine:
+    """
+    🔧 NON-LLM: Pooled, parameter-bound sqlite execution
+    
+    - ``pool_size`` warm connections, each running one statement at a time
+    - sqlite's per-connection prepared-statement cache, keyed by SQL text
+    - callers bind every value as a parameter; EquityQueryBuilder never inlines one
+    - per-query timeouts (enforced with a progress handler) and row limits
+    - ``stream`` yields ``fetchmany`` batches instead of one materialized list
+    
+    Statements run on a private thread pool so the event loop never blocks on
+    the database. ``db_path`` may be a file path or a ``file:`` URI.
+    """
+    
+    PROGRESS_INTERVAL = 1000  # sqlite VM instructions between timeout checks
+    
+    def __init__(self, db_path: str, pool_size: int = 4, statement_cache_size: int = 128,
+                 query_timeout: float = 10.0, max_rows: int = 10000, fetch_batch_size: int = 500):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.statement_cache_size = statement_cache_size
+        self.query_timeout = query_timeout
+        self.max_rows = max_rows
+        self.fetch_batch_size = fetch_batch_size
+        self.stats = {"queries": 0, "rows": 0, "timeouts": 0, "truncated": 0, "pool_waits": 0}
+        self._idle = deque(self._connect() for _ in range(pool_size))
+        self._threads = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="sql")
+        self._available = None
+        self._loop = None
+        self._version_tracking: Optional[bool] = None  # Unknown until first asked
+    
+    async def execute(self, sql: str, params: Union[List, Tuple, Dict] = (),
+                      max_rows: Optional[int] = None, timeout: Optional[float] = None,
+                      columnar: bool = False) -> Union[List[Dict], "ColumnarResultSet"]:
+        """Run a query and return at most ``max_rows`` rows as dicts (or one ColumnarResultSet)"""
+        self._check_bindings(sql, params)
+        limit = self.max_rows if max_rows is None else max_rows
+        timeout = self.query_timeout if timeout is None else timeout
+        async with self._connection(timeout) as connection:
+            rows, truncated = await self._run(
+                connection, self._fetch, connection, sql, params, limit, time.monotonic() + timeout, columnar
+            )
+        self.stats["queries"] += 1
+        self.stats["rows"] += len(rows)
+        if truncated:
+            self.stats["truncated"] += 1
+            logger.warning("   ⚠️  Result truncated to %s rows", limit)
+        return rows
+    
+    async def stream(self, sql: str, params: Union[List, Tuple, Dict] = (),
+                     batch_size: Optional[int] = None, max_rows: Optional[int] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Yield rows in batches of ``batch_size``; the timeout bounds each fetch"""
+        self._check_bindings(sql, params)
+        batch_size = batch_size or self.fetch_batch_size
+        remaining = self.max_rows if max_rows is None else max_rows
+        timeout = self.query_timeout if timeout is None else timeout
+        async with self._connection(timeout) as connection:
+            cursor = await self._run(
+                connection, self._open_cursor, connection, sql, params, time.monotonic() + timeout
+            )
+            self.stats["queries"] += 1
+            try:
+                while remaining > 0:
+                    rows = await self._run(
+                        connection, self._fetch_batch, connection, cursor,
+                        min(batch_size, remaining), time.monotonic() + timeout,
+                    )
+                    if not rows:
+                        return
+                    remaining -= len(rows)
+                    self.stats["rows"] += len(rows)
+                    yield rows
+            finally:
+                await self._run(connection, cursor.close)
+    
+    async def execute_many(self, sql: str, rows: Iterable[Union[List, Tuple, Dict]],
+                           timeout: Optional[float] = None) -> int:
+        """Run a write statement once per parameter row in one transaction"""
+        timeout = self.query_timeout if timeout is None else timeout
+        async with self._connection(timeout) as connection:
+            return await self._run(
+                connection, self._write, connection, sql, list(rows), time.monotonic() + timeout
+            )
+    
+    async def table_versions(self, tables: Iterable[str]) -> Optional[Dict[str, int]]:
+        """Write counters of ``tables``, or None when the database does not track versions"""
+        tables = sorted(set(tables))
+        if self._version_tracking is False or not tables:
+            return None
+        try:
+            rows = await self.execute(
+                f"SELECT table_name, version FROM table_versions WHERE table_name IN ({', '.join('?' * len(tables))})",
+                tables,
+            )
+        except sqlite3.OperationalError:
+            self._version_tracking = False  # No table_versions table: callers must not cache
+            logger.warning("   ⚠️  Database has no table_versions; result caching is disabled")
+            return None
+        self._version_tracking = True
+        versions = {row["table_name"]: row["version"] for row in rows}
+        return versions if len(versions) == len(tables) else None
+    
+    async def install_version_tracking(self):
+        """Add table_versions and its triggers to an existing database (idempotent)"""
+        async with self._connection(self.query_timeout) as connection:
+            await self._run(connection, connection.executescript, TABLE_VERSION_SCHEMA)
+        self._version_tracking = None
+    
+    def close(self):
+        self._threads.shutdown(wait=True)
+        while self._idle:
+            self._idle.popleft().close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.db_path, uri=self.db_path.startswith("file:"), check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+    
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._available = asyncio.Semaphore(len(self._idle))
+    
+    @contextlib.asynccontextmanager
+    async def _connection(self, timeout: float):
+        self._bind_loop()
+        if self._available.locked():
+            self.stats["pool_waits"] += 1
+            try:
+                await asyncio.wait_for(self._available.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise SQLQueryTimeout("Timed out waiting for a database connection") from None
+        else:
+            await self._available.acquire()
+        connection = self._idle.popleft()
+        try:
+            yield connection
+        finally:
+            self._idle.append(connection)
+            self._available.release()
+    
+    async def _run(self, connection: sqlite3.Connection, function: Callable, *args) -> Any:
+        future = asyncio.get_running_loop().run_in_executor(self._threads, function, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The connection goes back to the pool only once its thread has let go of it
+            connection.interrupt()
+            await asyncio.gather(future, return_exceptions=True)
+            raise
+    
+    @staticmethod
+    def _check_bindings(sql: str, params):
+        # Values reach sqlite only as parameters; constant literals in the SQL are fine
+        assert isinstance(params, dict) or len(params) == sql.count("?"), "one bound parameter per placeholder"
+    
+    @contextlib.contextmanager
+    def _deadline(self, connection: sqlite3.Connection, deadline: float):
+        connection.set_progress_handler(lambda: time.monotonic() > deadline, self.PROGRESS_INTERVAL)
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                self.stats["timeouts"] += 1
+                raise SQLQueryTimeout("Query exceeded its timeout") from e
+            raise
+        finally:
+            connection.set_progress_handler(None, 0)
+    
+    def _fetch(self, connection: sqlite3.Connection, sql: str, params, limit: int,
+               deadline: float, columnar: bool = False) -> Tuple[Union[List[Dict], "ColumnarResultSet"], bool]:
+        with self._deadline(connection, deadline):
+            cursor = connection.execute(sql, params)
+            try:
+                columns = [column[0] for column in cursor.description or ()]
+                rows = cursor.fetchmany(limit + 1)
+            finally:
+                cursor.close()
+        truncated = len(rows) > limit
+        if truncated:
+            del rows[limit:]
+        if columnar:
+            # Encoding happens here, in the worker thread, off the event loop
+            return ColumnarResultSet.from_tuples(columns, rows), truncated
+        return [dict(zip(columns, row)) for row in rows], truncated
+    
+    def _open_cursor(self, connection: sqlite3.Connection, sql: str, params, deadline: float):
+        with self._deadline(connection, deadline):
+            return connection.execute(sql, params)
+    
+    def _fetch_batch(self, connection: sqlite3.Connection, cursor: sqlite3.Cursor, size: int,
+                     deadline: float) -> List[Dict]:
+        with self._deadline(connection, deadline):
+            rows = cursor.fetchmany(size)
+        columns = [column[0] for column in cursor.description or ()]
+        return [dict(zip(columns, row)) for row in rows]
+    
+    def _write(self, connection: sqlite3.Connection, sql: str, rows: List, deadline: float) -> int:
+        with self._deadline(connection, deadline), connection:
+            return connection.executemany(sql, rows).rowcount
+
+
+class EquityQueryBuilder:
+    """
+    🔧 NON-LLM: Parameterized SQL for the data-retrieval workflow tools
+    
+    Only whitelisted filter keys become predicates, and every value is a bound
+    parameter, so plan parameters written by the LLM never reach the SQL text.
+    Text columns are declared COLLATE NOCASE, so equality stays indexable.
+    A ``UserACL`` adds its row-level predicates to the WHERE clause.
+    """
+    
+    OPTION_TYPES = ("NQO", "ISO")
+    PARTICIPANT_FILTERS = {
+        "department": "p.department",
+        "participant_type": "p.participant_type",
+        "participant_status": "p.status",
+        "company": "c.company_name",
+        "company_name": "c.company_name",
+        "country": "c.country",
+    }
+    GRANT_FILTERS = {
+        **PARTICIPANT_FILTERS,
+        "status": "a.status",
+        "fiscal_year": "a.fiscal_year",
+    }
+    COMPANY_FILTERS = {
+        "company": "company_name",
+        "company_name": "company_name",
+        "country": "country",
+    }
+    
+    @classmethod
+    def participants(cls, filters: Dict[str, Any], acl: Optional[UserACL] = None) -> Tuple[str, List]:
+        clauses, params = cls._equality(filters, cls.PARTICIPANT_FILTERS)
+        award_types = cls.award_types(filters)
+        if award_types:
+            clauses.append(
+                "EXISTS (SELECT 1 FROM equity_awards a WHERE a.employee_id = p.participant_id"
+                f" AND a.award_type IN ({cls._placeholders(award_types)}))"
+            )
+            params.extend(award_types)
+        cls._scope(acl, clauses, params, "p", "participants")
+        sql = (
+            "SELECT p.participant_id, p.name, p.email, p.department, p.participant_type,"
+            " p.company_id, c.company_name"
+            " FROM participants p LEFT JOIN companies c ON c.company_id = p.company_id"
+            f"{cls._where(clauses)} ORDER BY p.participant_id"
+        )
+        return sql, params
+    
+    @classmethod
+    def grants(cls, filters: Dict[str, Any], acl: Optional[UserACL] = None) -> Tuple[str, List]:
+        clauses, params = cls._equality(filters, cls.GRANT_FILTERS)
+        award_types = cls.award_types(filters)
+        if award_types:
+            clauses.append(f"a.award_type IN ({cls._placeholders(award_types)})")
+            params.extend(award_types)
+        if filters.get("start_date"):
+            clauses.append("a.grant_date >= ?")
+            params.append(filters["start_date"])
+        if filters.get("end_date"):
+            clauses.append("a.grant_date <= ?")
+            params.append(filters["end_date"])
+        cls._scope(acl, clauses, params, "p", "participants")
+        sql = (
+            "SELECT a.award_id AS grant_id, a.employee_id AS participant_id, p.name, p.department,"
+            " a.award_type, a.grant_date, a.fiscal_year, a.quantity, a.vesting_schedule, a.status,"
+            " a.exercise_price"
+            " FROM equity_awards a"
+            " LEFT JOIN participants p ON p.participant_id = a.employee_id"
+            " LEFT JOIN companies c ON c.company_id = p.company_id"
+            f"{cls._where(clauses)} ORDER BY a.grant_date, a.award_id"
+        )
+        return sql, params
+    
+    @classmethod
+    def companies(cls, filters: Dict[str, Any], acl: Optional[UserACL] = None) -> Tuple[str, List]:
+        clauses, params = cls._equality(filters, cls.COMPANY_FILTERS)
+        cls._scope(acl, clauses, params, "", "companies")
+        sql = ("SELECT company_id, company_name, country, revenue, share_price FROM companies"
+               f"{cls._where(clauses)} ORDER BY company_name")
+        return sql, params
+    
+    @classmethod
+    def award_types(cls, filters: Dict[str, Any]) -> List[str]:
+        """Normalize security_type/award_type filters: plurals, case, 'options'"""
+        award_types = []
+        for value in cls._as_list(filters.get("security_type") or filters.get("award_type")):
+            value = str(value).strip().upper()
+            if value in ("OPTION", "OPTIONS", "STOCK OPTIONS"):
+                award_types.extend(cls.OPTION_TYPES)
+            elif value:
+                award_types.append(value[:-1] if value.endswith("S") and len(value) > 3 else value)
+        return list(dict.fromkeys(award_types))
+    
+    @classmethod
+    def _equality(cls, filters: Dict[str, Any], columns: Dict[str, str]) -> Tuple[List[str], List]:
+        clauses, params = [], []
+        for key, column in columns.items():
+            values = cls._as_list(filters.get(key))
+            if not values:
+                continue
+            if len(values) == 1:
+                clauses.append(f"{column} = ?")
+            else:
+                clauses.append(f"{column} IN ({cls._placeholders(values)})")
+            params.extend(values)
+        return clauses, params
+    
+    @staticmethod
+    def _scope(acl: Optional[UserACL], clauses: List[str], params: List, alias: str, table: str):
+        if acl is not None:
+            scope_clauses, scope_params = acl.predicates(alias, table)
+            clauses.extend(scope_clauses)
+            params.extend(scope_params)
+    
+    # "all" means no filter at all for a query tool
+    ABSENT_VALUES = PlanTemplateCache.ABSENT_VALUES | {"all"}
+    
+    @classmethod
+    def _as_list(cls, value) -> List:
+        """Filter values to bind; placeholders like "N/A" or "if mentioned" are dropped"""
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        return [item.strip() if isinstance(item, str) else item for item in values
+                if item is not None and str(item).strip().lower() not in cls.ABSENT_VALUES]
+    
+    @staticmethod
+    def _placeholders(values: List) -> str:
+        return ", ".join("?" * len(values))
+    
+    @staticmethod
+    def _where(clauses: List[str]) -> str:
+        return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+# ============================================================================
+# NON-LLM RESULT CACHING: STEP RESULTS KEYED BY SQL AND TABLE VERSIONS
+# ============================================================================
+
+class VersionedResultCache:
+    """
+    🔧 NON-LLM: Query results reused until a table they read is written
+    
+    The key is the normalized SQL, its bound parameters and the current
+    version of every table the SQL reads. A write bumps that table's version
+    (via the table_versions triggers), so later lookups miss rather than
+    serve stale rows, and superseded entries age out of the LRU. Databases
+    without table_versions are never cached.
+    """
+    
+    TABLES = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+    
+    def __init__(self, sql_engine: SQLExecutionEngine, max_entries: int = 512, ttl_seconds: float = 3600.0):
+        self.sql_engine = sql_engine
+        self.entries = LRUTTLCache(max_entries, ttl_seconds, namespace="step_results")
+        self.stats = {"bypassed": 0}
+        self._tables: Dict[str, Tuple[str, ...]] = {}  # SQL text -> tables it reads
+    
+    def tables(self, sql: str) -> Tuple[str, ...]:
+        tables = self._tables.get(sql)
+        if tables is None:
+            tables = self._tables[sql] = tuple(sorted(set(self.TABLES.findall(sql))))
+        return tables
+    
+    @staticmethod
+    def key(sql: str, params: Union[List, Tuple, Dict], versions: Dict[str, int], columnar: bool) -> str:
+        payload = json.dumps([" ".join(sql.split()), params, sorted(versions.items()), columnar], default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    async def execute(self, sql: str, params: Union[List, Tuple, Dict] = (),
+                      columnar: bool = False) -> Union[List[Dict], ColumnarResultSet]:
+        versions = await self.sql_engine.table_versions(self.tables(sql))
+        if versions is None:
+            self.stats["bypassed"] += 1
+            return await self.sql_engine.execute(sql, params, columnar=columnar)
+        key = self.key(sql, params, versions, columnar)
+        cached = self.entries.get(key)
+        trace_cache("step_result", cached is not None)
+        if cached is not None:
+            # Result sets are read-only views; row dicts are copied so callers can't edit the cache
+            return cached if columnar else [dict(row) for row in cached]
+        # Versions were read first: a concurrent write can only make this result newer than its key
+        result = await self.sql_engine.execute(sql, params, columnar=columnar)
+        self.entries.put(key, result if columnar else [dict(row) for row in result])
+        return result
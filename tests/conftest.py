@@ -0,0 +1,32 @@
+"""Shared fixtures: a seeded sqlite file and offline agents"""
+
+import pytest
+
+from agent import LLMPoweredEquityAgent
+from benchmarks import synthetic_backend
+from sql_engine import seed_demo_database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A local sqlite file seeded with the demo companies, participants and awards"""
+    path = str(tmp_path / "equity.db")
+    seed_demo_database(path)
+    return path
+
+
+@pytest.fixture
+def make_agent(db_path):
+    """Build agents on the seeded file with a zero-latency synthetic LLM backend"""
+    agents = []
+    
+    def make(**config):
+        config.setdefault("db_path", db_path)
+        config.setdefault("llm_backend", synthetic_backend(latency=0.0, jitter=0.0, seconds_per_token=0.0))
+        agent = LLMPoweredEquityAgent(config)
+        agents.append(agent)
+        return agent
+    
+    yield make
+    for agent in agents:
+        agent.sql_engine.close()
@@ -0,0 +1,114 @@
+"""RecordReplayBackend cassettes and end-to-end benchmark regression checks"""
+
+import asyncio
+import json
+
+import pytest
+
+from benchmarks import (
+    BENCHMARK_CORPUS, benchmark_end_to_end, benchmark_front_end_modes, find_benchmark_regressions,
+    synthetic_backend,
+)
+from llm_client import CassetteMissError, FakeLLMBackend, RecordReplayBackend
+
+MESSAGES = [{"role": "user", "content": "Parse this natural language query: Show Sales RSUs"}]
+
+
+def complete(backend, messages=MESSAGES):
+    response = asyncio.run(backend.complete("gpt-4", messages, 0.1, 100, 5.0))
+    return response.choices[0].message.content
+
+
+def stream(backend):
+    async def main():
+        return "".join([delta async for delta in backend.stream("gpt-4", MESSAGES, 0.1, 100, 5.0)])
+    return asyncio.run(main())
+
+
+def report(**overrides):
+    base = {"error_rate": 0.0, "statuses": {"success": 12}, "throughput_qps": 20.0,
+            "latency_ms": {"mean": 50.0, "p50": 45.0, "p95": 80.0, "p99": 120.0},
+            "llm_calls_per_query": 3.0, "prompt_tokens_per_query": 1400.0, "completion_tokens_per_query": 220.0,
+            "stages": {"parse": {"p50_ms": 10.0}, "execute": {"p50_ms": 0.4}},
+            "llm_stages": {"parse": {"p50_ms": 9.0}}}
+    base.update(overrides)
+    return base
+
+
+def test_recorded_completions_replay_offline(tmp_path):
+    cassette = str(tmp_path / "cassette.jsonl")
+    inner = FakeLLMBackend(lambda model, messages: "recorded answer", latency=0.0)
+    recorder = RecordReplayBackend(cassette, mode="record", inner=inner)
+    assert complete(recorder) == "recorded answer" and recorder.stats["recorded"] == 1
+
+    replay = RecordReplayBackend(cassette, mode="replay")
+    response = asyncio.run(replay.complete("gpt-4", MESSAGES, 0.1, 100, 5.0))
+    assert response.choices[0].message.content == "recorded answer"
+    assert response.usage.prompt_tokens > 0 and replay.stats["hits"] == 1
+    assert stream(replay) == "recorded answer"
+
+
+def test_any_prompt_change_is_a_miss(tmp_path):
+    cassette = str(tmp_path / "cassette.jsonl")
+    inner = FakeLLMBackend(lambda model, messages: "answer", latency=0.0)
+    complete(RecordReplayBackend(cassette, mode="record", inner=inner))
+    replay = RecordReplayBackend(cassette, mode="replay")
+    with pytest.raises(CassetteMissError):
+        complete(replay, [{"role": "user", "content": MESSAGES[0]["content"] + "!"}])
+    assert replay.stats["misses"] == 1
+
+
+def test_auto_mode_records_misses_and_streams_are_captured(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    inner = FakeLLMBackend(lambda model, messages: "streamed " * 5, latency=0.0)
+    auto = RecordReplayBackend(str(cassette), mode="auto", inner=inner)
+    assert stream(auto) == "streamed " * 5
+    assert stream(auto) == "streamed " * 5
+    assert inner.calls == 1 and auto.stats == {"hits": 1, "misses": 1, "recorded": 1}
+    record = json.loads(cassette.read_text())
+    assert record["content"] == "streamed " * 5 and record["completion_tokens"] > 0
+
+
+def test_invalid_modes_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        RecordReplayBackend(str(tmp_path / "c.jsonl"), mode="live")
+    with pytest.raises(ValueError):
+        RecordReplayBackend(str(tmp_path / "c.jsonl"), mode="record")
+
+
+def test_identical_reports_have_no_regressions():
+    assert find_benchmark_regressions(report(), report()) == []
+    assert find_benchmark_regressions(report()) == []
+
+
+def test_worse_metrics_beyond_tolerance_are_reported():
+    current = report(throughput_qps=15.0, latency_ms={"mean": 70.0, "p50": 60.0, "p95": 81.0, "p99": 500.0},
+                     llm_calls_per_query=4.0, stages={"parse": {"p50_ms": 14.0}, "execute": {"p50_ms": 0.9}})
+    regressions = find_benchmark_regressions(current, report())
+    assert [line.split(":")[0] for line in regressions] == [
+        "throughput_qps", "latency p50 ms", "llm_calls_per_query", "stage parse p50 ms"]
+
+
+def test_errors_fail_even_without_a_baseline():
+    regressions = find_benchmark_regressions(report(error_rate=0.25, statuses={"success": 9, "error": 3}))
+    assert len(regressions) == 1 and regressions[0].startswith("error rate 25.00%")
+
+
+def test_end_to_end_benchmark_runs_offline(db_path):
+    backend = synthetic_backend(latency=0.0, jitter=0.0, seconds_per_token=0.0)
+    result = asyncio.run(benchmark_end_to_end(
+        backend, queries=BENCHMARK_CORPUS[:4], concurrency=2, iterations=2,
+        agent_config={"db_path": db_path}))
+    assert result["queries"] == 8 and result["error_rate"] == 0.0
+    assert result["llm_calls_per_query"] > 0 and "parse" in result["stages"]
+    assert find_benchmark_regressions(result, result) == []
+
+
+def test_front_end_benchmark_sends_every_query_through_the_llm():
+    # A locally parsable query: with the local parser on, staged mode would skip the parse call
+    query = "List all RSUs PSUs NQOs issued in 2023 fiscal year"
+    result = asyncio.run(benchmark_front_end_modes(
+        [query], iterations=2, latency=0.0, jitter=0.0, seconds_per_token=0.0))
+    # Staged: parse and plan on every run, nothing served from a cache the second time
+    assert result["staged"]["llm_calls_per_query"] >= 2
+    assert result["fused"]["llm_calls_per_query"] >= 1
@@ -0,0 +1,114 @@
+"""Bulk communication: compiled templates, batched sends, and the email step of a response"""
+
+import asyncio
+import json
+
+import pytest
+
+from communications import (
+    BulkCommunicationPipeline, EmailTemplate, EmailTemplateError, FileEmailSink, LLMCommunicationGenerator,
+    SMTPStubSink,
+)
+from llm_client import FakeLLMBackend, LLMClient
+
+EMAIL = {"subject": "Vesting update for {{participant_name}}",
+         "body": "Hi {name}, your {award_type} grant of {quantity} shares vests soon.",
+         "call_to_action": "Reply with questions"}
+
+
+def recipients(count):
+    return [{"participant_id": f"EMP{index:03d}", "name": f"P{index}", "email": f"p{index}@example.com",
+             "award_type": "RSU", "quantity": 100 + index} for index in range(count)]
+
+
+class RecordingGenerator(LLMCommunicationGenerator):
+    def __init__(self, email_content=EMAIL):
+        super().__init__(LLMClient(FakeLLMBackend(latency=0.0)))
+        self.email_content = email_content
+        self.calls = []
+
+    async def generate_email(self, recipients_data, context, email_type="notification", total_recipients=None):
+        self.calls.append({"recipients": list(recipients_data), "context": context,
+                           "total_recipients": total_recipients})
+        return self.email_content
+
+
+class FlakySink(SMTPStubSink):
+    async def send_batch(self, messages):
+        if self.batches == 1:
+            self.batches += 1
+            raise ConnectionError("relay refused the batch")
+        return await super().send_batch(messages)
+
+
+def test_template_renders_both_placeholder_styles_and_aliases():
+    template = EmailTemplate(EMAIL, recipients(1)[0])
+    message = template.render(recipients(1)[0])
+    assert message == {"to": "p0@example.com", "subject": "Vesting update for P0",
+                       "body": "Hi P0, your RSU grant of 100 shares vests soon.",
+                       "call_to_action": "Reply with questions"}
+    assert template.placeholders == {"participant_name", "name", "award_type", "quantity"}
+
+
+def test_unknown_placeholders_fail_at_compile_time():
+    with pytest.raises(EmailTemplateError):
+        EmailTemplate({"subject": "Hi {{salary_band}}"}, recipients(1)[0])
+
+
+def test_recipients_missing_a_required_field_are_skipped():
+    template = EmailTemplate(EMAIL, recipients(1)[0])
+    rows = recipients(3)
+    del rows[1]["quantity"]
+    chunks = list(template.render_chunks(rows, chunk_size=2))
+    assert [len(messages) for messages, _ in chunks] == [1, 1]
+    assert sum(skipped for _, skipped in chunks) == 1
+
+
+def test_pipeline_generates_once_and_sends_every_recipient_in_chunks(tmp_path):
+    generator = RecordingGenerator()
+    outbox = tmp_path / "outbox.jsonl"
+    pipeline = BulkCommunicationPipeline(generator, FileEmailSink(str(outbox)),
+                                            chunk_size=10, max_in_flight=2)
+    result = asyncio.run(pipeline.send(iter(recipients(35)), "Q3 vesting"))
+    assert len(generator.calls) == 1 and len(generator.calls[0]["recipients"]) == 3
+    assert result["status"] == "sent" and result["sent"] == 35 and result["batches"] == 4
+    lines = [json.loads(line) for line in outbox.read_text().splitlines()]
+    assert sorted(message["to"] for message in lines) == sorted(row["email"] for row in recipients(35))
+
+
+def test_a_failed_batch_is_counted_and_the_rest_still_go_out():
+    pipeline = BulkCommunicationPipeline(RecordingGenerator(), FlakySink(), chunk_size=5, max_in_flight=1)
+    result = asyncio.run(pipeline.send(recipients(20), "Q3 vesting"))
+    assert result["status"] == "partial"
+    assert (result["sent"], result["failed"]) == (15, 5)
+    assert result["errors"] == ["relay refused the batch"]
+
+
+def test_a_bad_generated_template_falls_back_to_the_standard_one():
+    generator = RecordingGenerator({"subject": "Hi {{salary_band}}", "body": "x"})
+    result = asyncio.run(BulkCommunicationPipeline(generator).send(recipients(4), "ctx"))
+    assert result["sent"] == 4 and result["subject"] == "Important Equity Plan Information"
+
+
+def test_response_email_is_drafted_for_the_participant_step_rows(make_agent):
+    agent = make_agent()
+    agent.communication_generator = RecordingGenerator()
+    plan = [{"step_id": 1, "tool": "calculate_date_range", "params": {}, "dependencies": []},
+            {"step_id": 2, "tool": "query_participants", "params": {}, "dependencies": [1]}]
+    results = {1: {"start_date": "2024-01-01", "end_date": "2024-03-31"}, 2: recipients(5)}
+    response = asyncio.run(agent._finish_response("Email Sales about vesting", {"executive_summary": "s"},
+                                                  results, plan))
+    call, = agent.communication_generator.calls
+    assert call["recipients"] == recipients(3) and call["total_recipients"] == 5
+    assert response["synthesis"]["generated_email"] == EMAIL
+
+
+def test_response_email_is_skipped_when_the_plan_already_sends_one(make_agent):
+    agent = make_agent()
+    agent.communication_generator = RecordingGenerator()
+    plan = [{"step_id": 1, "tool": "query_participants", "params": {}, "dependencies": []},
+            {"step_id": 2, "tool": "send_notification", "params": {}, "dependencies": [1]}]
+    results = {1: recipients(5), 2: {"status": "sent"}}
+    response = asyncio.run(agent._finish_response("Email Sales about vesting", {}, results, plan))
+    assert agent.communication_generator.calls == []
+    assert "generated_email" not in response["synthesis"]
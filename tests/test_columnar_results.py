@@ -0,0 +1,113 @@
+"""ColumnarResultSet: encoded columns, selection views and vectorized aggregation"""
+
+import asyncio
+import random
+
+import pytest
+
+from columnar import ColumnarResultSet, _DictionaryColumn, _NumericColumn, _ObjectColumn
+from sql_engine import EquityQueryBuilder, SQLExecutionEngine
+
+
+def grant_rows(count, seed=11):
+    rng = random.Random(seed)
+    return [{"grant_id": index, "department": rng.choice(["Sales", "HR", "Engineering", None]),
+             "award_type": rng.choice(["RSU", "PSU", "NQO"]), "quantity": rng.choice([None, rng.randrange(1, 900)]),
+             "exercise_price": rng.choice([None, 12.5, 40.0]), "name": f"P{index}"}
+            for index in range(count)]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return grant_rows(3000)
+
+
+@pytest.fixture(scope="module")
+def result_set(rows):
+    return ColumnarResultSet.from_rows(rows)
+
+
+def test_round_trip_keeps_rows_order_and_nulls(rows, result_set):
+    assert len(result_set) == len(rows) and result_set.to_dicts() == rows
+    assert result_set[5] == rows[5] and result_set[10:13] == rows[10:13]
+    assert ColumnarResultSet.materialize({"step": [result_set[:0], {"n": 1}]}) == {"step": [[], {"n": 1}]}
+
+
+def test_columns_are_encoded_by_type(result_set):
+    columns = result_set._columns
+    assert isinstance(columns["grant_id"], _NumericColumn) and columns["grant_id"].data.typecode == "q"
+    assert isinstance(columns["exercise_price"], _NumericColumn) and columns["exercise_price"].data.typecode == "d"
+    assert isinstance(columns["department"], _DictionaryColumn)
+    assert isinstance(columns["name"], _ObjectColumn)
+
+
+@pytest.mark.parametrize("column, op, value", [
+    ("department", "==", "sales"),
+    ("department", "!=", "Sales"),
+    ("award_type", "in", ["rsu", "PSU"]),
+    ("award_type", "not in", ["NQO"]),
+    ("quantity", ">=", 450),
+    ("exercise_price", "<", 20),
+    ("name", "==", "P7"),
+])
+def test_where_matches_a_row_by_row_filter(rows, result_set, column, op, value):
+    def matches(row):
+        item, target = row[column], value
+        if item is None:
+            return False
+        if column in ("department", "award_type"):  # Dictionary-encoded text compares case-insensitively
+            item = item.casefold()
+            target = [text.casefold() for text in value] if isinstance(value, list) else value.casefold()
+        return ColumnarResultSet.OPERATORS[op](item, target)
+
+    assert result_set.where(column, op, value).to_dicts() == [row for row in rows if matches(row)]
+
+
+def test_views_chain_without_copying_columns(rows, result_set):
+    view = result_set.filter(department="Sales", award_type=["RSU", "PSU"]).where("quantity", ">", 100)
+    assert view._columns is result_set._columns
+    expected = [row for row in rows if row["department"] == "Sales" and row["award_type"] in ("RSU", "PSU")
+                and row["quantity"] is not None and row["quantity"] > 100]
+    assert view.to_dicts() == expected
+    assert view.sum("quantity") == sum(row["quantity"] for row in expected)
+
+
+def test_aggregates_skip_nulls(rows, result_set):
+    quantities = [row["quantity"] for row in rows if row["quantity"] is not None]
+    assert result_set.count("quantity") == len(quantities)
+    assert (result_set.sum("quantity"), result_set.min("quantity"), result_set.max("quantity")) == (
+        sum(quantities), min(quantities), max(quantities))
+    assert [row["quantity"] for row in result_set.top(3, "quantity")] == sorted(quantities, reverse=True)[:3]
+
+
+def test_group_by_counts_and_sums(rows, result_set):
+    counts = {}
+    totals = {}
+    for row in rows:
+        counts[row["department"]] = counts.get(row["department"], 0) + 1
+        if row["quantity"] is not None:
+            key = (row["department"], row["award_type"])
+            totals[key] = totals.get(key, 0) + row["quantity"]
+    assert result_set.group_by("department").count() == counts
+    assert result_set.group_by("department", "award_type").sum("quantity") == totals
+    groups = result_set.where("award_type", "==", "NQO").group_by("department").groups()
+    assert sum(len(group) for group in groups.values()) == len(result_set.where("award_type", "==", "NQO"))
+
+
+def test_unsupported_operators_are_rejected(result_set):
+    with pytest.raises(ValueError):
+        result_set.where("department", "~", "Sales")
+    with pytest.raises(ValueError):
+        result_set.where("department", "<", "Sales")
+
+
+def test_engine_returns_columnar_sets_straight_from_sqlite(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+    try:
+        sql, params = EquityQueryBuilder.grants({})
+        columnar = asyncio.run(engine.execute(sql, params, columnar=True))
+        plain = asyncio.run(engine.execute(sql, params))
+    finally:
+        engine.close()
+    assert isinstance(columnar, ColumnarResultSet) and columnar.to_dicts() == plain
+    assert columnar.group_by("award_type").count() == {"RSU": 3, "PSU": 3, "NQO": 2, "ISO": 1}
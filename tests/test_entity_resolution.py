@@ -0,0 +1,84 @@
+"""EntityResolutionIndex: MATCH / CONFIRM / CLARIFICATION_NEEDED without the LLM"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from entity_resolution import EntityResolutionIndex
+from sql_engine import SQLExecutionEngine
+
+
+@pytest.fixture
+def index(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+    index = EntityResolutionIndex(engine)
+    asyncio.run(index.refresh())
+    yield index
+    engine.close()
+
+
+@pytest.mark.parametrize("column, text, value", [
+    ("department", "engineering", "Engineering"),
+    ("company_name", "Apple", "Apple Inc."),
+    ("country", "UK", "United Kingdom"),
+    ("country", "usa", "United States"),
+])
+def test_exact_prefix_and_alias_values_match(index, column, text, value):
+    decision = index.resolve(column, text)
+    assert (decision["decision"], decision["value"]) == (EntityResolutionIndex.MATCH, value)
+
+
+@pytest.mark.parametrize("column, text, value", [
+    ("department", "Enginering", "Engineering"),
+    ("company_name", "microsft", "Microsoft Corporation"),
+])
+def test_misspellings_ask_for_confirmation(index, column, text, value):
+    decision = index.resolve(column, text)
+    assert decision["decision"] == EntityResolutionIndex.CONFIRM
+    assert decision["value"] == value and value in decision["message"]
+
+
+def test_unknown_values_list_the_closest_or_available_ones(index):
+    near = index.resolve("department", "Sls")
+    assert near["decision"] == EntityResolutionIndex.CLARIFICATION_NEEDED
+    assert near["candidates"][0][0] == "Sales"
+    unknown = index.resolve("company_name", "Globex")
+    assert unknown["candidates"] == [] and "Acme Corp" in unknown["message"]
+
+
+def test_shortlists_are_bounded_and_scored():
+    index = EntityResolutionIndex(top_k=3)
+    for number in range(500):
+        index.add("company_name", f"Holding Company {number:03d}")
+    shortlist = index.candidates("company_name", "Holdng Company 123")
+    assert len(shortlist) == 3
+    assert all(0.0 <= score <= 1.0 for _, score in shortlist)
+    assert shortlist[0][0] == "Holding Company 123"
+
+
+def test_filters_are_rewritten_in_place_and_placeholders_left_alone(index):
+    filters = {"department": ["engineering", "Enginering"], "company": "apple", "country": "N/A"}
+    unresolved = index.resolve_filters(filters)
+    assert filters == {"department": ["Engineering", "Enginering"], "company": "Apple Inc.", "country": "N/A"}
+    assert [item["text"] for item in unresolved] == ["Enginering"]
+
+
+def test_refresh_adds_and_removes_changed_values(index, db_path):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("UPDATE participants SET department = 'Treasury' WHERE department = 'Legal'")
+    asyncio.run(index.refresh())  # Within the refresh interval: nothing changes
+    assert index.resolve("department", "legal")["decision"] == EntityResolutionIndex.MATCH
+    asyncio.run(index.refresh(force=True))
+    assert index.resolve("department", "treasury")["value"] == "Treasury"
+    assert index.resolve("department", "legal")["decision"] != EntityResolutionIndex.MATCH
+
+
+def test_agent_asks_the_user_about_unresolved_plan_values(make_agent):
+    agent = make_agent()
+    parsed = {"entities": {"target": "participants", "filters": {"department": "engineering"}}}
+    plan = [{"step_id": 1, "tool": "query_participants", "params": {"department": "Enginering"}}]
+    response = asyncio.run(agent._resolve_entities("q", parsed, plan))
+    assert parsed["entities"]["filters"]["department"] == "Engineering"
+    assert response["status"] == "confirmation_needed"
+    assert "Engineering" in response["message"]
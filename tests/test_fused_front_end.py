@@ -0,0 +1,81 @@
+"""LLMFusedFrontEnd: one call for parse, plan and validate; per-section fallback"""
+
+import asyncio
+import json
+
+from agent import LLMBusinessValidator, LLMFusedFrontEnd, LLMQueryParser, LLMWorkflowPlanner
+from llm_client import FakeLLMBackend, LLMClient
+
+QUERY = "Show Sales participants with RSUs"
+STAGED_PARSE = {
+    "entities": {"target": "participants", "filters": {"department": "Sales", "security_type": "RSU"}},
+    "intent": {"primary_action": "query", "output_format": "list", "data_scope": "single_company"},
+    "confidence": 0.9,
+}
+FUSED_PLAN = [{"step_id": 1, "tool": "query_participants", "description": "Sales RSU holders",
+               "params": {"department": "sales", "security_type": "RSU"}, "dependencies": []}]
+VALIDATION = {"is_valid": True, "warnings": [], "errors": [], "suggestions": [], "confidence": 0.9}
+
+
+def front_end(fused_response):
+    calls = []
+
+    def responder(model, messages):
+        prompt = "".join(message["content"] for message in messages)
+        if "In ONE response, parse this" in prompt:
+            calls.append("fused")
+            return json.dumps(fused_response)
+        if "Parse this natural language query" in prompt:
+            calls.append("parse")
+            return json.dumps(STAGED_PARSE)
+        if "workflow planning expert" in prompt:
+            calls.append("plan")
+            return json.dumps([{"step_id": 1, "tool": "query_participants", "params": {"department": "Sales"},
+                                "dependencies": []}])
+        calls.append("validate")
+        return json.dumps(VALIDATION)
+
+    client = LLMClient(FakeLLMBackend(responder, latency=0.0))
+    fused = LLMFusedFrontEnd(LLMQueryParser(client), LLMWorkflowPlanner(client),
+                                LLMBusinessValidator(client))
+    return fused, calls
+
+
+def test_valid_response_needs_one_call():
+    fused, calls = front_end({"parsed_query": STAGED_PARSE, "workflow": FUSED_PLAN, "validation": VALIDATION})
+    parsed_query, workflow, validation = asyncio.run(fused.process(QUERY))
+    assert calls == ["fused"]
+    assert workflow == FUSED_PLAN and validation["source"] == "fused+rule_engine"
+
+
+def test_bad_parse_section_keeps_an_agreeing_plan_and_verdict():
+    fused, calls = front_end({"parsed_query": {"entities": "?"}, "workflow": FUSED_PLAN, "validation": VALIDATION})
+    parsed_query, workflow, validation = asyncio.run(fused.process(QUERY))
+    assert calls == ["fused", "parse"]
+    assert parsed_query["entities"] == STAGED_PARSE["entities"]
+    assert workflow == FUSED_PLAN and validation["source"] == "fused+rule_engine"
+
+
+def test_bad_parse_section_replans_when_the_plan_disagrees():
+    conflicting = [{**FUSED_PLAN[0], "params": {"department": "Finance"}}]
+    fused, calls = front_end({"parsed_query": None, "workflow": conflicting, "validation": VALIDATION})
+    _, workflow, validation = asyncio.run(fused.process(QUERY))
+    assert calls[:3] == ["fused", "parse", "plan"]
+    assert workflow[0]["params"] == {"department": "Sales"}
+    assert validation["source"] != "fused+rule_engine"
+
+
+def test_plan_must_contain_the_query_tool_for_the_target():
+    wrong_tool = [{**FUSED_PLAN[0], "tool": "query_companies", "params": {}}]
+    assert not LLMFusedFrontEnd._plan_agrees(wrong_tool, STAGED_PARSE)
+    placeholder = {**STAGED_PARSE, "entities": {"target": "participants",
+                                                "filters": {"department": "if mentioned"}}}
+    assert LLMFusedFrontEnd._plan_agrees(FUSED_PLAN, placeholder)
+
+
+def test_bad_workflow_section_is_rebuilt_alone():
+    fused, calls = front_end({"parsed_query": STAGED_PARSE, "workflow": [{"tool": "rm -rf"}],
+                              "validation": VALIDATION})
+    _, workflow, _ = asyncio.run(fused.process(QUERY))
+    assert calls[:2] == ["fused", "plan"] and "parse" not in calls
+    assert workflow[0]["tool"] == "query_participants"
@@ -0,0 +1,110 @@
+"""LLMClient: concurrency limits, retries, deadlines and single-flight coalescing"""
+
+import asyncio
+import time
+
+import pytest
+
+from llm_client import FakeLLMBackend, LLMClient, LLMDeadlineExceeded, TransientLLMError, llm_deadline
+from tracing import track_llm_usage
+
+
+def messages(text="hello"):
+    return [{"role": "user", "content": text}]
+
+
+class FlakyBackend(FakeLLMBackend):
+    """Raises ``error`` on the first ``failures`` calls, then answers"""
+
+    def __init__(self, failures, error=TransientLLMError, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.failures = failures
+        self.error = error
+
+    async def complete(self, *args):
+        if self.calls < self.failures:
+            self.calls += 1
+            raise self.error("upstream hiccup")
+        return await super().complete(*args)
+
+
+async def charged_call(client, text="hello", deadline_seconds=None):
+    """One request: its own deadline and usage counters, as process_query sets them"""
+    with llm_deadline(deadline_seconds), track_llm_usage() as usage:
+        response = await client.chat("gpt-4", messages(text))
+    return response, usage
+
+
+def test_identical_concurrent_requests_share_one_upstream_call():
+    backend = FakeLLMBackend(lambda model, msgs: '{"ok": true}', latency=0.05)
+    client = LLMClient(backend)
+
+    async def main():
+        return await asyncio.gather(charged_call(client), charged_call(client), charged_call(client, "other"))
+
+    (first, first_usage), (second, second_usage), (_, other_usage) = asyncio.run(main())
+    assert backend.calls == 2
+    assert client.stats["coalesced"] == 1
+    assert first.choices[0].message.content == second.choices[0].message.content == '{"ok": true}'
+    # Every request is charged the tokens of the response it used; upstream tokens are counted once
+    assert first_usage == second_usage and first_usage["calls"] == 1 and first_usage["completion_tokens"] > 0
+    assert client.stats["prompt_tokens"] == first_usage["prompt_tokens"] + other_usage["prompt_tokens"]
+
+
+def test_coalesced_follower_outlives_a_leader_with_a_shorter_deadline():
+    backend = FakeLLMBackend(latency=0.15)
+    client = LLMClient(backend, base_backoff=0.01)
+
+    async def main():
+        leader = asyncio.ensure_future(charged_call(client, deadline_seconds=0.05))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(charged_call(client, deadline_seconds=2.0))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(main())
+    assert isinstance(leader, LLMDeadlineExceeded)
+    response, usage = follower
+    assert response.choices[0].message.content == "{}" and usage["completion_tokens"] > 0
+
+
+def test_transient_errors_are_retried_with_backoff():
+    backend = FlakyBackend(failures=2)
+    client = LLMClient(backend, base_backoff=0.001, max_backoff=0.002)
+    response, _ = asyncio.run(charged_call(client))
+    assert response.choices[0].message.content == "{}"
+    assert backend.calls == 3 and client.stats["retries"] == 2
+
+
+def test_retries_give_up_after_max_retries():
+    client = LLMClient(FlakyBackend(failures=10), max_retries=2, base_backoff=0.001)
+    with pytest.raises(TransientLLMError):
+        asyncio.run(charged_call(client))
+    assert client.stats["upstream_calls"] == 3
+
+
+def test_deadline_overruns_are_never_retried():
+    backend = FlakyBackend(failures=10, error=LLMDeadlineExceeded)
+    client = LLMClient(backend, base_backoff=0.001)
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(charged_call(client))
+    assert backend.calls == 1 and client.stats["retries"] == 0
+
+
+def test_slow_upstream_fails_at_the_request_deadline():
+    client = LLMClient(FakeLLMBackend(latency=1.0))
+    started = time.perf_counter()
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(charged_call(client, deadline_seconds=0.05))
+    assert time.perf_counter() - started < 0.5
+
+
+def test_per_model_concurrency_is_bounded():
+    client = LLMClient(FakeLLMBackend(latency=0.05), max_concurrency_per_model=2)
+
+    async def main():
+        await asyncio.gather(*(client.chat("gpt-4", messages(str(i))) for i in range(6)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    assert time.perf_counter() - started >= 0.15
+    assert client.stats["upstream_calls"] == 6
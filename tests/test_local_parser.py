@@ -0,0 +1,101 @@
+"""AhoCorasickMatcher and LocalQueryParser: vocabulary parses without the LLM"""
+
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from agent import LLMQueryParser
+from llm_client import FakeLLMBackend, LLMClient
+from local_parser import AhoCorasickMatcher, LocalQueryParser
+from sql_engine import SQLExecutionEngine
+
+
+@pytest.fixture
+def parser(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+    parser = LocalQueryParser.from_file(sql_engine=engine)
+    asyncio.run(parser.refresh_database_values())
+    yield parser
+    engine.close()
+
+
+def test_matcher_finds_overlapping_whole_word_terms():
+    matcher = AhoCorasickMatcher()
+    matcher.add("stock", "concepts", "stock")
+    matcher.add("restricted stock", "security_types", "RESTRICTED_STOCK")
+    matcher.add("rsu", "security_types", "RSU")
+    text = "restricted stock and rsus, not stockholders"
+    spans = {(text[start:end], tuple(meanings)) for start, end, meanings in matcher.search(text)}
+    assert spans == {("restricted stock", ("security_types",)), ("stock", ("concepts",))}
+
+
+def test_matcher_edits_in_place_and_relinks_lazily():
+    matcher = AhoCorasickMatcher()
+    matcher.add("sales", "actions", "sell")
+    matcher.add("sales", "departments", "Sales")
+    assert matcher.terms == 1
+    assert matcher.search("sales team")[0][2] == {"actions": "sell", "departments": "Sales"}
+    matcher.remove("sales", "actions")
+    matcher.add("sales ops", "departments", "Sales Ops")
+    assert [meanings for _, _, meanings in matcher.search("sales ops")] == [
+        {"departments": "Sales"}, {"departments": "Sales Ops"}]
+    matcher.remove("sales", "departments")
+    assert matcher.terms == 1 and len(matcher.search("sales")) == 0
+
+
+def test_known_vocabulary_parses_with_full_confidence(parser):
+    parsed = parser.parse("Show Engineering officers with PSUs")
+    assert parsed["entities"] == {"target": "participants", "filters": {
+        "department": "Engineering", "security_type": "PSU", "participant_type": "officer"}}
+    assert parsed["intent"]["primary_action"] == "query" and parsed["confidence"] == 1.0
+
+
+def test_word_order_decides_people_or_grants(parser):
+    assert parser.parse("officers with options")["entities"]["target"] == "participants"
+    assert parser.parse("options held by officers")["entities"]["target"] == "grants"
+
+
+def test_several_companies_widen_the_scope(parser):
+    parsed = parser.parse("List grants for Acme Corp and Shopify Inc.")
+    assert parsed["entities"]["filters"]["company_name"] == ["Acme Corp", "Shopify Inc."]
+    assert parsed["intent"]["data_scope"] == "multi_company"
+
+
+def test_negations_and_unknown_words_lower_confidence(parser):
+    assert parser.parse("Show participants not in Sales")["confidence"] == 0.0
+    assert parser.parse("clawback provisions for phantom units")["confidence"] < 0.2
+    # "sales" is both a department and an action, which costs some confidence
+    assert 0.85 < parser.parse("Show Sales participants with RSUs")["raw_confidence"] < 1.0
+
+
+def test_database_values_are_resynced_on_refresh(parser, db_path):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("UPDATE participants SET department = 'Treasury' WHERE department = 'Legal'")
+    asyncio.run(parser.refresh_database_values(force=True))
+    assert parser.parse("Treasury participants")["entities"]["filters"] == {"department": "Treasury"}
+    assert "department" not in parser.parse("Legal participants")["entities"]["filters"]
+
+
+def test_calibration_follows_observed_agreement(parser):
+    parsed = parser.parse("Show Engineering officers with PSUs")
+    disagreeing = {"entities": {"target": "grants", "filters": {}}, "intent": {"primary_action": "query"}}
+    for _ in range(20):
+        parser.record_outcome(parsed, disagreeing)
+    assert parser.parse("Show Engineering officers with PSUs")["confidence"] < 0.3
+    assert parser.stats["disagreements"] == 20
+
+
+def test_confident_local_parses_skip_the_llm(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+    backend = FakeLLMBackend(lambda model, messages: json.dumps({"entities": {}, "intent": {}}), latency=0.0)
+    llm_parser = LLMQueryParser(LLMClient(backend),
+                                   local_parser=LocalQueryParser.from_file(sql_engine=engine))
+    try:
+        confident = asyncio.run(llm_parser.parse_query("Show Engineering officers with PSUs this quarter"))
+        asyncio.run(llm_parser.parse_query("clawback provisions for phantom units"))
+    finally:
+        engine.close()
+    assert confident["source"] == "local" and confident["entities"]["filters"]["time_context"] == "this quarter"
+    assert backend.calls == 1 and llm_parser.local_parser.stats["disagreements"] == 1
@@ -0,0 +1,76 @@
+"""Parse caching: LRUTTLCache, QueryNormalizer and LLMQueryParser cache hits"""
+
+import asyncio
+import json
+from datetime import date
+
+import pytest
+
+from agent import LLMQueryParser
+from caches import LRUTTLCache
+from llm_client import FakeLLMBackend, LLMClient
+from query_normalizer import QueryNormalizer
+
+PARSED = {
+    "entities": {"target": "participants", "filters": {"department": "Sales", "security_type": "RSU"}},
+    "intent": {"primary_action": "query", "output_format": "list", "data_scope": "single_company"},
+    "confidence": 0.9,
+}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats["evictions"] == 1 and cache.stats["misses"] == 1
+
+
+def test_expired_entries_miss():
+    cache = LRUTTLCache(ttl_seconds=-1)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats["expirations"] == 1
+
+
+def test_disk_backed_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    LRUTTLCache(disk_path=path, namespace="parse").put("q", {"x": [1, 2]})
+    restarted = LRUTTLCache(disk_path=path, namespace="parse")
+    assert restarted.get("q") == {"x": [1, 2]}
+    assert restarted.stats["disk_hits"] == 1
+
+
+def test_namespace_must_be_an_identifier():
+    with pytest.raises(ValueError):
+        LRUTTLCache(namespace="parse; DROP TABLE x")
+
+
+def test_normalizer_ignores_case_punctuation_and_plurals():
+    normalize = QueryNormalizer().normalize
+    assert normalize("Show me  Sales employees with RSUs!") == normalize("show me sales employee with rsu")
+
+
+def test_normalizer_resolves_time_phrases_against_today():
+    normalize = QueryNormalizer().normalize
+    query = "grants this quarter"
+    assert normalize(query, today=date(2024, 2, 1)) == normalize(query, today=date(2024, 3, 31))
+    assert normalize(query, today=date(2024, 2, 1)) != normalize(query, today=date(2024, 5, 1))
+
+
+def test_repeated_query_is_parsed_once_and_cached_copies_are_isolated():
+    backend = FakeLLMBackend(lambda model, messages: json.dumps(PARSED), latency=0.0)
+    parser = LLMQueryParser(LLMClient(backend), cache=LRUTTLCache())
+
+    async def main():
+        first = await parser.parse_query("Show Sales participants with RSUs")
+        first["entities"]["filters"]["department"] = "mutated"
+        second = await parser.parse_query("show sales participants with RSUs?")
+        return second
+
+    second = asyncio.run(main())
+    assert backend.calls == 1
+    assert second["entities"]["filters"]["department"] == "Sales"
+    assert parser.cache.stats["hits"] == 1
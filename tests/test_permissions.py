@@ -0,0 +1,134 @@
+"""PermissionIndex, UserACL row scopes pushed into SQL, and how the agent denies requests"""
+
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+from benchmarks import BENCHMARK_USER, benchmark_permission_index
+from permissions import DEFAULT_PERMISSIONS_PATH, PermissionDenied, PermissionIndex
+from sql_engine import EquityQueryBuilder, SQLExecutionEngine
+
+
+@pytest.fixture
+def permissions_path(tmp_path):
+    path = tmp_path / "permissions.json"
+    shutil.copy(DEFAULT_PERMISSIONS_PATH, path)
+    return path
+
+
+def edit(path, change):
+    config = json.loads(path.read_text())
+    change(config)
+    path.write_text(json.dumps(config))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))  # A new mtime even on coarse clocks
+
+
+def participants(make_agent, user_id, **config):
+    agent = make_agent(**config)
+    response = asyncio.run(agent.process_query("Show me Engineering participants", user_id))
+    return agent, response
+
+
+def test_acls_are_compiled_once_and_cached(permissions_path):
+    index = PermissionIndex(str(permissions_path))
+    acl = index.acl("hrbp01")
+    assert index.acl("hrbp01") is acl and index.stats["compiles"] == 1
+    assert acl.allows("query") and not acl.allows("send")
+    assert index.acl("nobody") is None and index.stats["unknown_users"] == 1
+
+
+def test_scopes_become_bound_sql_predicates():
+    index = PermissionIndex()
+    clauses, params = index.acl("hrbp01").predicates("p", "participants")
+    assert clauses == ["p.company_id IN (?)", "p.department IN (?, ?, ?)", "p.participant_type NOT IN (?, ?)"]
+    assert params == ["C001", "Engineering", "Finance", "HR", "officer", "director"]
+    assert index.acl("hrbp01").predicates("", "companies") == (["company_id IN (?)"], ["C001"])
+    index.assign_role("ops01", "admin")
+    assert index.acl("ops01").predicates() == ([], [])
+
+
+def test_the_benchmark_user_only_exists_on_an_injected_index():
+    assert PermissionIndex().acl(BENCHMARK_USER) is None
+    injected = benchmark_permission_index()
+    assert injected.acl(BENCHMARK_USER).role == "admin"
+    assert PermissionIndex().acl(BENCHMARK_USER) is None
+
+
+def test_pushed_down_scope_matches_filtering_in_memory(db_path):
+    acl = PermissionIndex().acl("hrbp01")
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+    try:
+        pushed = asyncio.run(engine.execute(*EquityQueryBuilder.participants({}, acl)))
+        everyone = asyncio.run(engine.execute(*EquityQueryBuilder.participants({}), columnar=True))
+    finally:
+        engine.close()
+    assert [row["participant_id"] for row in pushed] == ["EMP001", "EMP002", "EMP008"]
+    assert acl.restrict(everyone).to_dicts() == pushed
+
+
+def test_query_results_are_scoped_to_the_caller(make_agent):
+    _, plan_admin = participants(make_agent, "user123")
+    _, hrbp = participants(make_agent, "hrbp01")
+    ids = lambda response: [row["participant_id"] for row in response["raw_data"][1]]
+    assert ids(plan_admin) == ["EMP001", "EMP005"] and ids(hrbp) == ["EMP001"]
+
+
+def test_unknown_users_are_turned_away_before_any_llm_call(make_agent):
+    agent, response = participants(make_agent, "mallory")
+    assert response["status"] == "forbidden" and "mallory" in response["errors"][0]
+    assert agent.llm_client.stats["requests"] == 0
+
+
+def test_steps_needing_a_missing_action_are_denied(make_agent):
+    agent = make_agent()
+    plan = [{"step_id": 1, "tool": "query_participants"}, {"step_id": 2, "tool": "send_notification"}]
+    assert agent._denied_steps("hrbp01", plan) == ["Step 2 (send_notification) needs 'send' permission"]
+    response = asyncio.run(agent.process_query("Email Engineering officers about their upcoming vesting", "hrbp01"))
+    assert response["status"] == "forbidden" and any("send" in error for error in response["errors"])
+    with pytest.raises(PermissionDenied):
+        agent._caller_acl({"user_id": "hrbp01"}, "send")
+
+
+def test_role_changes_take_effect_on_the_next_lookup(permissions_path):
+    index = PermissionIndex(str(permissions_path))
+    assert not index.acl("hrbp01").allows("send")
+    index.assign_role("hrbp01", "plan_administrator")
+    assert index.acl("hrbp01").allows("send")
+    index.assign_role("hrbp01", None)
+    assert not index.acl("hrbp01").allows("send")
+    with pytest.raises(ValueError):
+        index.assign_role("hrbp01", "superuser")
+    edit(permissions_path, lambda config: config["users"].update(hrbp01="admin"))
+    assert index.acl("hrbp01").role == "admin" and index.stats["invalidations"] >= 3
+
+
+@pytest.mark.parametrize("damage", ["missing", "not json", "invalid"])
+def test_unloadable_permissions_deny_with_a_clear_status(make_agent, permissions_path, damage):
+    if damage == "missing":
+        permissions_path.unlink()
+    elif damage == "not json":
+        permissions_path.write_text("{ roles: ")
+    else:
+        edit(permissions_path, lambda config: config["users"].update(user123="root"))
+    agent, response = participants(make_agent, "user123", permissions_path=str(permissions_path))
+    assert response["status"] == "forbidden"
+    assert response["errors"][0].startswith(f"Permissions could not be loaded from {permissions_path}")
+    assert agent.llm_client.stats["requests"] == 0 and agent.permission_index.stats["load_failures"] == 1
+
+
+def test_a_file_that_breaks_later_drops_every_cached_acl(make_agent, permissions_path):
+    agent, first = participants(make_agent, "user123", permissions_path=str(permissions_path))
+    permissions_path.unlink()
+    second = asyncio.run(agent.process_query("Show me Engineering participants", "user123"))
+
+    async def stream():
+        return [event async for event in agent.process_query_stream("Show me Engineering participants", "user123")]
+
+    events = asyncio.run(stream())
+    assert first["status"] == "success" and second["status"] == "forbidden"
+    assert events[-1]["event"] == "error" and events[-1]["data"]["status"] == "forbidden"
+    shutil.copy(DEFAULT_PERMISSIONS_PATH, permissions_path)
+    assert asyncio.run(agent.process_query("Show me Engineering participants", "user123"))["status"] == "success"
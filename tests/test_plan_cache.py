@@ -0,0 +1,100 @@
+"""PlanTemplateCache: signatures, templating, re-binding and streamed hits"""
+
+import asyncio
+
+from agent import LLMWorkflowPlanner
+from caches import PlanTemplateCache
+from llm_client import FakeLLMBackend, LLMClient
+from tracing import Tracer
+
+
+def parsed(target="participants", **filters):
+    return {
+        "entities": {"target": target, "filters": filters},
+        "intent": {"primary_action": "send", "output_format": "email", "data_scope": "single_company"},
+    }
+
+
+PLAN = [
+    {"step_id": 1, "tool": "query_participants", "description": "Find Sales participants",
+     "params": {"department": "Sales", "security_type": "RSU"}, "dependencies": []},
+    {"step_id": 2, "tool": "generate_email", "description": "Draft the Salesforce rollout note for Sales",
+     "params": {"context": "Sales-wide vesting update"}, "dependencies": [1]},
+]
+
+
+def test_signature_ignores_values_and_placeholder_filters():
+    cache = PlanTemplateCache()
+    assert cache.signature(parsed(department="Sales")) == cache.signature(parsed(department="HR"))
+    assert cache.signature(parsed(department="Sales")) == cache.signature(
+        parsed(department="Sales", participant_type="if mentioned", security_type="N/A"))
+    assert cache.signature(parsed(department="Sales")) != cache.signature(parsed(country="UK"))
+
+
+def test_hit_rebinds_whole_values_and_whole_tokens_only():
+    cache = PlanTemplateCache()
+    cache.promote(parsed(department="Sales", security_type="RSU"), PLAN)
+    plan = cache.lookup(parsed(department="Finance", security_type="PSU"))
+    assert plan[0]["params"] == {"department": "Finance", "security_type": "PSU"}
+    assert plan[0]["description"] == "Find Finance participants"
+    # "Salesforce" and the hyphenated "Sales-wide" are not the department
+    assert plan[1]["description"] == "Draft the Salesforce rollout note for Finance"
+    assert plan[1]["params"]["context"] == "Sales-wide vesting update"
+
+
+def test_longer_values_are_templated_before_their_prefixes():
+    cache = PlanTemplateCache()
+    plan = [{"step_id": 1, "tool": "query_participants", "description": "Sales Ops team in Sales",
+             "params": {"department": "Sales", "company": "Sales Ops"}, "dependencies": []}]
+    cache.promote(parsed(department="Sales", company="Sales Ops"), plan)
+    rebound = cache.lookup(parsed(department="HR", company="Acme Corp"))
+    assert rebound[0]["description"] == "Acme Corp team in HR"
+
+
+def test_plans_that_cannot_be_rebound_safely_are_not_cached():
+    cache = PlanTemplateCache()
+    shared_value = parsed(department="Sales", company="Sales")
+    cache.promote(shared_value, PLAN)
+    assert cache.lookup(shared_value) is None
+    dated = [{**PLAN[0], "params": {"department": "Sales", "start_date": "2024-01-01"}}]
+    cache.promote(parsed(department="Sales"), dated)
+    assert cache.lookup(parsed(department="HR")) is None
+
+
+def test_filters_the_llm_added_on_its_own_are_not_frozen_into_templates():
+    cache = PlanTemplateCache()
+    defaulted = [{**PLAN[0], "params": {"department": "Sales", "participant_type": "employee"}}]
+    cache.promote(parsed(department="Sales"), defaulted)
+    assert cache.lookup(parsed(department="HR")) is None
+    # Filters the parse left open are fine, as are free-text params like a step's context
+    open_filter = [{**PLAN[0], "params": {"department": "Sales", "participant_type": None}}, PLAN[1]]
+    cache.promote(parsed(department="Sales"), open_filter)
+    assert cache.lookup(parsed(department="HR"))[0]["params"] == {"department": "HR", "participant_type": None}
+
+
+def test_promotion_threshold_and_demotion():
+    cache = PlanTemplateCache(promote_after=2)
+    query = parsed(department="Sales", security_type="RSU")
+    cache.promote(query, PLAN)
+    assert cache.lookup(query) is None
+    cache.promote(query, PLAN)
+    assert cache.lookup(query) is not None
+    cache.demote(query)
+    assert cache.lookup(query) is None
+
+
+def test_streamed_plan_hits_skip_the_llm_and_are_traced():
+    backend = FakeLLMBackend(latency=0.0)
+    planner = LLMWorkflowPlanner(LLMClient(backend), plan_cache=PlanTemplateCache())
+    planner.record_outcome(parsed(department="Sales", security_type="RSU"), PLAN, succeeded=True)
+    tracer = Tracer()
+
+    async def main():
+        with tracer.trace("request"):
+            return [step async for step in planner.plan_workflow_stream(parsed(department="HR", security_type="ISO"))]
+
+    steps = asyncio.run(main())
+    assert backend.calls == 0
+    assert steps[0]["params"] == {"department": "HR", "security_type": "ISO"}
+    assert tracer.counters[("cache_lookups", (("cache", "plan_template"), ("result", "hit")))] == 1
+    assert tracer.latency_summary()["stage"]["plan"]["count"] == 1
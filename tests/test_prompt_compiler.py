@@ -0,0 +1,95 @@
+"""ConfigStore, PromptTemplate and PromptCompiler: stable prefixes and pruned context"""
+
+import json
+import os
+
+import pytest
+
+from caches import ConfigStore
+from prompts import DEFAULT_PROMPT_KNOWLEDGE_PATH, PromptCompiler, PromptTemplate
+
+KNOWLEDGE = {
+    "tables": {
+        "participants": {"description": "plan participants", "keywords": ["employee", "officer"]},
+        "companies": {"description": "portfolio companies", "keywords": ["company", "revenue"]},
+    },
+    "definitions": [{"term": "underwater", "definition": "exercise_price above share_price",
+                     "keywords": ["underwater"]}],
+    "examples": [{"query": "Show officers with RSUs", "parsed": {"entities": {"target": "participants"}}}],
+}
+TEMPLATE = PromptTemplate(
+    "test", static="You know {{braces}} and {facts}.", dynamic="Context:\n{context}\nQuery: {query}",
+    facts="equity",
+)
+
+
+def write(path, knowledge):
+    path.write_text(json.dumps(knowledge))
+    return str(path)
+
+
+def test_config_store_rereads_only_changed_files(tmp_path):
+    store = ConfigStore()
+    path = write(tmp_path / "k.json", {"version": 1})
+    first = store.load(path)
+    assert store.load(path) is first and store.stats == {"hits": 1, "loads": 1}
+    write(tmp_path / "k.json", {"version": 22})
+    assert store.load(path) == {"version": 22} and store.stats["loads"] == 2
+
+
+def test_config_store_runs_the_validator_and_keeps_nothing_bad(tmp_path):
+    store = ConfigStore()
+    path = write(tmp_path / "k.json", {"tables": {"payroll": {}}})
+    with pytest.raises(ValueError, match="payroll"):
+        store.load(path, PromptCompiler.validate_knowledge)
+    with pytest.raises(OSError):
+        store.load(str(tmp_path / "missing.json"))
+
+
+def test_template_prefix_is_formatted_once_and_slots_are_required():
+    assert TEMPLATE.prefix == "You know {braces} and equity."
+    assert TEMPLATE.slots == {"context", "query"}
+    messages = TEMPLATE.render(context="-", query="q1")
+    assert messages[0] == {"role": "system", "content": TEMPLATE.prefix}
+    assert TEMPLATE.render(context="-", query="q2")[0] == messages[0]
+    with pytest.raises(KeyError):
+        TEMPLATE.render(query="q")
+
+
+def test_context_holds_only_what_the_query_mentions(tmp_path):
+    compiler = PromptCompiler(write(tmp_path / "k.json", KNOWLEDGE))
+    context = compiler.relevant_context("Which officers hold underwater options?")
+    assert context.splitlines()[0].startswith("- table participants(participant_id, name,")
+    assert "underwater: exercise_price above share_price" in context
+    assert "companies" not in context
+    assert compiler.relevant_context("weather forecast") == PromptCompiler.NO_CONTEXT
+
+
+def test_context_respects_the_token_budget(tmp_path):
+    path = write(tmp_path / "k.json", KNOWLEDGE)
+    full = PromptCompiler(path).relevant_context("officers underwater company revenue")
+    tight = PromptCompiler(path, context_token_budget=30).relevant_context("officers underwater company revenue")
+    assert len(tight.splitlines()) < len(full.splitlines())
+
+
+def test_knowledge_edits_apply_without_a_restart(tmp_path):
+    path = write(tmp_path / "k.json", KNOWLEDGE)
+    compiler = PromptCompiler(path)
+    assert "clawback" not in compiler.relevant_context("clawback terms")
+    edited = {**KNOWLEDGE, "definitions": [{"term": "clawback", "definition": "recovery of awards"}]}
+    write(tmp_path / "k.json", edited)
+    os.utime(path, ns=(0, 10 ** 18))  # Make sure the mtime moves even on coarse clocks
+    assert "clawback: recovery of awards" in compiler.relevant_context("clawback terms")
+
+
+def test_missing_or_invalid_knowledge_degrades_to_no_context(tmp_path):
+    missing = PromptCompiler(str(tmp_path / "missing.json"))
+    assert missing.relevant_context("officers") == PromptCompiler.NO_CONTEXT
+    invalid = PromptCompiler(write(tmp_path / "k.json", {"examples": [{"query": "no parse"}]}))
+    messages = invalid.render(TEMPLATE, context_query="officers", query="officers")
+    assert PromptCompiler.NO_CONTEXT in messages[1]["content"]
+
+
+def test_shipped_knowledge_file_is_valid():
+    with open(DEFAULT_PROMPT_KNOWLEDGE_PATH) as f:
+        PromptCompiler.validate_knowledge(json.load(f))
@@ -0,0 +1,125 @@
+"""VersionedResultCache invalidation on writes, and the digest-keyed synthesis cache"""
+
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from agent import LLMResultSynthesizer
+from caches import LRUTTLCache
+from columnar import ColumnarResultSet
+from llm_client import FakeLLMBackend, LLMClient
+from sql_engine import EQUITY_SCHEMA, EquityQueryBuilder, SQLExecutionEngine, VersionedResultCache
+
+PARTICIPANTS_SQL, PARTICIPANTS_PARAMS = EquityQueryBuilder.participants({"department": "Sales"})
+SYNTHESIS = {"executive_summary": "Two Sales participants.", "key_findings": ["a"], "confidence_level": "high"}
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+    yield engine
+    engine.close()
+
+
+def query(cache, sql=PARTICIPANTS_SQL, params=PARTICIPANTS_PARAMS, columnar=False):
+    return asyncio.run(cache.execute(sql, params, columnar=columnar))
+
+
+def write(db_path, sql):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute(sql)
+
+
+def test_repeat_queries_are_served_from_the_cache(engine):
+    cache = VersionedResultCache(engine)
+    first = query(cache)
+    first[0]["name"] = "edited by a caller"
+    second = query(cache)
+    assert cache.entries.stats["hits"] == 1 and engine.stats["queries"] == 3  # Two version reads, one query
+    assert second[0]["name"] != "edited by a caller"
+    assert cache.tables(PARTICIPANTS_SQL) == ("companies", "participants")
+
+
+def test_a_write_to_a_read_table_invalidates(engine, db_path):
+    cache = VersionedResultCache(engine)
+    query(cache)
+    write(db_path, "UPDATE participants SET name = 'Renamed' WHERE department = 'Sales'")
+    assert {row["name"] for row in query(cache)} == {"Renamed"}
+    assert cache.entries.stats["hits"] == 0
+
+
+def test_writes_to_other_tables_keep_the_entry(engine, db_path):
+    cache = VersionedResultCache(engine)
+    query(cache)
+    write(db_path, "UPDATE equity_awards SET quantity = quantity + 1")
+    query(cache)
+    assert cache.entries.stats["hits"] == 1
+
+
+def test_columnar_and_row_results_are_cached_separately(engine):
+    cache = VersionedResultCache(engine)
+    rows = query(cache)
+    columnar = query(cache, columnar=True)
+    assert isinstance(columnar, ColumnarResultSet) and columnar.to_dicts() == rows
+    assert query(cache, columnar=True) is columnar
+
+
+def test_databases_without_version_tracking_are_never_cached(tmp_path):
+    path = str(tmp_path / "plain.db")
+    with sqlite3.connect(path) as connection:
+        connection.executescript(EQUITY_SCHEMA)
+    engine = SQLExecutionEngine(path, pool_size=1)
+    try:
+        cache = VersionedResultCache(engine)
+        query(cache)
+        query(cache)
+    finally:
+        engine.close()
+    assert cache.stats["bypassed"] == 2 and len(cache.entries) == 0
+
+
+def synthesizer():
+    backend = FakeLLMBackend(lambda model, messages: json.dumps(SYNTHESIS), latency=0.0)
+    return LLMResultSynthesizer(LLMClient(backend), cache=LRUTTLCache(16, 60.0)), backend
+
+
+def test_identical_digests_reuse_the_synthesis():
+    results = {1: [{"participant_id": "EMP001", "department": "Sales"}]}
+    synth, backend = synthesizer()
+    first = asyncio.run(synth.synthesize_results("Sales people", results, {"total_steps": 1}))
+    first["generated_email"] = {"subject": "x"}
+    again = asyncio.run(synth.synthesize_results(" Sales people ", results, {"total_steps": 1, "duration_seconds": 9}))
+    assert backend.calls == 1 and again == SYNTHESIS
+    asyncio.run(synth.synthesize_results("Sales people", {1: results[1] * 2}, {"total_steps": 1}))
+    assert backend.calls == 2
+
+
+def test_streamed_syntheses_fill_the_same_cache():
+    results = {1: [{"participant_id": "EMP001"}]}
+    synth, backend = synthesizer()
+
+    async def stream():
+        return dict([item async for item in synth.synthesize_results_stream("q", results, {"total_steps": 1})])
+
+    assert asyncio.run(stream()) == SYNTHESIS
+    assert asyncio.run(stream()) == SYNTHESIS
+    assert asyncio.run(synth.synthesize_results("q", results, {"total_steps": 1})) == SYNTHESIS
+    assert backend.calls == 1
+
+
+def test_repeat_requests_skip_the_database_and_the_llm(make_agent, db_path):
+    agent = make_agent()
+    query_text = "How many Sales employees received grants last month?"
+    first = asyncio.run(agent.process_query(query_text, "user123"))
+    second = asyncio.run(agent.process_query(query_text, "user123"))
+    assert first["llm_calls_made"] > 0 and second["llm_calls_made"] == 0
+    assert second["raw_data"] == first["raw_data"]
+    stats = agent.cache_stats()
+    assert stats["step_results"]["hits"] == 1 and stats["synthesis"]["hits"] == 1
+
+    write(db_path, "UPDATE participants SET name = 'Renamed' WHERE department = 'Sales'")
+    third = asyncio.run(agent.process_query(query_text, "user123"))
+    assert agent.cache_stats()["step_results"]["misses"] == 2
+    assert third["raw_data"] != first["raw_data"]
@@ -0,0 +1,53 @@
+"""ResultDigester: bounded, pre-aggregated summaries of workflow results"""
+
+import random
+
+from columnar import ColumnarResultSet
+from result_digests import ResultDigester
+
+
+def grant_rows(count, seed=3):
+    rng = random.Random(seed)
+    return [{"grant_id": index, "department": rng.choice(["Sales", "HR", "Engineering"]),
+             "award_type": rng.choice(["RSU", "NQO"]), "quantity": rng.randrange(100, 5000),
+             "grant_date": f"2024-{rng.randint(1, 12):02d}-15", "name": f"P{index}"}
+            for index in range(count)]
+
+
+def test_rows_become_counts_groups_ranges_and_top_examples():
+    rows = grant_rows(200)
+    digest = ResultDigester().digest({1: rows})["1"]
+    assert digest["row_count"] == 200
+    assert sum(digest["group_counts"]["department"].values()) == 200
+    quantities = [row["quantity"] for row in rows]
+    assert digest["numeric"]["quantity"] == {"sum": sum(quantities), "min": min(quantities), "max": max(quantities)}
+    assert "grant_id" not in digest.get("numeric", {})
+    assert digest["date_ranges"]["grant_date"]["min"] == min(row["grant_date"] for row in rows)
+    assert [example["quantity"] for example in digest["examples"]] == sorted(quantities, reverse=True)[:5]
+
+
+def test_digest_size_does_not_grow_with_row_count():
+    digester = ResultDigester(token_budget=400)
+    small = digester.estimate_tokens(digester.digest({1: grant_rows(50)}))
+    large = digester.estimate_tokens(digester.digest({1: grant_rows(50000)}))
+    assert large <= 400 and large < small * 1.5
+
+
+def test_detail_is_shed_until_the_budget_fits():
+    workflow_results = {step: grant_rows(100, seed=step) for step in range(1, 6)}
+    digest = ResultDigester(token_budget=150).digest(workflow_results)
+    assert all(set(step_digest) <= {"row_count", "numeric"} for step_digest in digest.values())
+    assert digest["3"]["row_count"] == 100
+
+
+def test_columnar_digest_matches_the_row_digest():
+    rows = grant_rows(500)
+    digester = ResultDigester()
+    assert digester.digest({1: ColumnarResultSet.from_rows(rows)}) == digester.digest({1: rows})
+
+
+def test_non_row_outputs_pass_through_compactly():
+    digest = ResultDigester().digest({1: {"start_date": "2024-01-01"}, 2: list(range(100)), 3: "x" * 500})
+    assert digest["1"] == {"start_date": "2024-01-01"}
+    assert digest["2"] == {"item_count": 100, "examples": [0, 1, 2, 3, 4]}
+    assert len(digest["3"]) == 201
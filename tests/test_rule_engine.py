@@ -0,0 +1,78 @@
+"""EquityRuleEngine: compiled rules from config/equity_rules.json and LLM escalation"""
+
+import asyncio
+
+import pytest
+
+from agent import LLMBusinessValidator
+from llm_client import FakeLLMBackend, LLMClient
+from rule_engine import EquityRuleEngine
+
+QUERY_PLAN = [{"step_id": 1, "tool": "query_participants", "params": {}, "dependencies": []}]
+KNOWN_TOOLS = ["calculate_date_range", "query_participants", "query_companies", "query_grants",
+               "generate_email", "create_report", "send_notification"]
+
+
+def parsed(security_type=None, participant_type=None, action="query", confidence=0.9):
+    filters = {"security_type": security_type, "participant_type": participant_type}
+    return {"entities": {"target": "participants", "filters": filters},
+            "intent": {"primary_action": action}, "confidence": confidence}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return EquityRuleEngine.from_file(known_tools=KNOWN_TOOLS)
+
+
+def test_exercising_rsus_is_an_error(engine):
+    result = engine.evaluate(parsed("RSU"), QUERY_PLAN, "Exercise all RSUs for Sales")
+    assert not result["is_valid"]
+    assert "rsus_cannot_be_exercised" in result["rules_fired"]
+    assert result["source"] == "rule_engine" and not result["needs_llm_review"]
+
+
+def test_exercising_options_is_fine(engine):
+    result = engine.evaluate(parsed("NQO"), QUERY_PLAN, "Which participants can exercise their options?")
+    assert result["is_valid"] and result["rules_fired"] == []
+
+
+def test_longest_term_wins_when_matching_facts(engine):
+    facts, _ = engine.extract_facts(parsed(), QUERY_PLAN, "restricted stock units granted to officers")
+    assert "RSU" in facts["security_types"] and "RESTRICTED_STOCK" not in facts["security_types"]
+    assert "officer" in facts["participant_types"]
+
+
+def test_insiders_and_long_vesting_are_warnings(engine):
+    result = engine.evaluate(parsed("RSU", "officer"), QUERY_PLAN, "Officers with a 6-year vest")
+    assert result["is_valid"]
+    assert {"insider_compliance", "vesting_term_range"} <= set(result["rules_fired"])
+
+
+def test_plan_structure_is_checked(engine):
+    plan = [{"step_id": 1, "tool": "drop_tables", "params": {}, "dependencies": [2]}]
+    result = engine.evaluate(parsed(), plan, "Show participants")
+    assert not result["is_valid"] and len(result["errors"]) == 2
+
+
+def test_notifications_need_a_recipient_query(engine):
+    plan = [{"step_id": 1, "tool": "send_notification", "params": {}, "dependencies": []}]
+    result = engine.evaluate(parsed(action="send"), plan, "Send everyone a note")
+    assert "notification_needs_recipients" in result["rules_fired"]
+
+
+def test_unknown_terms_lower_coverage_and_request_review(engine):
+    result = engine.evaluate(parsed("phantom units", confidence=0.4), QUERY_PLAN, "clawback for phantom units")
+    assert result["needs_llm_review"]
+    assert result["coverage"] <= 0.4 and len(result["ambiguities"]) == 3
+
+
+def test_invalid_conditions_are_rejected_at_compile_time():
+    with pytest.raises(ValueError):
+        EquityRuleEngine({"rules": [{"id": "x", "when": {"fact": "actions", "is": ["send"]}}]})
+
+
+def test_validator_answers_covered_queries_without_the_llm():
+    backend = FakeLLMBackend(latency=0.0)
+    validator = LLMBusinessValidator(LLMClient(backend))
+    result = asyncio.run(validator.validate_query_logic(parsed("RSU"), QUERY_PLAN, "Exercise my RSUs"))
+    assert not result["is_valid"] and backend.calls == 0
@@ -0,0 +1,114 @@
+"""Speculative execution: read-only steps overlap validation, side effects wait for it"""
+
+import asyncio
+
+import pytest
+
+PLAN = [
+    {"step_id": 1, "tool": "query_participants", "params": {}, "dependencies": []},
+    {"step_id": 2, "tool": "send_notification", "params": {}, "dependencies": [1]},
+]
+
+
+class SlowValidator:
+    def __init__(self, is_valid, events):
+        self.is_valid = is_valid
+        self.events = events
+
+    async def validate_query_logic(self, parsed_query, planned_workflow, user_query=""):
+        await asyncio.sleep(0.05)
+        self.events.append("validated")
+        return {"is_valid": self.is_valid, "errors": [] if self.is_valid else ["bad"], "warnings": []}
+
+
+def instrumented(make_agent, is_valid, **config):
+    events = []
+    agent = make_agent(**config)
+    agent.business_validator = SlowValidator(is_valid, events)
+
+    async def query(params, context):
+        events.append("query started")
+        await asyncio.sleep(0.02)
+        return [{"participant_id": "EMP001"}]
+
+    agent.workflow_executor.tools.update(
+        query_participants=query,
+        send_notification=lambda params, context: events.append("sent") or {"status": "sent"},
+    )
+    return agent, events
+
+
+def run(agent):
+    return asyncio.run(agent._validate_and_execute("q", {}, PLAN, "user123"))
+
+
+def test_read_only_steps_start_during_validation(make_agent):
+    agent, events = instrumented(make_agent, True, speculative_execution=True)
+    validation, results = run(agent)
+    assert events == ["query started", "validated", "sent"]
+    assert validation["is_valid"] and results[2] == {"status": "sent"}
+
+
+def test_failed_validation_blocks_side_effects(make_agent):
+    agent, events = instrumented(make_agent, False, speculative_execution=True)
+    validation, results = run(agent)
+    assert results is None and not validation["is_valid"]
+    assert "sent" not in events
+
+
+def test_without_speculation_nothing_runs_before_validation(make_agent):
+    agent, events = instrumented(make_agent, True, speculative_execution=False)
+    run(agent)
+    assert events == ["validated", "query started", "sent"]
+
+
+def test_a_rejected_plan_discards_results_the_speculation_already_has(make_agent):
+    agent, events = instrumented(make_agent, False, speculative_execution=True)
+    result = asyncio.run(agent.process_query("Which Sales participants hold RSUs?", "user123"))
+    assert events == ["query started", "validated"]
+    assert result == {"status": "error", "errors": ["bad"]}
+
+
+def test_a_failing_validator_cancels_the_speculation(make_agent):
+    agent, events = instrumented(make_agent, True, speculative_execution=True)
+
+    async def broken(parsed_query, planned_workflow, user_query=""):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("validator down")
+
+    agent.business_validator.validate_query_logic = broken
+    with pytest.raises(RuntimeError):
+        run(agent)
+    assert events == ["query started"]
+
+
+def test_no_side_effecting_tool_fires_before_the_gate(make_agent):
+    agent, events = instrumented(make_agent, False, speculative_execution=True)
+    executor = agent.workflow_executor
+    side_effects = sorted(set(executor.tools) - executor.read_only_tools)
+    assert "send_notification" in side_effects and "generate_email" in side_effects
+    for tool in side_effects:
+        executor.tools[tool] = lambda params, context, tool=tool: events.append(tool)
+    # Independent steps: nothing but the gate stands between them and the executor
+    plan = [{"step_id": index, "tool": tool, "params": {}, "dependencies": []}
+            for index, tool in enumerate(side_effects, start=1)]
+    validation, results = asyncio.run(agent._validate_and_execute("q", {}, plan, "user123"))
+    assert results is None and events == ["validated"]
+
+
+def test_streamed_results_of_a_rejected_plan_are_never_sent(make_agent):
+    agent, events = instrumented(make_agent, False)
+
+    async def plan_stream(parsed_query):
+        for step in PLAN:
+            yield step
+
+    agent.workflow_planner.plan_workflow_stream = plan_stream
+
+    async def main():
+        return [event async for event in agent.process_query_stream("Which Sales participants hold RSUs?", "user123")]
+
+    streamed = asyncio.run(main())
+    assert "query started" in events and "sent" not in events
+    assert "step_result" not in [event["event"] for event in streamed]
+    assert streamed[-1]["event"] == "error"
@@ -0,0 +1,91 @@
+"""SQLExecutionEngine and EquityQueryBuilder against a seeded sqlite file"""
+
+import asyncio
+
+import pytest
+
+from sql_engine import EquityQueryBuilder, SQLExecutionEngine, SQLQueryTimeout
+
+COUNTER = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000)"
+           " SELECT count(*) AS total FROM n")
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=2)
+    yield engine
+    engine.close()
+
+
+def run(engine, builder, filters):
+    sql, params = builder(filters)
+    return asyncio.run(engine.execute(sql, params))
+
+
+def test_filters_are_bound_parameters_and_case_insensitive(engine):
+    sql, params = EquityQueryBuilder.participants({"department": "sales", "security_type": "PSUs"})
+    assert "sales" not in sql and params == ["sales", "PSU"]
+    rows = asyncio.run(engine.execute(sql, params))
+    assert rows and {row["department"] for row in rows} == {"Sales"}
+
+
+def test_placeholder_values_do_not_become_predicates(engine):
+    everyone = run(engine, EquityQueryBuilder.participants, {})
+    for placeholder in ("N/A", " If Mentioned ", "none", "ALL", ""):
+        assert run(engine, EquityQueryBuilder.participants, {"department": placeholder}) == everyone
+    sql, params = EquityQueryBuilder.participants({"department": ["Sales", "not specified", None, " HR "]})
+    assert params == ["Sales", "HR"] and "p.department IN (?, ?)" in sql
+
+
+def test_options_expand_to_both_option_types():
+    assert EquityQueryBuilder.award_types({"security_type": "stock options"}) == ["NQO", "ISO"]
+    assert EquityQueryBuilder.award_types({"award_type": ["PSUs", "n/a", "RSU"]}) == ["PSU", "RSU"]
+
+
+def test_grant_windows_bound_the_grant_date(engine):
+    rows = run(engine, EquityQueryBuilder.grants, {"start_date": "2024-01-01", "end_date": "2024-12-31"})
+    assert all("2024-01-01" <= row["grant_date"] <= "2024-12-31" for row in rows)
+
+
+def test_constant_literals_run_and_values_stay_bound(engine):
+    sql = "SELECT participant_id FROM participants WHERE status = 'Active' AND name LIKE '%chen%' AND department = ?"
+    assert asyncio.run(engine.execute(sql, ["Sales"])) == [{"participant_id": "EMP003"}]
+    with pytest.raises(AssertionError):
+        asyncio.run(engine.execute(sql))
+
+
+def test_max_rows_truncates_and_is_counted(engine):
+    rows = asyncio.run(engine.execute("SELECT * FROM participants", max_rows=3))
+    assert len(rows) == 3 and engine.stats["truncated"] == 1
+
+
+def test_slow_queries_are_interrupted_and_the_connection_reused(engine):
+    with pytest.raises(SQLQueryTimeout):
+        asyncio.run(engine.execute(COUNTER, timeout=0.05))
+    assert engine.stats["timeouts"] == 1
+    assert asyncio.run(engine.execute("SELECT count(*) AS total FROM participants")) == [{"total": 9}]
+
+
+def test_pool_waits_are_bounded_by_the_timeout(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+
+    async def main():
+        async with engine._connection(1.0):
+            with pytest.raises(SQLQueryTimeout):
+                await engine.execute("SELECT 1", timeout=0.05)
+        # Queued queries share the single connection in turn
+        return await asyncio.gather(*(engine.execute("SELECT ? AS n", [n]) for n in range(4)))
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        engine.close()
+    assert [rows[0]["n"] for rows in results] == [0, 1, 2, 3]
+    assert engine.stats["pool_waits"] >= 2
+
+
+def test_stream_yields_bounded_batches(engine):
+    async def main():
+        return [len(batch) async for batch in engine.stream("SELECT * FROM participants", batch_size=4)]
+
+    assert asyncio.run(main()) == [4, 4, 1]
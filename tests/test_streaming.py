@@ -0,0 +1,155 @@
+"""LLMClient.stream_chat: bounded reads, semaphore release, incremental JSON"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from llm_client import (
+    FakeLLMBackend, IncrementalJSONParser, LLMClient, LLMDeadlineExceeded, TransientLLMError, llm_deadline,
+)
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class StallingBackend:
+    """Sends one delta, then goes quiet"""
+
+    def __init__(self, stall=10.0):
+        self.stall = stall
+        self.closed = False
+
+    async def stream(self, model, messages, temperature, max_tokens, timeout):
+        try:
+            yield "first"
+            await asyncio.sleep(self.stall)
+            yield "never"
+        finally:
+            self.closed = True
+
+
+def collect(client, **kwargs):
+    async def main():
+        return [delta async for delta in client.stream_chat("gpt-4", MESSAGES, **kwargs)]
+    return asyncio.run(main())
+
+
+async def drain(stream):
+    return "".join([delta async for delta in stream])
+
+
+def test_stream_yields_the_full_completion_and_counts_tokens():
+    client = LLMClient(FakeLLMBackend(lambda model, messages: "x" * 70, latency=0.0))
+    deltas = collect(client)
+    assert "".join(deltas) == "x" * 70 and len(deltas) == 5
+    assert client.stats["completion_tokens"] > 0
+
+
+def test_a_stalled_stream_times_out_after_the_first_delta():
+    backend = StallingBackend()
+    client = LLMClient(backend, request_timeout=0.05)
+    started = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded, match="stalled"):
+        collect(client)
+    assert time.monotonic() - started < 1.0
+    assert backend.closed and client.stats["retries"] == 0
+
+
+def test_a_stalled_stream_respects_the_request_deadline():
+    client = LLMClient(StallingBackend(), request_timeout=30.0)
+
+    async def main():
+        with llm_deadline(0.05):
+            return [delta async for delta in client.stream_chat("gpt-4", MESSAGES)]
+
+    started = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(main())
+    assert time.monotonic() - started < 1.0
+
+
+def test_a_slow_consumer_does_not_hold_the_model_semaphore():
+    backend = FakeLLMBackend(lambda model, messages: "y" * 64, latency=0.0)
+    client = LLMClient(backend, max_concurrency_per_model=1)
+
+    async def main():
+        slow = client.stream_chat("gpt-4", MESSAGES)
+        await slow.__anext__()
+        # The first stream is parked mid-read; a second one on the same model still completes
+        other = await asyncio.wait_for(
+            asyncio.ensure_future(drain(client.stream_chat("gpt-4", MESSAGES))), 1.0)
+        rest = await drain(slow)
+        return other, rest
+
+    other, rest = asyncio.run(main())
+    assert other == "y" * 64 and len(rest) == 48
+
+
+def test_abandoning_a_stream_cancels_the_upstream_read():
+    backend = StallingBackend(stall=0.5)
+    client = LLMClient(backend)
+
+    async def main():
+        stream = client.stream_chat("gpt-4", MESSAGES)
+        assert await stream.__anext__() == "first"
+        await stream.aclose()
+
+    started = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - started < 0.4 and backend.closed
+
+
+class FlakyStream:
+    """An upstream stream whose first read fails; records whether it was closed"""
+
+    def __init__(self, fail):
+        self.fail = fail
+        self.closed = False
+        self.deltas = ["ok"]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.fail:
+            raise TransientLLMError("connection reset")
+        if not self.deltas:
+            raise StopAsyncIteration
+        return self.deltas.pop()
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_a_failed_attempt_is_closed_before_the_retry():
+    attempts = []
+
+    class RetryingBackend:
+        def stream(self, model, messages, temperature, max_tokens, timeout):
+            attempts.append(FlakyStream(fail=not attempts))
+            # The retry must not open while the failed stream is still holding its connection
+            assert all(attempt.closed for attempt in attempts[:-1])
+            return attempts[-1]
+
+    client = LLMClient(RetryingBackend(), base_backoff=0.001)
+    assert collect(client) == ["ok"]
+    assert len(attempts) == 2 and all(attempt.closed for attempt in attempts)
+
+
+def test_incremental_parser_emits_members_as_they_complete():
+    document = "```json\n" + json.dumps([{"step_id": 1, "note": "a \"}\" b"}, {"step_id": 2}]) + "\n```"
+    parser = IncrementalJSONParser()
+    emitted = []
+    for start in range(0, len(document), 7):
+        emitted.append(parser.feed(document[start:start + 7]))
+    members = [member for batch in emitted for member in batch]
+    assert members == [(0, {"step_id": 1, "note": "a \"}\" b"}), (1, {"step_id": 2})]
+    assert parser.done
+    assert [index for index, batch in enumerate(emitted) if batch][0] < len(emitted) - 2
+
+
+def test_incremental_parser_reports_object_members_by_key():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"entities": {"target": "grants"}, "conf') == [("entities", {"target": "grants"})]
+    assert parser.feed('idence": 0.9}') == [("confidence", 0.9)]
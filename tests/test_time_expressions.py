@@ -0,0 +1,94 @@
+"""TimeExpressionEngine: grammar-based time phrases resolved against a fixed date"""
+
+from datetime import date
+
+import pytest
+
+from time_expressions import TimeExpressionEngine
+
+TODAY = date(2024, 5, 15)  # A Wednesday in calendar Q2
+
+
+@pytest.fixture(scope="module")
+def calendar():
+    return TimeExpressionEngine()
+
+
+@pytest.fixture(scope="module")
+def fiscal():
+    # Fiscal year 2024 runs 2023-07-01 .. 2024-06-30
+    return TimeExpressionEngine(fiscal_year_start_month=7)
+
+
+@pytest.mark.parametrize("phrase, expected", [
+    ("this quarter", ("2024-04-01", "2024-06-30")),
+    ("last month", ("2024-04-01", "2024-04-30")),
+    ("next week", ("2024-05-20", "2024-05-26")),
+    ("last 30 days", ("2024-04-15", "2024-05-15")),
+    ("over the next two weeks", ("2024-05-15", "2024-05-29")),
+    ("in the past 3 months", ("2024-02-15", "2024-05-15")),
+    ("Q1 2023", ("2023-01-01", "2023-03-31")),
+    ("third quarter of 2023", ("2023-07-01", "2023-09-30")),
+    ("FY23", ("2023-01-01", "2023-12-31")),
+    ("2023 fiscal year", ("2023-01-01", "2023-12-31")),
+    ("in March 2023", ("2023-03-01", "2023-03-31")),
+    ("during feb", ("2024-02-01", "2024-02-29")),
+    ("for 2022", ("2022-01-01", "2022-12-31")),
+    ("year to date", ("2024-01-01", "2024-05-15")),
+    ("QTD", ("2024-04-01", "2024-05-15")),
+    ("between 2024-03-01 and 2024-01-01", ("2024-01-01", "2024-03-01")),
+    ("since 2024-01-31", ("2024-01-31", "2024-05-15")),
+    ("yesterday", ("2024-05-14", "2024-05-14")),
+    ("upcoming", ("2024-05-15", "2024-08-13")),
+])
+def test_calendar_phrases(calendar, phrase, expected):
+    assert calendar.date_range(phrase, TODAY) == {"start_date": expected[0], "end_date": expected[1]}
+
+
+def test_fiscal_calendar_shifts_quarters_and_years(fiscal):
+    assert fiscal.resolve("this fiscal year", TODAY) == (date(2023, 7, 1), date(2024, 6, 30))
+    assert fiscal.resolve("next fiscal quarter", TODAY) == (date(2024, 7, 1), date(2024, 9, 30))
+    assert fiscal.resolve("Q1 FY2024", TODAY) == (date(2023, 7, 1), date(2023, 9, 30))
+    assert fiscal.fiscal_year_of(date(2024, 7, 1)) == 2025
+
+
+def test_relative_years_and_to_date_periods_share_the_fiscal_calendar(fiscal):
+    this_year = fiscal.resolve("this year", TODAY)
+    assert this_year == fiscal.resolve("this fiscal year", TODAY) == (date(2023, 7, 1), date(2024, 6, 30))
+    assert fiscal.resolve("last year", TODAY) == (date(2022, 7, 1), date(2023, 6, 30))
+    assert fiscal.resolve("YTD", TODAY) == (this_year[0], TODAY)
+    # Every quarter-to-date window falls inside the year-to-date window
+    assert fiscal.resolve("QTD", TODAY)[0] >= fiscal.resolve("YTD", TODAY)[0]
+    # Explicit calendar years are still calendar years
+    assert fiscal.resolve("in 2023", TODAY) == (date(2023, 1, 1), date(2023, 12, 31))
+
+
+def test_invalid_fiscal_start_month_is_rejected():
+    with pytest.raises(ValueError):
+        TimeExpressionEngine(fiscal_year_start_month=13)
+
+
+def test_unrecognized_and_impossible_dates_resolve_to_none(calendar):
+    assert calendar.resolve("whenever convenient", TODAY) is None
+    assert calendar.resolve("since 2024-02-30", TODAY) is None
+
+
+def test_phrases_are_found_stripped_and_substituted_inside_queries(calendar):
+    text = "Show RSU grants from last quarter vesting next month"
+    remaining, ranges = calendar.strip(text, TODAY)
+    assert remaining == "Show RSU grants from vesting"
+    assert [item["expression"] for item in ranges] == ["last quarter", "next month"]
+    assert calendar.substitute("Grants today", TODAY) == "Grants 2024-05-15"
+    assert calendar.substitute("Grants this month", TODAY) == "Grants 2024-05-01..2024-05-31"
+
+
+def test_words_that_merely_contain_a_phrase_do_not_match(calendar):
+    assert calendar.resolve("forecast for the quarterly todayish report", TODAY) is None
+
+
+def test_resolutions_are_memoized_per_reference_date():
+    engine = TimeExpressionEngine()
+    engine.resolve("this quarter", TODAY)
+    engine.resolve("this  quarter", TODAY)
+    assert len(engine._cache) == 1
+    assert engine.resolve("this quarter", date(2024, 8, 1)) == (date(2024, 7, 1), date(2024, 9, 30))
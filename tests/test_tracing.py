@@ -0,0 +1,102 @@
+"""Tracer: span trees, token and cache counters, latency percentiles and exports"""
+
+import asyncio
+import logging
+
+from tracing import _NOOP_SPAN, NullTracer, Tracer, _Span, trace_annotate, trace_cache, trace_span
+
+
+def llm_spans(span):
+    own = [span] if span["kind"] == "llm" else []
+    return own + [llm for child in span["children"] for llm in llm_spans(child)]
+
+
+def stage_names(trace):
+    return [child["name"] for child in trace["children"] if child["kind"] == "stage"]
+
+
+def test_spans_nest_under_the_request_and_record_errors():
+    tracer = Tracer()
+
+    async def failing():
+        with trace_span("execute"):
+            with trace_span("query_grants", kind="step", step_id=2):
+                raise ValueError("boom")
+
+    with tracer.trace("request", mode="staged"):
+        with trace_span("parse"):
+            trace_cache("parse", hit=True)
+            llm = trace_span(kind="llm", model="gpt-4")
+            llm.set(prompt_tokens=10, completion_tokens=4)
+            llm.end()
+        try:
+            asyncio.run(failing())
+        except ValueError:
+            pass
+
+    trace, = tracer.traces
+    parse, execute = trace["children"]
+    assert parse["attributes"] == {"parse_cache": "hit"}
+    assert (parse["children"][0]["kind"], parse["children"][0]["name"]) == ("llm", "parse")
+    assert execute["children"][0]["attributes"] == {"step_id": 2, "error": "ValueError"}
+    assert tracer.counters[("llm_tokens", (("stage", "parse"), ("type", "prompt")))] == 10
+    assert tracer.counters[("cache_lookups", (("cache", "parse"), ("result", "hit")))] == 1
+
+
+def test_hooks_are_no_ops_outside_a_traced_request():
+    assert trace_span("parse") is _NOOP_SPAN
+    trace_cache("parse", hit=False)
+    trace_annotate(anything=1)
+    null = NullTracer()
+    with null.trace("request"):
+        assert trace_span("parse") is _NOOP_SPAN
+    assert null.export_json() == {"enabled": False}
+
+
+def test_latency_percentiles_follow_the_rolling_window():
+    tracer = Tracer(window=10)
+    for duration in [1.0] * 90 + [0.01] * 10:
+        span = _Span(tracer, "plan", "stage", {})
+        span.duration = duration
+        tracer._record(span)
+    row = tracer.latency_summary()["stage"]["plan"]
+    assert row["count"] == 100 and row["p99_ms"] == 10.0
+    assert row["mean_ms"] == (90 * 1000.0 + 10 * 10.0) / 100
+
+
+def test_openmetrics_export_is_well_formed():
+    tracer = Tracer()
+    with tracer.trace("request"):
+        trace_cache('plan "template"', hit=False)
+    text = tracer.export_openmetrics()
+    assert text.endswith("# EOF\n")
+    assert 'equity_agent_span_duration_seconds_count{kind="request",name="request"} 1' in text
+    assert 'equity_agent_cache_lookups_total{cache="plan \\"template\\"",result="miss"} 1' in text
+
+
+def test_requests_report_their_own_calls_and_tokens(make_agent):
+    agent = make_agent(tracing=True, local_parse_threshold=None)
+
+    async def main():
+        return await asyncio.gather(*(agent.process_query(query, "user123") for query in (
+            "How many Sales employees received grants last month?", "Which directors hold ISOs?")))
+
+    responses = asyncio.run(main())
+    assert [response["status"] for response in responses] == ["success", "success"]
+    # Concurrent requests are charged only for their own LLM spans
+    assert sorted(response["llm_calls_made"] for response in responses) == sorted(
+        len(llm_spans(trace)) for trace in agent.tracer.traces)
+    llm_tokens = sum(value for (metric, _), value in agent.tracer.counters.items() if metric == "llm_tokens")
+    assert llm_tokens == sum(sum(response["token_usage"].values()) for response in responses)
+    trace = agent.tracer.traces[0]
+    assert stage_names(trace) == ["parse", "resolve_entities", "plan", "validate", "execute", "synthesize"]
+    assert trace["attributes"]["status"] == "success"
+
+
+def test_diagnostics_are_logged_lazily(make_agent, caplog):
+    agent = make_agent()
+    with caplog.at_level(logging.INFO, logger="agent"):
+        asyncio.run(agent.process_query("Which directors hold ISOs?", "user123"))
+    processing = next(record for record in caplog.records if record.msg.startswith("🚀 Processing"))
+    assert processing.args == ("Which directors hold ISOs?",)
+    assert processing.getMessage() == "🚀 Processing: 'Which directors hold ISOs?'"
@@ -0,0 +1,130 @@
+"""VestingSchedule parsing, batch event expansion and the date-indexed VestingCalendar"""
+
+import asyncio
+import sqlite3
+from datetime import date
+
+import pytest
+
+from columnar import ColumnarResultSet
+from sql_engine import SQLExecutionEngine
+from vesting import VestingCalendar, VestingSchedule, VestingScheduleError, expand_vesting_events
+
+GRANT_COLUMNS = VestingCalendar.GRANT_COLUMNS
+
+
+def grants(*rows):
+    """Grant rows given as (grant_id, grant_date, quantity, vesting_schedule)"""
+    full = [{"grant_id": grant_id, "participant_id": f"EMP{grant_id:03d}", "grant_date": granted,
+             "quantity": quantity, "vesting_schedule": schedule, "department": "Sales", "award_type": "RSU"}
+            for grant_id, granted, quantity, schedule in rows]
+    return ColumnarResultSet.from_tuples(list(GRANT_COLUMNS),
+                                            [tuple(row.get(name) for name in GRANT_COLUMNS) for row in full])
+
+
+@pytest.mark.parametrize("text, total, cliff, tranches", [
+    ("4-year vest", 48, 0, (12, 24, 36, 48)),
+    ("1-year cliff, 4-year vest", 48, 12, tuple(range(12, 49))),
+    ("4 years quarterly", 48, 0, tuple(range(3, 49, 3))),
+    ("3-year performance", 36, 0, (36,)),
+    ("18 months, semi-annual", 18, 0, (6, 12, 18)),
+    ("Fully vested at grant", 0, 0, (0,)),
+])
+def test_schedule_text_is_parsed_into_tranches(text, total, cliff, tranches):
+    schedule = VestingSchedule.parse(text)
+    assert (schedule.total_months, schedule.cliff_months, schedule.tranches) == (total, cliff, tranches)
+    assert VestingSchedule.parse(f"  {text.upper()} ") is schedule
+
+
+def test_parsed_schedules_are_cached_in_a_bounded_cache():
+    cache = VestingSchedule._parsed
+    for months in range(cache.max_entries + 50):
+        VestingSchedule.parse(f"{months + 1} months")
+    assert len(cache) == cache.max_entries
+
+
+def test_schedules_without_a_term_are_rejected():
+    with pytest.raises(VestingScheduleError):
+        VestingSchedule.parse("at the board's discretion")
+    with pytest.raises(VestingScheduleError):
+        VestingSchedule(12, cliff_months=24)
+
+
+def test_tranches_always_add_up_to_the_grant():
+    batches, unparsed = expand_vesting_events(grants(
+        (1, "2024-01-31", 1001, "1-year cliff, 4-year vest"),
+        (2, "2024-01-31", 7, "1-year cliff, 4-year vest"),
+        (3, "2024-02-15", 500, "mystery"),
+        (4, "not a date", 500, "4-year vest"),
+    ))
+    assert unparsed == [3, 4]
+    shares = {}
+    for _, _, _, grant_ids, tranche_shares in batches:
+        for grant_id, count in zip(grant_ids, tranche_shares):
+            shares.setdefault(grant_id, []).append(count)
+    assert sum(shares[1]) == 1001 and sum(shares[2]) == 7 and all(count >= 0 for count in shares[2])
+    # One batch per tranche for the two grants sharing a schedule and grant date
+    assert len(batches) == 37 and all(batch[3] == [1, 2] for batch in batches)
+    # Month-end grants vest on the last day of shorter months
+    assert date.fromordinal(batches[1][0]) == date(2025, 2, 28)
+
+
+def test_calendar_answers_windows_in_date_order():
+    calendar = VestingCalendar()
+    calendar.load(grants((1, "2023-02-15", 1000, "4-year vest"), (2, "2023-01-10", 300, "3-year performance")))
+    events = calendar.events("2024-01-01", "2026-12-31").to_dicts()
+    assert [(event["vest_date"], event["grant_id"], event["shares"]) for event in events] == [
+        ("2024-02-15", 1, 250), ("2025-02-15", 1, 250), ("2026-01-10", 2, 300), ("2026-02-15", 1, 250)]
+    assert events[0]["tranche"] == 1 and events[0]["tranches"] == 4
+    assert len(calendar.events("2030-01-01", "2030-12-31")) == 0
+
+
+def test_upsert_and_remove_only_touch_their_grants():
+    calendar = VestingCalendar()
+    calendar.load(grants((1, "2023-02-15", 1000, "4-year vest"), (2, "2023-03-01", 400, "4-year vest")))
+    calendar.upsert([{"grant_id": 1, "grant_date": "2023-02-15", "quantity": 1000,
+                      "vesting_schedule": "3-year performance"}])
+    calendar.remove([2])
+    assert [(event["grant_id"], event["vest_date"]) for event in calendar.events("2023-01-01", "2030-01-01")] == [
+        (1, "2026-02-15")]
+    assert calendar.stats["grants"] == 1 and calendar.stats["events"] == len(calendar) == 1
+
+
+def test_refresh_follows_database_writes(db_path):
+    engine = SQLExecutionEngine(db_path, pool_size=1)
+    calendar = VestingCalendar(engine)
+    try:
+        asyncio.run(calendar.refresh())
+        before = [event["grant_id"] for event in calendar.events("2024-01-01", "2024-12-31")]
+        with sqlite3.connect(db_path) as connection:
+            connection.execute("UPDATE equity_awards SET status = 'Forfeited' WHERE award_id = 1")
+        asyncio.run(calendar.refresh())
+        after = [event["grant_id"] for event in calendar.events("2024-01-01", "2024-12-31")]
+    finally:
+        engine.close()
+    assert before == [1, 2, 5, 6, 7] and after == [2, 5, 6, 7]
+    assert calendar.stats["refreshes"] == 2 and calendar.stats["removed"] == 1
+
+
+def test_vesting_tool_filters_the_window_for_the_caller(make_agent):
+    agent = make_agent()
+    context = {"user_id": "user123", "upstream": {1: {"start_date": "2024-01-01", "end_date": "2024-12-31"}}}
+    events = asyncio.run(agent._query_vesting_events_traditional({"security_type": "RSU"}, context))
+    assert events and all(event["award_type"] == "RSU" for event in events)
+    assert all("2024-01-01" <= event["vest_date"] <= "2024-12-31" for event in events)
+
+
+def test_restricted_callers_never_get_events_outside_their_scope(make_agent):
+    agent = make_agent()
+    window = {"start_date": "2000-01-01", "end_date": "2100-12-31"}
+
+    def events_for(user_id):
+        return asyncio.run(agent._query_vesting_events_traditional(window, {"user_id": user_id}))
+
+    everything, scoped = events_for("user123"), events_for("hrbp01")
+    visible = {row["participant_id"] for row in asyncio.run(
+        agent._query_participants_traditional({}, {"user_id": "hrbp01"}))}
+    assert scoped and len(scoped) < len(everything)
+    assert {event["participant_id"] for event in scoped} <= visible
+    assert all(event["department"] in ("HR", "Finance", "Engineering") and event["company_id"] == "C001"
+               and event["participant_type"] not in ("officer", "director") for event in scoped)
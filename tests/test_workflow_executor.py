@@ -0,0 +1,138 @@
+"""WorkflowDAGExecutor: scheduling, upstream binding, failures, gates and timeouts"""
+
+import asyncio
+import time
+
+import pytest
+
+from workflow import WorkflowDAGExecutor, WorkflowGraphError
+
+
+def step(step_id, tool, dependencies=(), **params):
+    return {"step_id": step_id, "tool": tool, "params": params, "dependencies": list(dependencies)}
+
+
+def sleeper(seconds, result=None):
+    async def tool(params, context):
+        await asyncio.sleep(seconds)
+        return result if result is not None else {"params": params}
+    return tool
+
+
+def test_independent_steps_run_concurrently():
+    executor = WorkflowDAGExecutor({"a": sleeper(0.1), "b": sleeper(0.1)})
+    started = time.perf_counter()
+    results = asyncio.run(executor.execute([step(1, "a"), step(2, "b")]))
+    assert time.perf_counter() - started < 0.18
+    assert set(results) == {1, 2}
+
+
+def test_results_follow_plan_order_and_dependencies_finish_first():
+    finished = []
+
+    def recording(name, seconds):
+        async def tool(params, context):
+            await asyncio.sleep(seconds)
+            finished.append(name)
+            return name
+        return tool
+
+    executor = WorkflowDAGExecutor({"slow": recording("slow", 0.05), "fast": recording("fast", 0.0)})
+    results = asyncio.run(executor.execute([step(2, "fast", [1]), step(1, "slow")]))
+    assert finished == ["slow", "fast"]
+    assert list(results) == [2, 1]
+
+
+def test_only_declared_inputs_are_bound_from_upstream():
+    seen = {}
+
+    def dates(params, context):
+        return {"start_date": "2024-01-01", "end_date": "2024-03-31", "status": "ok", "title": "x"}
+
+    def query(params, context):
+        seen.update(params=params, upstream=context["upstream"])
+        return []
+
+    executor = WorkflowDAGExecutor({"dates": dates, "query": query})
+    asyncio.run(executor.execute([step(1, "dates"), step(2, "query", [1], end_date="2024-02-01")]))
+    assert seen["params"] == {"start_date": "2024-01-01", "end_date": "2024-02-01"}
+    assert seen["upstream"][1]["status"] == "ok"  # Still visible to the tool through its context
+
+
+def test_failed_step_skips_its_dependents_only():
+    def boom(params, context):
+        raise RuntimeError("database down")
+
+    executor = WorkflowDAGExecutor({"boom": boom, "ok": lambda params, context: "done"})
+    results = asyncio.run(executor.execute([step(1, "boom"), step(2, "ok", [1]), step(3, "ok")]))
+    assert results[1] == {"status": "failed", "error": "database down"}
+    assert results[2]["status"] == "skipped"
+    assert results[3] == "done"
+
+
+@pytest.mark.parametrize("workflow", [
+    [step(1, "a", [2]), step(2, "a", [1])],
+    [step(1, "a", [9])],
+    [step(1, "a"), step(1, "a")],
+])
+def test_unschedulable_plans_are_rejected(workflow):
+    executor = WorkflowDAGExecutor({"a": lambda params, context: None})
+    with pytest.raises(WorkflowGraphError):
+        asyncio.run(executor.execute(workflow))
+
+
+def test_gate_holds_side_effecting_steps_until_validation():
+    sent = []
+
+    async def main(verdict):
+        executor = WorkflowDAGExecutor({
+            "query_participants": lambda params, context: ["row"],
+            "send_notification": lambda params, context: sent.append(1) or "sent",
+        })
+        gate = asyncio.get_running_loop().create_future()
+        run = asyncio.ensure_future(executor.execute(
+            [step(1, "query_participants"), step(2, "send_notification", [1])], gate=gate
+        ))
+        await asyncio.sleep(0.01)
+        assert not sent
+        gate.set_result(verdict)
+        return await run
+
+    blocked = asyncio.run(main(False))
+    assert blocked[1] == ["row"] and blocked[2]["status"] == "skipped" and not sent
+    allowed = asyncio.run(main(True))
+    assert allowed[2] == "sent" and sent == [1]
+
+
+@pytest.mark.parametrize("requested", [3600, 0, None, "never"])
+def test_plan_cannot_loosen_the_configured_step_timeout(requested):
+    executor = WorkflowDAGExecutor({"slow": sleeper(1.0)}, step_timeout=0.05)
+    started = time.perf_counter()
+    results = asyncio.run(executor.execute([{**step(1, "slow"), "timeout_seconds": requested}]))
+    assert time.perf_counter() - started < 0.5
+    assert results[1]["status"] == "failed"
+
+
+def test_plan_may_tighten_the_step_timeout():
+    executor = WorkflowDAGExecutor({"slow": sleeper(1.0)}, step_timeout=5.0)
+    results = asyncio.run(executor.execute([{**step(1, "slow"), "timeout_seconds": 0.05}]))
+    assert results[1] == {"status": "failed", "error": "Timed out after 0.05s"}
+
+
+def test_streaming_execution_starts_steps_before_the_plan_ends():
+    started = []
+
+    def tool(params, context):
+        started.append(time.perf_counter())
+        return "ok"
+
+    async def plan():
+        yield step(1, "a")
+        await asyncio.sleep(0.1)
+        yield step(2, "a", [1])
+
+    executor = WorkflowDAGExecutor({"a": tool})
+    begun = time.perf_counter()
+    results = asyncio.run(executor.execute_streaming(plan()))
+    assert results == {1: "ok", 2: "ok"}
+    assert started[0] - begun < 0.05
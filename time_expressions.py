@@ -0,0 +1,226 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from datetime import date, timedelta
+
+from caches import LRUTTLCache
+
+# ============================================================================
+# NON-LLM TIME EXPRESSIONS
+# ============================================================================
+
+class TimeExpressionEngine:
+    """
+    🔧 NON-LLM: Grammar-based resolution of time phrases into date ranges
+    
+    Covers relative periods ("this quarter", "last fiscal year"), rolling
+    windows ("last 30 days", "next 2 weeks"), quarters ("Q1 2024"), fiscal
+    years ("FY24", "2023 fiscal year"), named months, calendar years, to-date
+    periods, explicit ISO ranges and vesting-style "upcoming" windows.
+    
+    Quarters, "this/last/next year" and year-to-date follow the fiscal calendar,
+    so they agree with each other; named months and "in 2023" stay calendar.
+    Fiscal year N is the one that ends in calendar year N. Resolutions are
+    memoized per (phrase, reference date).
+    """
+    
+    NUMBERS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+               "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12}
+    MONTHS = {
+        "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+        "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+        "september": 9, "sept": 9, "sep": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+        "december": 12, "dec": 12,
+    }
+    ORDINALS = {"first": 1, "1st": 1, "second": 2, "2nd": 2, "third": 3, "3rd": 3, "fourth": 4, "4th": 4}
+    STEPS = {"this": 0, "current": 0, "last": -1, "previous": -1, "past": -1, "next": 1,
+             "coming": 1, "upcoming": 1}
+    UNIT_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+    
+    _number = r"(\d+|an?|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)"
+    _month = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")"
+    _iso = r"(\d{4}-\d{2}-\d{2})"
+    # Tried in this order at each position; every pattern is anchored on word boundaries
+    GRAMMAR = [
+        ("between", rf"between {_iso} and {_iso}"),
+        ("since", rf"since {_iso}"),
+        ("to_date", r"(year|quarter|month)[ -]to[ -]date|(ytd|qtd|mtd)"),
+        ("rolling", r"(?:(?:in|within|over|during) )?(?:the )?(last|past|previous|next|coming|upcoming) "
+                    + _number + r" (day|week|month|quarter|year)s?"),
+        ("fiscal_relative", r"(this|current|last|previous|next) fiscal (year|quarter)"),
+        ("relative", r"(this|current|last|previous|next) (week|month|quarter|year)"),
+        ("day", r"(today|yesterday|tomorrow)"),
+        ("quarter", r"(?:q([1-4])|(first|second|third|fourth|1st|2nd|3rd|4th) quarter)"
+                    r"(?:(?: of)? (?:fy ?)?(\d{4}))?"),
+        ("fiscal_year", r"fy ?(\d{4}|\d{2})|(\d{4}) fiscal year|fiscal (?:year )?(\d{4})"),
+        ("month", r"(?:(?:in|during|for) )?" + _month + r" (\d{4})|(?:in|during|for) " + _month),
+        ("year", r"(?:in|during|for|calendar year) ((?:19|20)\d{2})(?! fiscal)"),
+        ("upcoming", r"(upcoming|coming up)"),
+    ]
+    
+    def __init__(self, fiscal_year_start_month: int = 1, upcoming_days: int = 90,
+                 cache_size: int = 4096):
+        if not 1 <= fiscal_year_start_month <= 12:
+            raise ValueError(f"fiscal_year_start_month must be 1-12, not {fiscal_year_start_month}")
+        self.fiscal_year_start_month = fiscal_year_start_month
+        self.upcoming_days = upcoming_days
+        self._patterns = {name: re.compile(pattern) for name, pattern in self.GRAMMAR}
+        self._scanner = re.compile(
+            "|".join(rf"(?P<{name}>\b(?:{pattern})\b)" for name, pattern in self.GRAMMAR)
+        )
+        self._cache = LRUTTLCache(max_entries=cache_size, ttl_seconds=float("inf"),
+                                  namespace="time_expressions")
+    
+    def resolve(self, expression: str, today: Optional[date] = None) -> Optional[Tuple[date, date]]:
+        """(start, end) for the first time phrase in ``expression``, or None"""
+        matches = self.find(expression, today)
+        return matches[0][1] if matches else None
+    
+    def date_range(self, expression: str, today: Optional[date] = None) -> Optional[Dict[str, str]]:
+        resolved = self.resolve(expression, today)
+        if resolved is None:
+            return None
+        return {"start_date": resolved[0].isoformat(), "end_date": resolved[1].isoformat()}
+    
+    def find(self, text: str, today: Optional[date] = None
+             ) -> List[Tuple["re.Match", Tuple[date, date]]]:
+        """Every recognized time phrase in ``text`` with its resolved range"""
+        today = today or date.today()
+        found = []
+        for match in self._scanner.finditer(text.lower()):
+            resolved = self._resolve_phrase(match.lastgroup, match.group(), today)
+            if resolved is not None:
+                found.append((match, resolved))
+        return found
+    
+    def strip(self, text: str, today: Optional[date] = None) -> Tuple[str, List[Dict[str, str]]]:
+        """Remove recognized time phrases; return the remaining text and the ranges"""
+        pieces, ranges, position = [], [], 0
+        for match, (start, end) in self.find(text, today):
+            pieces.append(text[position:match.start()])
+            position = match.end()
+            ranges.append({"expression": text[match.start():match.end()],
+                           "start_date": start.isoformat(), "end_date": end.isoformat()})
+        pieces.append(text[position:])
+        return " ".join("".join(pieces).split()), ranges
+    
+    def substitute(self, text: str, today: Optional[date] = None) -> str:
+        """Replace time phrases with the ISO day or "start..end" window they mean"""
+        pieces, position = [], 0
+        for match, (start, end) in self.find(text, today):
+            pieces.append(text[position:match.start()])
+            pieces.append(start.isoformat() if start == end else f"{start.isoformat()}..{end.isoformat()}")
+            position = match.end()
+        pieces.append(text[position:])
+        return "".join(pieces)
+    
+    def fiscal_year_bounds(self, fiscal_year: int) -> Tuple[date, date]:
+        start = date(fiscal_year - (self.fiscal_year_start_month != 1), self.fiscal_year_start_month, 1)
+        return start, self._add_months(start, 12) - timedelta(days=1)
+    
+    def fiscal_year_of(self, day: date) -> int:
+        return day.year + (self.fiscal_year_start_month != 1 and day.month >= self.fiscal_year_start_month)
+    
+    def _resolve_phrase(self, kind: str, phrase: str, today: date) -> Optional[Tuple[date, date]]:
+        phrase = " ".join(phrase.split())
+        key = f"{today.isoformat()}|{phrase}"
+        cached = self._cache.get(key)
+        if cached is None:
+            try:
+                cached = getattr(self, f"_resolve_{kind}")(self._patterns[kind].fullmatch(phrase), today)
+            except ValueError:
+                cached = False  # e.g. "2024-02-30": recognized but not a real date
+            self._cache.put(key, cached)
+        return cached or None
+    
+    def _resolve_between(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        start, end = sorted(date.fromisoformat(value) for value in match.groups())
+        return start, end
+    
+    def _resolve_since(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        return date.fromisoformat(match.group(1)), today
+    
+    def _resolve_to_date(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        unit = match.group(1) or {"ytd": "year", "qtd": "quarter", "mtd": "month"}[match.group(2)]
+        if unit == "year":
+            return self.fiscal_year_bounds(self.fiscal_year_of(today))[0], today
+        if unit == "quarter":
+            return self._quarter_containing(today)[0], today
+        return today.replace(day=1), today
+    
+    def _resolve_rolling(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        direction, count, unit = match.groups()
+        count = int(count) if count.isdigit() else self.NUMBERS[count]
+        if unit == "day":
+            offset = timedelta(days=count)
+        elif unit == "week":
+            offset = timedelta(weeks=count)
+        else:
+            months = count * self.UNIT_MONTHS[unit]
+            if self.STEPS[direction] < 0:
+                return self._add_months(today, -months), today
+            return today, self._add_months(today, months)
+        return (today - offset, today) if self.STEPS[direction] < 0 else (today, today + offset)
+    
+    def _resolve_fiscal_relative(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        modifier, unit = match.groups()
+        step = self.STEPS[modifier]
+        if unit == "year":
+            return self.fiscal_year_bounds(self.fiscal_year_of(today) + step)
+        start = self._add_months(self._quarter_containing(today)[0], 3 * step)
+        return start, self._add_months(start, 3) - timedelta(days=1)
+    
+    def _resolve_relative(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        modifier, unit = match.groups()
+        step = self.STEPS[modifier]
+        if unit == "week":
+            start = today - timedelta(days=today.weekday()) + timedelta(weeks=step)
+            return start, start + timedelta(days=6)
+        if unit == "year":
+            return self.fiscal_year_bounds(self.fiscal_year_of(today) + step)
+        if unit == "quarter":
+            start = self._add_months(self._quarter_containing(today)[0], 3 * step)
+            return start, self._add_months(start, 3) - timedelta(days=1)
+        start = self._add_months(today.replace(day=1), step)
+        return start, self._add_months(start, 1) - timedelta(days=1)
+    
+    def _resolve_day(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        day = today + timedelta(days={"today": 0, "yesterday": -1, "tomorrow": 1}[match.group(1)])
+        return day, day
+    
+    def _resolve_quarter(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        number, ordinal, year = match.groups()
+        quarter = int(number) if number else self.ORDINALS[ordinal]
+        fiscal_year = int(year) if year else self.fiscal_year_of(today)
+        start = self._add_months(self.fiscal_year_bounds(fiscal_year)[0], 3 * (quarter - 1))
+        return start, self._add_months(start, 3) - timedelta(days=1)
+    
+    def _resolve_fiscal_year(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        year = next(group for group in match.groups() if group)
+        fiscal_year = int(year) if len(year) == 4 else 2000 + int(year)
+        return self.fiscal_year_bounds(fiscal_year)
+    
+    def _resolve_month(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        name, year, bare_name = match.groups()
+        start = date(int(year) if year else today.year, self.MONTHS[name or bare_name], 1)
+        return start, self._add_months(start, 1) - timedelta(days=1)
+    
+    def _resolve_year(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        year = int(match.group(1))
+        return date(year, 1, 1), date(year, 12, 31)
+    
+    def _resolve_upcoming(self, match: "re.Match", today: date) -> Tuple[date, date]:
+        return today, today + timedelta(days=self.upcoming_days)
+    
+    def _quarter_containing(self, day: date) -> Tuple[date, date]:
+        fiscal_start = self.fiscal_year_bounds(self.fiscal_year_of(day))[0]
+        months_in = (day.year - fiscal_start.year) * 12 + day.month - fiscal_start.month
+        start = self._add_months(fiscal_start, months_in // 3 * 3)
+        return start, self._add_months(start, 3) - timedelta(days=1)
+    
+    @staticmethod
+    def _add_months(day: date, months: int) -> date:
+        month0 = day.month - 1 + months
+        year, month0 = day.year + month0 // 12, month0 % 12
+        next_month = date(year + (month0 == 11), (month0 + 1) % 12 + 1, 1)
+        return day.replace(year=year, month=month0 + 1,
+                           day=min(day.day, (next_month - timedelta(days=1)).day))
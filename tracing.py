@@ -0,0 +1,254 @@
+import contextlib
+import functools
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Tuple
+
+# ============================================================================
+# NON-LLM OBSERVABILITY: SPANS, TOKEN ACCOUNTING, LATENCY HISTOGRAMS
+# ============================================================================
+
+# Innermost open span for the current task; None whenever tracing is off
+_current_span: ContextVar[Optional["_Span"]] = ContextVar("current_span", default=None)
+
+# LLM calls and tokens charged to the current request, set by track_llm_usage
+_llm_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_usage", default=None)
+
+
+@contextlib.contextmanager
+def track_llm_usage():
+    """Count the LLM calls and tokens made by everything run inside this block"""
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    token = _llm_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _llm_usage.reset(token)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class _NoopSpan:
+    """Shared stand-in returned by every hook while tracing is off"""
+    __slots__ = ()
+    
+    def set(self, **attributes):
+        pass
+    
+    def end(self, error: Optional[BaseException] = None):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    """One timed unit of work: a request, a pipeline stage, an LLM call or a workflow step"""
+    __slots__ = ("tracer", "name", "kind", "attributes", "children", "parent", "started", "duration", "_token")
+    
+    def __init__(self, tracer: "Tracer", name: str, kind: str, attributes: Dict[str, Any],
+                 parent: Optional["_Span"] = None):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.children: List["_Span"] = []
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self._token = None
+        if parent is not None:
+            parent.children.append(self)
+    
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+    
+    def end(self, error: Optional[BaseException] = None):
+        """Close a span that was never made current (used inside async generators)"""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.started
+        if error is not None:
+            self.attributes["error"] = type(error).__name__
+        self.tracer._record(self)
+    
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "duration_ms": round((self.duration or 0.0) * 1000.0, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def trace_span(name: Optional[str] = None, kind: str = "stage", **attributes):
+    """Child span of the current one; a no-op outside a traced request
+    
+    ``name`` defaults to the parent's, so an LLM call inside the "parse" stage
+    is recorded as kind "llm", name "parse". Use it as a context manager, or
+    call ``end()`` yourself where the span must not become current (async
+    generators, whose code runs between the consumer's own statements).
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP_SPAN
+    return _Span(parent.tracer, name or parent.name, kind, attributes, parent)
+
+
+def trace_annotate(**attributes):
+    """Attach attributes (cache flags, counts) to the current span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def trace_cache(cache: str, hit: bool, span: Optional["_Span"] = None):
+    """Record a cache lookup on ``span`` (default: the current one) and in the tracer's counters"""
+    if span is None:
+        span = _current_span.get()
+    if isinstance(span, _Span):
+        span.set(**{f"{cache}_cache": "hit" if hit else "miss"})
+        span.tracer.count("cache_lookups", cache=cache, result="hit" if hit else "miss")
+
+
+def traced(name: str, kind: str = "stage"):
+    """Decorator: run a coroutine method inside ``trace_span(name, kind)``"""
+    def decorate(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with trace_span(name, kind):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Tracer:
+    """🔧 NON-LLM: Span trees per request, token/cache counters, rolling latency percentiles
+    
+    Latencies are kept per (kind, name) over the last ``window`` spans, so
+    p50/p95/p99 follow current behaviour rather than all-time averages. The
+    last ``keep_traces`` request trees are retained for inspection.
+    """
+    
+    enabled = True
+    QUANTILES = (50, 95, 99)
+    
+    def __init__(self, window: int = 1024, keep_traces: int = 50):
+        self.window = window
+        self.latencies: Dict[Tuple[str, str], deque] = {}
+        self.totals: Dict[Tuple[str, str], List[float]] = {}  # (kind, name) -> [count, seconds]
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.traces: deque = deque(maxlen=keep_traces)
+    
+    def trace(self, name: str, **attributes) -> _Span:
+        """Root span for one request; every hook inside it reports here"""
+        return _Span(self, name, "request", attributes)
+    
+    def count(self, metric: str, amount: float = 1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def _record(self, span: _Span):
+        key = (span.kind, span.name)
+        window = self.latencies.get(key)
+        if window is None:
+            window = self.latencies[key] = deque(maxlen=self.window)
+            self.totals[key] = [0, 0.0]
+        window.append(span.duration)
+        self.totals[key][0] += 1
+        self.totals[key][1] += span.duration
+        if span.kind == "llm":
+            for kind in ("prompt", "completion"):
+                self.count("llm_tokens", span.attributes.get(f"{kind}_tokens", 0), stage=span.name, type=kind)
+        if span.parent is None:
+            self.traces.append(span.to_dict())
+    
+    def latency_summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """kind -> name -> count, mean and p50/p95/p99 in milliseconds"""
+        summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (kind, name), window in self.latencies.items():
+            count, seconds = self.totals[(kind, name)]
+            row = {"count": count, "mean_ms": round(seconds / count * 1000.0, 3)}
+            for quantile in self.QUANTILES:
+                row[f"p{quantile}_ms"] = round(_percentile(list(window), quantile) * 1000.0, 3)
+            summary.setdefault(kind, {})[name] = row
+        return summary
+    
+    def export_json(self, include_traces: bool = True) -> Dict[str, Any]:
+        report = {
+            "enabled": True,
+            "latency": self.latency_summary(),
+            "counters": [{"metric": metric, "labels": dict(labels), "value": value}
+                         for (metric, labels), value in sorted(self.counters.items())],
+        }
+        if include_traces:
+            report["traces"] = list(self.traces)
+        return report
+    
+    def export_openmetrics(self, prefix: str = "equity_agent") -> str:
+        """Latency summaries and counters in the OpenMetrics text format"""
+        lines = [f"# TYPE {prefix}_span_duration_seconds summary",
+                 f"# UNIT {prefix}_span_duration_seconds seconds",
+                 f"# HELP {prefix}_span_duration_seconds Span latency over the rolling window."]
+        for (kind, name), window in sorted(self.latencies.items()):
+            labels = f'kind="{kind}",name="{self._escape(name)}"'
+            values = list(window)
+            for quantile in self.QUANTILES:
+                lines.append(f'{prefix}_span_duration_seconds{{{labels},quantile="{quantile / 100}"}} '
+                             f'{_percentile(values, quantile):.6f}')
+            count, seconds = self.totals[(kind, name)]
+            lines.append(f"{prefix}_span_duration_seconds_sum{{{labels}}} {seconds:.6f}")
+            lines.append(f"{prefix}_span_duration_seconds_count{{{labels}}} {count}")
+        for metric in sorted({metric for metric, _ in self.counters}):
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for (name, labels), value in sorted(self.counters.items()):
+                if name == metric:
+                    rendered = ",".join(f'{key}="{self._escape(str(val))}"' for key, val in labels)
+                    lines.append(f"{prefix}_{metric}_total{{{rendered}}} {value:g}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+    
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class NullTracer:
+    """Tracing switched off: every hook becomes a shared no-op span"""
+    
+    enabled = False
+    
+    def trace(self, name: str, **attributes) -> _NoopSpan:
+        return _NOOP_SPAN
+    
+    def count(self, metric: str, amount: float = 1, **labels):
+        pass
+    
+    def export_json(self, include_traces: bool = True) -> Dict[str, Any]:
+        return {"enabled": False}
+    
+    def export_openmetrics(self, prefix: str = "equity_agent") -> str:
+        return "# EOF\n"
@@ -0,0 +1,300 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import operator
+import re
+import sqlite3
+import time
+from array import array
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+from datetime import date
+
+from caches import LRUTTLCache
+from columnar import ColumnarResultSet
+from sql_engine import VERSIONED_TABLES, SQLExecutionEngine
+from time_expressions import TimeExpressionEngine
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# NON-LLM VESTING ENGINE: SCHEDULE PARSING, BATCH EXPANSION, CALENDAR INDEX
+# ============================================================================
+
+class VestingScheduleError(ValueError):
+    """Raised when a vesting_schedule text names no term we can expand"""
+
+
+class VestingSchedule:
+    """
+    🔧 NON-LLM: Cliff, period and tranche parameters parsed from schedule text
+    
+    "4-year vest" vests annually over 48 months; "1-year cliff, 4-year vest"
+    vests 12/48 at the cliff and monthly after it; "3-year performance" vests
+    once, at the end of the performance period. ``tranches`` holds the
+    cumulative months vested at each event, so tranche k of a grant of q
+    shares releases ``q * m_k // total - q * m_(k-1) // total`` and the
+    tranches always sum to q.
+    """
+    
+    __slots__ = ("total_months", "cliff_months", "period_months", "tranches")
+    
+    TERM = re.compile(r"(\d+(?:\.\d+)?)[- ]?(years?|yrs?|months?|mos?)\b(\s*cliff)?")
+    FREQUENCIES = {"monthly": 1, "quarterly": 3, "semi-annual": 6, "semiannual": 6,
+                   "annual": 12, "annually": 12, "yearly": 12}
+    SINGLE_EVENT = ("performance", "cliff vest", "cliff-vest")
+    IMMEDIATE = ("immediate", "fully vested", "at grant")
+    # Few distinct texts across thousands of grants, but bounded: schedule text is user data
+    _parsed = LRUTTLCache(max_entries=1024, ttl_seconds=float("inf"), namespace="vesting_schedules")
+    
+    def __init__(self, total_months: int, cliff_months: int = 0, period_months: int = 12,
+                 single_event: bool = False):
+        if total_months < 0 or not 0 <= cliff_months <= total_months or period_months < 1:
+            raise VestingScheduleError(
+                f"Inconsistent vesting terms: total={total_months} cliff={cliff_months} period={period_months}"
+            )
+        self.total_months = total_months
+        self.cliff_months = cliff_months
+        self.period_months = period_months
+        if single_event or total_months == 0:
+            self.tranches = (total_months,)
+        else:
+            months = list(range(max(cliff_months, period_months), total_months, period_months))
+            self.tranches = tuple(months) + (total_months,)
+    
+    @classmethod
+    def parse(cls, text: str) -> "VestingSchedule":
+        key = " ".join(str(text or "").lower().split())
+        schedule = cls._parsed.get(key)
+        if schedule is None:
+            schedule = cls._parse(key)
+            cls._parsed.put(key, schedule)
+        return schedule
+    
+    @classmethod
+    def _parse(cls, text: str) -> "VestingSchedule":
+        if any(phrase in text for phrase in cls.IMMEDIATE):
+            return cls(0)
+        total = cliff = None
+        for match in cls.TERM.finditer(text):
+            months = round(float(match.group(1)) * (12 if match.group(2).startswith("y") else 1))
+            if match.group(3):
+                cliff = months
+            elif total is None:
+                total = months
+        if total is None:
+            raise VestingScheduleError(f"No vesting term in schedule {text!r}")
+        period = next((months for word, months in cls.FREQUENCIES.items()
+                       if re.search(rf"\b{word}\b", text)), None)
+        if period is None:
+            period = 1 if cliff else 12  # "1-year cliff" conventionally means monthly afterwards
+        return cls(total, cliff or 0, period, single_event=any(phrase in text for phrase in cls.SINGLE_EVENT))
+    
+    def __repr__(self) -> str:
+        return (f"VestingSchedule(total_months={self.total_months}, cliff_months={self.cliff_months}, "
+                f"period_months={self.period_months}, tranches={len(self.tranches)})")
+
+
+def expand_vesting_events(grants: ColumnarResultSet) -> Tuple[List[tuple], List[Any]]:
+    """🔧 NON-LLM: Every vesting event of every grant, computed in batches
+    
+    Grants are grouped by (vesting_schedule, grant_date), so each schedule is
+    parsed once and each tranche date is computed once per group; the share
+    split then runs over the group's whole quantity column per tranche.
+    Returns ``(batches, unparsed)``: one ``(day ordinal, tranche, tranches,
+    grant_ids, shares)`` batch per group and tranche, and the ids of grants
+    whose schedule or grant date could not be parsed.
+    """
+    batches, unparsed = [], []
+    groups = grants.where("quantity", ">", 0).group_by("vesting_schedule", "grant_date").groups()
+    for (schedule_text, grant_date), group in groups.items():
+        ids = group.column("grant_id")
+        try:
+            schedule = VestingSchedule.parse(schedule_text)
+            granted = date.fromisoformat(str(grant_date)[:10])
+        except ValueError:  # VestingScheduleError included
+            unparsed.extend(ids)
+            continue
+        quantities = group.column("quantity")
+        total = schedule.total_months or 1
+        previous = itertools.repeat(0)
+        for number, months in enumerate(schedule.tranches, 1):
+            vested = [quantity * months // total for quantity in quantities] if schedule.total_months else quantities
+            day = TimeExpressionEngine._add_months(granted, months).toordinal()
+            batches.append((day, number, len(schedule.tranches), ids, list(map(operator.sub, vested, previous))))
+            previous = vested
+    return batches, unparsed
+
+
+class VestingCalendar:
+    """
+    🔧 NON-LLM: Date-indexed vesting events answering window queries by range scan
+    
+    Events are bucketed by day, and the sorted array of days with events is
+    searched with bisect, so "who vests this quarter" touches only that
+    quarter's buckets. ``refresh`` diffs the grants table against what is
+    indexed and re-expands only grants that were added, changed or removed;
+    with table_versions it runs whenever a grant table was written, otherwise
+    at most every ``refresh_seconds``.
+    """
+    
+    GRANT_COLUMNS = ("grant_id", "participant_id", "name", "email", "department", "participant_type",
+                     "company_id", "company_name", "award_type", "grant_date", "quantity",
+                     "vesting_schedule", "status", "exercise_price")
+    GRANTS_SQL = (
+        "SELECT a.award_id AS grant_id, a.employee_id AS participant_id, p.name, p.email, p.department,"
+        " p.participant_type, p.company_id, c.company_name, a.award_type, a.grant_date, a.quantity,"
+        " a.vesting_schedule, a.status, a.exercise_price"
+        " FROM equity_awards a"
+        " LEFT JOIN participants p ON p.participant_id = a.employee_id"
+        " LEFT JOIN companies c ON c.company_id = p.company_id"
+        " WHERE a.status IS NULL OR a.status NOT IN (?, ?, ?)"
+    )
+    INACTIVE_STATUSES = ("Cancelled", "Forfeited", "Expired")
+    # Plan parameter -> event column it filters
+    FILTERS = {"department": "department", "participant_type": "participant_type",
+               "participant_id": "participant_id", "company": "company_name", "company_name": "company_name"}
+    EVENT_COLUMNS = ("vest_date", "grant_id", "tranche", "tranches", "shares") + tuple(
+        column for column in GRANT_COLUMNS if column not in ("grant_id", "vesting_schedule", "status")
+    )
+    # Positions within a cached grant row
+    _SCHEDULE = GRANT_COLUMNS.index("vesting_schedule")
+    _GRANT_DATE = GRANT_COLUMNS.index("grant_date")
+    _EVENT_FIELDS = tuple(map(GRANT_COLUMNS.index, EVENT_COLUMNS[5:]))
+    
+    def __init__(self, sql_engine: Optional["SQLExecutionEngine"] = None, refresh_seconds: float = 300.0):
+        self.sql_engine = sql_engine
+        self.refresh_seconds = refresh_seconds
+        self._days = array("l")  # Sorted ordinals of days with at least one event
+        self._events: Dict[int, List[Tuple[int, int, int, int]]] = {}  # day -> [(grant_id, tranche, tranches, shares)]
+        self._grants: Dict[int, tuple] = {}  # grant_id -> row in GRANT_COLUMNS order
+        self.stats = {"grants": 0, "events": 0, "unparsed": 0, "refreshes": 0, "expanded": 0, "removed": 0}
+        self._refreshed_at: Optional[float] = None
+        self._versions: Optional[Dict[str, int]] = None
+        self._loop = None
+        self._lock = None
+    
+    def __len__(self) -> int:
+        return sum(map(len, self._events.values()))
+    
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+    
+    async def refresh(self, force: bool = False):
+        """Sync with the database, re-expanding only grants whose rows changed"""
+        if self.sql_engine is None:
+            return
+        self._bind_loop()
+        async with self._lock:  # Concurrent first queries wait for one load
+            now = time.monotonic()
+            versions = await self.sql_engine.table_versions(VERSIONED_TABLES)
+            if versions is not None and self._refreshed_at is not None:
+                fresh = versions == self._versions  # Exact: any write to the grant tables forces a sync
+            else:
+                fresh = self._refreshed_at is not None and now - self._refreshed_at < self.refresh_seconds
+            if fresh and not force:
+                return
+            try:
+                grants = await self.sql_engine.execute(self.GRANTS_SQL, self.INACTIVE_STATUSES, columnar=True)
+            except sqlite3.Error as e:
+                logger.warning("   ⚠️  Vesting calendar refresh skipped: %s", e)
+                return
+            self._refreshed_at = now
+            self._versions = versions  # Read before the grants, so a racing write triggers another sync
+            rows = {row[0]: row for row in zip(*(grants.column(name) for name in self.GRANT_COLUMNS))}
+            removed = [grant_id for grant_id in self._grants if grant_id not in rows]
+            changed = [row for grant_id, row in rows.items() if self._grants.get(grant_id) != row]
+            if removed:
+                self.remove(removed)
+            if len(changed) == len(rows):
+                self.load(grants)  # First load: one batch expansion
+            elif changed:
+                self.upsert(dict(zip(self.GRANT_COLUMNS, row)) for row in changed)
+            self.stats["refreshes"] += 1
+    
+    def load(self, grants: ColumnarResultSet):
+        """Replace the calendar with the events of ``grants``"""
+        self._days = array("l")
+        self._events, self._grants = {}, {}
+        self.stats.update(grants=0, events=0, unparsed=0)
+        self._add(grants)
+    
+    def upsert(self, grants: Iterable[Dict[str, Any]]):
+        """Add or replace grants (rows with GRANT_COLUMNS keys)"""
+        grants = ColumnarResultSet.from_tuples(
+            list(self.GRANT_COLUMNS), [tuple(row.get(name) for name in self.GRANT_COLUMNS) for row in grants]
+        )
+        self.remove(grant_id for grant_id in grants.column("grant_id") if grant_id in self._grants)
+        self._add(grants)
+    
+    def remove(self, grant_ids: Iterable[int]):
+        for grant_id in list(grant_ids):
+            row = self._grants.pop(grant_id, None)
+            if row is None:
+                continue
+            for day in self._vest_days(row):
+                if day not in self._events:
+                    continue
+                bucket = [event for event in self._events[day] if event[0] != grant_id]
+                self.stats["events"] -= len(self._events[day]) - len(bucket)
+                if bucket:
+                    self._events[day] = bucket
+                else:
+                    del self._events[day]
+                    del self._days[bisect.bisect_left(self._days, day)]
+            self.stats["grants"] -= 1
+            self.stats["removed"] += 1
+    
+    @staticmethod
+    def _vest_days(row: tuple) -> List[int]:
+        """Days a grant row has events on; the schedule is deterministic, so nothing is stored per grant"""
+        try:
+            schedule = VestingSchedule.parse(row[VestingCalendar._SCHEDULE])
+            granted = date.fromisoformat(str(row[VestingCalendar._GRANT_DATE])[:10])
+        except ValueError:
+            return []
+        return [TimeExpressionEngine._add_months(granted, months).toordinal() for months in schedule.tranches]
+    
+    def _add(self, grants: ColumnarResultSet):
+        for row in zip(*(grants.column(name) for name in self.GRANT_COLUMNS)):
+            self._grants[row[0]] = row
+        self.stats["grants"] += len(grants)
+        batches, unparsed = expand_vesting_events(grants)
+        self.stats["unparsed"] += len(unparsed)
+        new_days = []
+        for day, tranche, tranches, grant_ids, shares in batches:
+            bucket = self._events.get(day)
+            if bucket is None:
+                bucket = self._events[day] = []
+                new_days.append(day)
+            bucket.extend(zip(grant_ids, itertools.repeat(tranche), itertools.repeat(tranches), shares))
+            self.stats["events"] += len(grant_ids)
+        if len(new_days) > 64:
+            self._days = array("l", sorted(self._events))
+        else:
+            for day in new_days:
+                bisect.insort(self._days, day)
+        self.stats["expanded"] += len(grants)
+    
+    def events(self, start: Union[str, date], end: Union[str, date]) -> ColumnarResultSet:
+        """Vesting events with ``start <= vest_date <= end`` in date order, one row per tranche"""
+        first = (date.fromisoformat(start) if isinstance(start, str) else start).toordinal()
+        last = (date.fromisoformat(end) if isinstance(end, str) else end).toordinal()
+        days = self._days[bisect.bisect_left(self._days, first):bisect.bisect_right(self._days, last)]
+        buckets = [self._events[day] for day in days]
+        events = list(itertools.chain.from_iterable(buckets))
+        if not events:
+            return ColumnarResultSet.from_tuples(list(self.EVENT_COLUMNS), [])
+        # Column by column: one date string per day, grant attributes gathered by id
+        vest_dates = itertools.chain.from_iterable(map(
+            itertools.repeat, (date.fromordinal(day).isoformat() for day in days), map(len, buckets)
+        ))
+        grant_ids = list(map(operator.itemgetter(0), events))
+        grants = list(map(self._grants.__getitem__, grant_ids))
+        return ColumnarResultSet.from_columns(list(self.EVENT_COLUMNS), [
+            vest_dates, grant_ids, *(map(operator.itemgetter(field), events) for field in (1, 2, 3)),
+            *(map(operator.itemgetter(field), grants) for field in self._EVENT_FIELDS),
+        ])
@@ -0,0 +1,263 @@
+import asyncio
+import inspect
+import logging
+from typing import Dict, List, Any, AsyncIterator, Callable, Optional
+
+from tracing import trace_span, traced
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# NON-LLM WORKFLOW EXECUTION: DEPENDENCY-AWARE DAG SCHEDULER
+# ============================================================================
+
+class WorkflowGraphError(ValueError):
+    """Raised when a planned workflow cannot be scheduled (bad ids, cycles)"""
+
+
+class WorkflowDAGExecutor:
+    """🔧 NON-LLM: Runs planned workflow steps as a dependency graph
+
+    Each step waits only for the steps in its ``dependencies`` list, so
+    independent steps (e.g. query_companies and calculate_date_range) run
+    concurrently and wall-clock time follows the critical path.
+    
+    Tools outside ``read_only_tools`` can be held behind a gate future so they
+    never run before business validation has passed. Only ``bound_inputs``
+    keys of upstream dict outputs (a date range) are merged into a step's
+    params; everything else is read from ``context["upstream"]``.
+    """
+    
+    READ_ONLY_TOOLS = frozenset({
+        "calculate_date_range", "query_participants", "query_companies",
+        "query_grants", "query_vesting_events", "create_report",
+    })
+    # Upstream output keys a step takes as params, e.g. calculate_date_range -> query_grants
+    BOUND_INPUTS = frozenset({"start_date", "end_date"})
+    
+    def __init__(self, tools: Dict[str, Callable], max_concurrency: int = 8,
+                 step_timeout: float = 30.0, read_only_tools: Optional[set] = None,
+                 bound_inputs: Optional[set] = None):
+        # tool name -> handler(params, context), sync or async
+        self.tools = tools
+        self.max_concurrency = max_concurrency
+        self.step_timeout = step_timeout
+        self.read_only_tools = frozenset(read_only_tools if read_only_tools is not None
+                                         else self.READ_ONLY_TOOLS)
+        self.bound_inputs = frozenset(bound_inputs if bound_inputs is not None else self.BOUND_INPUTS)
+    
+    def build_graph(self, workflow: List[Dict]) -> Dict[Any, List[Any]]:
+        """🔧 NON-LLM: Map step_id -> dependency ids, rejecting bad plans"""
+        step_ids = set()
+        for step in workflow:
+            step_id = step.get("step_id")
+            if step_id is None or step_id in step_ids:
+                raise WorkflowGraphError(f"Missing or duplicate step_id: {step_id!r}")
+            step_ids.add(step_id)
+        
+        graph = {}
+        for step in workflow:
+            dependencies = list(step.get("dependencies") or [])
+            unknown = [dep for dep in dependencies if dep not in step_ids]
+            if unknown:
+                raise WorkflowGraphError(
+                    f"Step {step['step_id']} depends on unknown steps {unknown}"
+                )
+            graph[step["step_id"]] = dependencies
+        
+        self.topological_levels(graph)  # Raises on cycles
+        return graph
+    
+    @staticmethod
+    def topological_levels(graph: Dict[Any, List[Any]]) -> List[List[Any]]:
+        """🔧 NON-LLM: Kahn's algorithm grouped into levels of parallel steps"""
+        remaining = {step_id: len(deps) for step_id, deps in graph.items()}
+        dependents = {step_id: [] for step_id in graph}
+        for step_id, deps in graph.items():
+            for dep in deps:
+                dependents[dep].append(step_id)
+        
+        levels = []
+        ready = [step_id for step_id, count in remaining.items() if count == 0]
+        while ready:
+            levels.append(ready)
+            next_ready = []
+            for step_id in ready:
+                for dependent in dependents[step_id]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        next_ready.append(dependent)
+            ready = next_ready
+        
+        if sum(len(level) for level in levels) != len(graph):
+            cyclic = [step_id for step_id, count in remaining.items() if count > 0]
+            raise WorkflowGraphError(f"Workflow has a dependency cycle among steps {cyclic}")
+        return levels
+    
+    @traced("execute")
+    async def execute(self, workflow: List[Dict], context: Optional[Dict] = None,
+                      gate: Optional[asyncio.Future] = None,
+                      on_result: Optional[Callable[[Any, Any], None]] = None) -> Dict:
+        """🔧 NON-LLM: Execute all steps, returning results keyed by step_id
+        
+        A failed or timed-out step is recorded as {"status": "failed", ...} and
+        its dependents are recorded as skipped instead of being run. With a
+        ``gate``, side-effecting steps wait for it to resolve True first.
+        ``on_result(step_id, result)`` is called as each step finishes.
+        """
+        graph = self.build_graph(workflow)
+        levels = self.topological_levels(graph)
+        run = _WorkflowRun(self, context, gate, on_result)
+        
+        logger.info("🔧 Executing %s workflow steps (%s levels, max concurrency %s)",
+                    len(workflow), len(levels), self.max_concurrency)
+        
+        # Steps are started in topological order so every dependency task exists
+        steps = {step["step_id"]: step for step in workflow}
+        for level in levels:
+            for step_id in level:
+                run.start(steps[step_id])
+        return await run.finish([step["step_id"] for step in workflow])
+    
+    @traced("execute")
+    async def execute_streaming(self, steps: AsyncIterator[Dict], context: Optional[Dict] = None,
+                                gate: Optional[asyncio.Future] = None,
+                                on_result: Optional[Callable[[Any, Any], None]] = None) -> Dict:
+        """🔧 NON-LLM: Like execute(), but start each step as soon as it has streamed in
+        
+        A step starts once all of its dependencies have arrived; the complete
+        plan is checked for unknown dependencies and cycles when the stream ends.
+        """
+        run = _WorkflowRun(self, context, gate, on_result)
+        workflow, waiting = [], []
+        logger.info("🔧 Streaming execution (max concurrency %s)", self.max_concurrency)
+        try:
+            async for step in steps:
+                workflow.append(step)
+                waiting = run.start_ready(waiting + [step])
+            self.build_graph(workflow)
+            run.start_ready(waiting)
+        except BaseException:
+            await run.cancel()
+            raise
+        return await run.finish([step["step_id"] for step in workflow])
+    
+    def _bind_upstream(self, step: Dict, dependencies: List[Any], results: Dict,
+                       context: Optional[Dict]):
+        """Merge declared inputs from dependencies' dict outputs into params; explicit params win"""
+        params = dict(step.get("params") or {})
+        upstream = {dep: results[dep] for dep in dependencies}
+        for output in upstream.values():
+            if isinstance(output, dict):
+                for key in self.bound_inputs.intersection(output):
+                    params.setdefault(key, output[key])
+        step_context = dict(context or {})
+        step_context["upstream"] = upstream
+        return params, step_context
+    
+    @staticmethod
+    async def _invoke(handler: Callable, params: Dict, context: Dict) -> Any:
+        result = handler(params, context)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+class _WorkflowRun:
+    """Task bookkeeping for one execution of a workflow by WorkflowDAGExecutor"""
+    
+    def __init__(self, executor: WorkflowDAGExecutor, context: Optional[Dict],
+                 gate: Optional[asyncio.Future], on_result: Optional[Callable[[Any, Any], None]]):
+        self.executor = executor
+        self.context = context
+        self.gate = gate
+        self.on_result = on_result
+        self.semaphore = asyncio.Semaphore(executor.max_concurrency)
+        self.results: Dict[Any, Any] = {}
+        self.tasks: Dict[Any, asyncio.Task] = {}
+    
+    def start(self, step: Dict):
+        step_id = step.get("step_id")
+        if step_id is None or step_id in self.tasks:
+            raise WorkflowGraphError(f"Missing or duplicate step_id: {step_id!r}")
+        self.tasks[step_id] = asyncio.ensure_future(self._run_step(step))
+    
+    def start_ready(self, waiting: List[Dict]) -> List[Dict]:
+        """Start every waiting step whose dependencies have started; return the rest"""
+        progress = True
+        while progress:
+            progress = False
+            still_waiting = []
+            for step in waiting:
+                if all(dep in self.tasks for dep in step.get("dependencies") or []):
+                    self.start(step)
+                    progress = True
+                else:
+                    still_waiting.append(step)
+            waiting = still_waiting
+        return waiting
+    
+    async def finish(self, order: List[Any]) -> Dict:
+        try:
+            await asyncio.gather(*self.tasks.values())
+        except asyncio.CancelledError:
+            await self.cancel()
+            raise
+        
+        failed = [step_id for step_id, task in self.tasks.items() if not task.result()]
+        if failed:
+            logger.warning("   ⚠️  Steps failed or skipped: %s", failed)
+        return {step_id: self.results[step_id] for step_id in order}
+    
+    async def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+    
+    async def _run_step(self, step: Dict) -> bool:
+        ok = await self._execute_step(step)
+        if self.on_result is not None:
+            self.on_result(step["step_id"], self.results[step["step_id"]])
+        return ok
+    
+    async def _execute_step(self, step: Dict) -> bool:
+        step_id = step["step_id"]
+        dependencies = list(step.get("dependencies") or [])
+        if dependencies:
+            upstream_ok = await asyncio.gather(*(self.tasks[dep] for dep in dependencies))
+            if not all(upstream_ok):
+                self.results[step_id] = {"status": "skipped", "error": "Upstream dependency failed"}
+                return False
+        
+        handler = self.executor.tools.get(step.get("tool"))
+        if handler is None:
+            self.results[step_id] = {"status": "failed",
+                                     "error": f"No handler for tool {step.get('tool')!r}"}
+            return False
+        
+        if self.gate is not None and step.get("tool") not in self.executor.read_only_tools:
+            if not await self.gate:
+                self.results[step_id] = {"status": "skipped",
+                                         "error": "Blocked by business validation"}
+                return False
+        
+        params, step_context = self.executor._bind_upstream(step, dependencies, self.results, self.context)
+        # A plan may tighten the configured step timeout, never loosen or disable it
+        timeout = self.executor.step_timeout
+        requested = step.get("timeout_seconds")
+        if isinstance(requested, (int, float)) and not isinstance(requested, bool) and 0 < requested < timeout:
+            timeout = requested
+        async with self.semaphore:
+            with trace_span(step.get("tool"), kind="step", step_id=step_id) as span:
+                try:
+                    self.results[step_id] = await asyncio.wait_for(
+                        self.executor._invoke(handler, params, step_context), timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.results[step_id] = {"status": "failed", "error": f"Timed out after {timeout}s"}
+                    span.set(status="timeout")
+                    return False
+                except Exception as e:
+                    self.results[step_id] = {"status": "failed", "error": str(e)}
+                    span.set(status="failed")
+                    return False
+        return True